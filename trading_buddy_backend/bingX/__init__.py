@@ -1,2 +1,4 @@
+from bingX._http_manager import set_base_url, set_request_observer, set_request_span, set_shared_cache, set_transport
 from bingX.exceptions import ClientError, ServerError
 from bingX.main import BingX
+from bingX.ticks import Ticks
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+
+from bingX._http_manager import _HTTPManager
+from bingX.exceptions import ClientError, InvalidMethodException, ServerError
+from bingX.single_flight import AsyncSingleFlight
+
+# One connection pool per event loop, so every async client of the process reuses the same keep-alive connections
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Clients bound to loops which are already closed can't be used anymore
+        for stale_loop in [stale_loop for stale_loop in _clients if stale_loop.is_closed()]:
+            del _clients[stale_loop]
+
+        client = httpx.AsyncClient(timeout=httpx.Timeout(10.0), limits=httpx.Limits(max_keepalive_connections=20))
+        _clients[loop] = client
+    return client
+
+
+class _AsyncHTTPManager(_HTTPManager):
+    """
+    Same signing and error handling as _HTTPManager, but requests are awaited instead of blocking the thread
+    """
+    _aflight = AsyncSingleFlight()
+
+    def __init__(self, api_key: str, secret_key: str) -> None:
+        super().__init__(api_key, secret_key)
+        self.__headers = {'X-BX-APIKEY': api_key}
+
+    async def _arequest(self, method: str, endpoint: str, payload: dict[str, Any] = {},
+                        headers: dict[str, Any] = {}) -> httpx.Response:
+        """
+        It takes a method, endpoint, payload, and headers, and returns a response
+
+        :param method: The HTTP method to use (GET, POST, PUT, DELETE)
+        :param endpoint: The endpoint you want to hit i.e. /openApi/swap/v2/trade/order
+        :param payload: The data to be sent to the server
+        :param headers: This is a dictionary of headers that will be sent with the request
+        """
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise InvalidMethodException(f"Invalid method used: {method}")
+
+        # Payload is copied, as signing adds timestamp into it
+        url = self._url(endpoint, dict(payload))
+        headers = {**self.__headers, **headers}
+        start = time.perf_counter()
+        code = None
+
+        with self._span(method, endpoint):
+            try:
+                if self._transport is not None:
+                    response = await self._transport.arequest(method, url, headers)
+                else:
+                    response = await _get_client().request(method, url, headers=headers)
+
+                self._check_response(response)
+                code = 0
+                return response
+            except (ClientError, ServerError) as e:
+                code = e.error_code
+                raise
+            finally:
+                self._observe(method, endpoint, code, start)
+
+    async def aget(self, endpoint: str, payload: dict[str, Any] = {}, headers: dict[str, Any] = {}) -> httpx.Response:
+        # Identical GET requests awaited concurrently on the loop share one response
+        key = self._request_key(endpoint, payload, headers)
+        return await self._aflight.do(key, lambda: self._arequest("GET", endpoint, payload, headers))
+
+    async def apost(self, endpoint: str, payload: dict[str, Any] = {}, headers: dict[str, Any] = {}) -> httpx.Response:
+        return await self._arequest("POST", endpoint, payload, headers)
+
+    async def aput(self, endpoint: str, payload: dict[str, Any] = {}, headers: dict[str, Any] = {}) -> httpx.Response:
+        return await self._arequest("PUT", endpoint, payload, headers)
+
+    async def adelete(self, endpoint: str, payload: dict[str, Any] = {},
+                      headers: dict[str, Any] = {}) -> httpx.Response:
+        return await self._arequest("DELETE", endpoint, payload, headers)
@@ -1,20 +1,110 @@
+import hashlib
 import json
+import time
+from contextlib import nullcontext
 from json.decoder import JSONDecodeError
-from typing import Any
+from typing import Any, Iterable
 import requests
 
 from bingX._helpers import generate_hash, generate_timestamp
 from bingX.exceptions import ClientError, InvalidMethodException, ServerError
+from bingX.single_flight import SingleFlight
+from bingX.ticks import Ticks
+
+# Market data endpoints return the same data for every account
+PUBLIC_ENDPOINT_PREFIXES = ("/openApi/swap/v2/quote/", "/openApi/swap/v3/quote/", "/openApi/spot/v1/market/")
+
+
+def _to_json(value: Any) -> str:
+    """Compact JSON in which Ticks are written as plain numbers with all their digits"""
+    if isinstance(value, Ticks):
+        return str(value)
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{json.dumps(str(k))}:{_to_json(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_to_json(v) for v in value) + "]"
+    return json.dumps(value, separators=(',', ':'))
+
+
+def set_shared_cache(cache, ttl: float, endpoints: Iterable[str]) -> None:
+    """
+    Lets identical GET requests to the given endpoints made within ttl seconds share one response across processes
+
+    :param cache: Object with get(key) and set(key, value, timeout) methods, i.e. Django cache
+    :param ttl: Seconds response is shared for
+    :param endpoints: Endpoints which responses may be shared, i.e. /openApi/swap/v2/quote/contracts
+    """
+    _HTTPManager._shared_cache = cache
+    _HTTPManager._shared_cache_ttl = ttl
+    _HTTPManager._shared_cache_endpoints = frozenset(endpoints)
+
+
+def set_base_url(url: str) -> None:
+    """
+    Sends requests of every client of the process to another host, i.e. https://open-api-vst.bingx.com for demo trading
+    or local stand-in of exchange
+
+    :param url: Scheme and host without trailing slash
+    """
+    _HTTPManager._base_url = url.rstrip("/")
+
+
+def set_transport(transport) -> None:
+    """
+    Sends requests of every client of the process through the given transport instead of directly to exchange,
+    i.e. bingX.transport.RecordingTransport or ReplayTransport, None restores direct requests
+
+    :param transport: Object with request(method, url, headers) and async arequest(method, url, headers) methods
+    """
+    _HTTPManager._transport = transport
+
+
+def set_request_observer(observer) -> None:
+    """
+    Reports every request of every client of the process, i.e. to export metrics, None stops reporting
+
+    :param observer: Callable taking method, endpoint, account, code and seconds request took. Account is short digest
+    of API key, code is 0 for successful request, HTTP status or business error code for failed one and None when
+    exchange wasn't reached
+    """
+    # Kept as staticmethod, so it isn't bound to clients as a method
+    _HTTPManager._request_observer = staticmethod(observer) if observer is not None else None
+
+
+def set_request_span(factory) -> None:
+    """
+    Makes every request of every client of the process within a context, i.e. tracing span, None stops it
+
+    :param factory: Callable taking method and endpoint and returning context manager request is made within
+    """
+    # Kept as staticmethod, so it isn't bound to clients as a method
+    _HTTPManager._request_span = staticmethod(factory) if factory is not None else None
 
 
 class _HTTPManager:
-    __BASE_URL = "https://open-api.bingx.com"
+    _base_url = "https://open-api.bingx.com"
+
+    # Optional transport requests are sent through, see set_transport
+    _transport = None
 
-    # URL for demo trading
-    # __BASE_URL = "https://open-api-vst.bingx.com"
+    # Optional callable every request is reported to, see set_request_observer
+    _request_observer = None
+
+    # Optional factory of context every request is made within, see set_request_span
+    _request_span = None
+
+    # Identical GET requests made concurrently by threads of the process share one request, see get
+    _flight = SingleFlight()
+
+    # Optional cache shared between processes, see set_shared_cache
+    _shared_cache = None
+    _shared_cache_ttl: float = 0
+    _shared_cache_endpoints: frozenset[str] = frozenset()
 
     def __init__(self, api_key: str, secret_key: str) -> None:
         self.__secret_key = secret_key
+        # Requests of different accounts are never shared, key itself isn't kept in request keys
+        self.__account_digest = hashlib.sha256(api_key.encode()).hexdigest()
         self.__session = requests.Session()
         self.__session.headers.update({'X-BX-APIKEY': api_key})
 
@@ -44,9 +134,9 @@ class _HTTPManager:
         processed_payload = {}
         for key, value in payload.items():
             if value is not None and value != "":
-                if key in ['takeProfit', 'stopLoss'] and isinstance(value, dict):
-                    # Convert nested dict to JSON string WITHOUT URL encoding
-                    json_str = json.dumps(value, separators=(',', ':'))
+                if key in ['takeProfit', 'stopLoss', 'batchOrders'] and isinstance(value, (dict, list)):
+                    # Convert nested dict or list of orders to JSON string WITHOUT URL encoding
+                    json_str = _to_json(value)
                     processed_payload[key] = json_str
                 else:
                     processed_payload[key] = value
@@ -83,42 +173,110 @@ class _HTTPManager:
         if headers:
             self.__session.headers.update(headers)
 
-        url = f"{self.__BASE_URL}{endpoint}?{self._generate_query_string(payload)}"
-
-        if method == "GET":
-            req = self.__session.get(url)
-        elif method == "POST":
-            req = self.__session.post(url)
-        elif method == "PUT":
-            req = self.__session.put(url)
-        elif method == "DELETE":
-            req = self.__session.delete(url)
-        else:
+        if method not in ("GET", "POST", "PUT", "DELETE"):
             raise InvalidMethodException(f"Invalid method used: {method}")
 
-        if req.status_code != 200:
-            raise ServerError(req.status_code, req.text)
+        url = self._url(endpoint, payload)
+        start = time.perf_counter()
+        code = None
+
+        with self._span(method, endpoint):
+            try:
+                if self._transport is not None:
+                    req = self._transport.request(method, url, dict(self.__session.headers))
+                elif method == "GET":
+                    req = self.__session.get(url)
+                elif method == "POST":
+                    req = self.__session.post(url)
+                elif method == "PUT":
+                    req = self.__session.put(url)
+                else:
+                    req = self.__session.delete(url)
+
+                self._check_response(req)
+                code = 0
+                return req
+            except (ClientError, ServerError) as e:
+                code = e.error_code
+                raise
+            finally:
+                self._observe(method, endpoint, code, start)
+
+    def _span(self, method: str, endpoint: str):
+        return nullcontext() if self._request_span is None else self._request_span(method, endpoint)
+
+    def _observe(self, method: str, endpoint: str, code: int | None, start: float) -> None:
+        if self._request_observer is not None:
+            self._request_observer(method, endpoint, self.__account_digest[:12], code, time.perf_counter() - start)
+
+    def _url(self, endpoint: str, payload: dict[str, Any]) -> str:
+        """
+        Signed url of the endpoint with the given payload
+        """
+        return f"{self._base_url}{endpoint}?{self._generate_query_string(payload)}"
+
+    def _request_key(self, endpoint: str, payload: dict[str, Any], headers: dict[str, Any]) -> str:
+        """
+        Identifies request by account, endpoint and parameters, timestamp and signature are ignored as they differ
+        between otherwise identical requests
+        """
+        owner = "" if endpoint.startswith(PUBLIC_ENDPOINT_PREFIXES) else self.__account_digest
+        params = {k: v for k, v in payload.items() if k not in ("timestamp", "signature")}
+        raw = json.dumps([owner, endpoint, params, headers], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _shared_get(self, key: str, endpoint: str, payload: dict[str, Any],
+                    headers: dict[str, Any]) -> requests.Response:
+        cache = self._shared_cache
+        if cache is None or endpoint not in self._shared_cache_endpoints:
+            return self._request("GET", endpoint, payload, headers)
+
+        cache_key = f"bingx:get:{key}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            response = requests.Response()
+            response.status_code, response._content, response.url = cached
+            response.encoding = "utf-8"
+            return response
+
+        response = self._request("GET", endpoint, payload, headers)
+        # Only successful responses get here, as errors are raised by _request
+        cache.set(cache_key, (response.status_code, response.content, response.url), self._shared_cache_ttl)
+        return response
+
+    @staticmethod
+    def _check_response(response) -> None:
+        """
+        Raises ServerError on non 200 status and ClientError on non zero business code
+
+        :param response: Response object of requests or httpx, both have the same interface for checks below
+        """
+        if response.status_code != 200:
+            raise ServerError(response.status_code, response.text)
 
         try:
-            req_json: dict[str, Any] = req.json()
+            response_json: dict[str, Any] = response.json()
         except JSONDecodeError:
-            return req
+            return
         else:
-            if req_json.get("code") is not None and req_json.get("code") != 0:
-                raise ClientError(req_json.get("code"), req_json.get("msg"))
-            return req
+            if response_json.get("code") is not None and response_json.get("code") != 0:
+                raise ClientError(response_json.get("code"), response_json.get("msg"))
 
     def get(self, endpoint: str, payload: dict[str, Any] = {}, headers: dict[str, Any] = {}) -> requests.Response:
         """
         It makes a GET request to the given endpoint with the given payload and headers
 
+        GET requests are idempotent, so identical ones made concurrently by threads of the process share one
+        response instead of each hitting the exchange
+
         :param endpoint: The endpoint you want to hit i.e. /openApi/swap/v2/trade/order
         :param payload: The data to be sent to the server
         :param headers: This is a dictionary of headers that will be sent with the request
         :return: A response object
         """
 
-        return self._request("GET", endpoint, payload, headers)
+        key = self._request_key(endpoint, payload, headers)
+        return self._flight.do(key, lambda: self._shared_get(key, endpoint, payload, headers))
 
     def post(self, endpoint: str, payload: dict[str, Any] = {}, headers: dict[str, Any] = {}) -> requests.Response:
         """
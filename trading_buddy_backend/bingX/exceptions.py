@@ -13,6 +13,11 @@ class HistoryOrderException(Exception):
     pass
 
 
+class CassetteMissError(Exception):
+    """Raised when replayed cassette has no recorded response for a request"""
+    pass
+
+
 class ClientError(Exception):
     BUISNESS_ERROR_CODES = {
         100001: "signature verification failed",
@@ -0,0 +1,73 @@
+"""
+Async counterparts of the read-only Perpetual Swap endpoints used by request handlers.
+Methods mirror the ones of sync client with the same names and return values.
+"""
+from typing import Any
+
+from bingX._async_http_manager import _AsyncHTTPManager
+
+
+class AsyncAccount:
+    def __init__(self, http_manager: _AsyncHTTPManager) -> None:
+        self.__http_manager = http_manager
+
+    async def get_details(self, recvWindow: int | None = None) -> dict[str, Any]:
+        """
+        https://bingx-api.github.io/docs/swapV2/account-api.html#_1-get-perpetual-swap-account-asset-information
+        """
+        endpoint = "/openApi/swap/v2/user/balance"
+        payload = {} if recvWindow is None else {"recvWindow": recvWindow}
+
+        response = await self.__http_manager.aget(endpoint, payload)
+        return response.json()["data"]
+
+    async def get_swap_positions(self, symbol: str | None = None,
+                                 recvWindow: int | None = None) -> list[dict[str, Any]]:
+        """
+        https://bingx-api.github.io/docs/swapV2/account-api.html#_2-perpetual-swap-positions
+        """
+        endpoint = "/openApi/swap/v2/user/positions"
+        payload = {} if symbol is None else {"symbol": symbol.upper()}
+        if recvWindow is not None:
+            payload["recvWindow"] = recvWindow
+
+        response = await self.__http_manager.aget(endpoint, payload)
+        return response.json()["data"]
+
+
+class AsyncMarket:
+    def __init__(self, http_manager: _AsyncHTTPManager) -> None:
+        self.__http_manager = http_manager
+
+    async def get_contract_info(self, symbol: str) -> dict[str, Any]:
+        """
+        https://bingx-api.github.io/docs/swapV2/market-api.html#_1-contract-information
+        """
+        endpoint = "/openApi/swap/v2/quote/contracts"
+        payload = {"symbol": symbol}
+
+        response = await self.__http_manager.aget(endpoint, payload)
+        return response.json()["data"][0]
+
+
+class AsyncTrade:
+    def __init__(self, http_manager: _AsyncHTTPManager) -> None:
+        self.__http_manager = http_manager
+
+    async def get_leverage(self, symbol: str, recvWindow: int | None = None) -> dict[str, Any]:
+        """
+        https://bingx-api.github.io/docs/swapV2/trade-api.html#_11-query-leverage
+        """
+        endpoint = "/openApi/swap/v2/trade/leverage"
+        payload = {"symbol": symbol} if recvWindow is None else {"symbol": symbol, "recvWindow": recvWindow}
+
+        response = await self.__http_manager.aget(endpoint, payload)
+        return response.json()["data"]
+
+
+class AsyncPerpetualV2:
+    def __init__(self, api_key: str, secret_key: str) -> None:
+        http_manager = _AsyncHTTPManager(api_key, secret_key)
+        self.account = AsyncAccount(http_manager)
+        self.market = AsyncMarket(http_manager)
+        self.trade = AsyncTrade(http_manager)
@@ -156,3 +156,22 @@ class Market:
 
         response = self.__http_manager.get(endpoint, payload)
         return response.json()["data"]
+
+    ##### Batched helpers, one request for all trading pairs, results are keyed by symbol #####
+    def get_latest_prices(self) -> dict[str, dict[str, Any]]:
+        """
+        Latest prices of all trading pairs
+        """
+        return {price["symbol"]: price for price in self.get_latest_price_of_trading_pair()}
+
+    def get_tickers(self) -> dict[str, dict[str, Any]]:
+        """
+        24 hour tickers of all trading pairs
+        """
+        return {ticker["symbol"]: ticker for ticker in self.get_ticker()}
+
+    def get_current_funding_rates(self) -> dict[str, dict[str, Any]]:
+        """
+        Mark prices and current funding rates of all trading pairs
+        """
+        return {rate["symbol"]: rate for rate in self.get_current_funding_rate()}
@@ -4,6 +4,7 @@ from typing import Any
 from decimal import Decimal
 
 from bingX.exceptions import OrderException
+from bingX.ticks import Ticks
 
 
 class DictMixin:
@@ -17,9 +18,9 @@ class DictMixin:
             if isinstance(value, Enum):
                 return value.value
 
-            # Handle Decimal
-            if isinstance(value, Decimal):
-                return float(value)
+            # Numbers are sent exactly as they are, float would add rounding drift and exponent notation
+            if isinstance(value, (Decimal, Ticks)):
+                return Ticks.parse(value).normalize()
 
             # Handle nested dataclasses - convert to dictionaries (not JSON strings yet)
             if is_dataclass(value):
@@ -79,16 +80,16 @@ class WorkingType(Enum):
 
 @dataclass
 class StopLossOrder(DictMixin):
-    stopPrice: Decimal
-    price: Decimal
+    stopPrice: Decimal | Ticks
+    price: Decimal | Ticks
     type: OrderType = OrderType.STOP_MARKET
     workingType: WorkingType = WorkingType.MARK_PRICE
 
 
 @dataclass
 class TakeProfitOrder(DictMixin):
-    stopPrice: Decimal
-    price: Decimal
+    stopPrice: Decimal | Ticks
+    price: Decimal | Ticks
     type: OrderType = OrderType.TAKE_PROFIT_MARKET
     workingType: WorkingType = WorkingType.MARK_PRICE
 
@@ -100,10 +101,10 @@ class Order(DictMixin):
     positionSide: PositionSide
     takeProfit: TakeProfitOrder | None = None
     stopLoss: StopLossOrder | None = None
-    quantity: Decimal | None = None
+    quantity: Decimal | Ticks | None = None
     type: OrderType = OrderType.MARKET
-    price: Decimal | None = None
-    stopPrice: Decimal | None = None
+    price: Decimal | Ticks | None = None
+    stopPrice: Decimal | Ticks | None = None
     workingType: WorkingType = WorkingType.CONTRACT_PRICE
     recvWindow: int | None = None
 
@@ -0,0 +1,138 @@
+from decimal import Decimal, ROUND_DOWN
+from functools import total_ordering
+from typing import Union
+
+Number = Union['Ticks', Decimal, int, str]
+
+_POW10 = [10 ** i for i in range(40)]
+
+
+def _pow10(digits: int) -> int:
+    return _POW10[digits] if digits < len(_POW10) else 10 ** digits
+
+
+@total_ordering
+class Ticks:
+    """
+    Fixed-point number: integer amount of ticks of 10^-scale size, i.e. Ticks(1830, 3) is 1.830.
+    Prices and quantities are kept in ticks of contract precision, so arithmetic on them is exact integer arithmetic,
+    and they are sent to exchange exactly as they are, without going through float.
+    """
+    __slots__ = ('value', 'scale')
+
+    def __init__(self, value: int, scale: int = 0):
+        self.value = value
+        self.scale = scale
+
+    @classmethod
+    def parse(cls, number: Number) -> 'Ticks':
+        """Exact conversion, scale is the number of digits after decimal point"""
+        if isinstance(number, Ticks):
+            return number
+        if isinstance(number, int):
+            return cls(number, 0)
+        if isinstance(number, float):
+            raise TypeError('Floats are not converted to ticks implicitly, pass str(number) if it is intended')
+
+        number = Decimal(number)
+        if not number.is_finite():
+            raise ValueError(f'Can not convert {number} to ticks')
+        scale = max(-number.as_tuple().exponent, 0)
+        return cls(int(number.scaleb(scale)), scale)
+
+    @classmethod
+    def from_decimal(cls, number: Number, scale: int, rounding: str = ROUND_DOWN) -> 'Ticks':
+        """Conversion into ticks of given scale, rounded with Decimal rounding mode, ROUND_DOWN truncates"""
+        if isinstance(number, Ticks):
+            return number.rescale(scale, rounding)
+        return cls(int(Decimal(number).scaleb(scale).to_integral_value(rounding=rounding)), scale)
+
+    def rescale(self, scale: int, rounding: str = ROUND_DOWN) -> 'Ticks':
+        if scale >= self.scale:
+            return Ticks(self.value * _pow10(scale - self.scale), scale)
+        if rounding == ROUND_DOWN:
+            divisor = _pow10(self.scale - scale)
+            # Integer division floors, ROUND_DOWN truncates towards zero
+            value = abs(self.value) // divisor
+            return Ticks(value if self.value >= 0 else -value, scale)
+        return Ticks.from_decimal(self.to_decimal(), scale, rounding)
+
+    def normalize(self) -> 'Ticks':
+        """The same number with trailing zeros after decimal point dropped"""
+        value, scale = self.value, self.scale
+        while scale > 0 and value % 10 == 0:
+            value //= 10
+            scale -= 1
+        return Ticks(value, scale)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.value).scaleb(-self.scale)
+
+    def _aligned(self, other: Number) -> tuple[int, int, int]:
+        """Values of self and other in ticks of the finer of their scales, and that scale"""
+        other = Ticks.parse(other)
+        if self.scale == other.scale:
+            return self.value, other.value, self.scale
+        if self.scale > other.scale:
+            return self.value, other.value * _pow10(self.scale - other.scale), self.scale
+        return self.value * _pow10(other.scale - self.scale), other.value, other.scale
+
+    def __add__(self, other: Number) -> 'Ticks':
+        a, b, scale = self._aligned(other)
+        return Ticks(a + b, scale)
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Number) -> 'Ticks':
+        a, b, scale = self._aligned(other)
+        return Ticks(a - b, scale)
+
+    def __rsub__(self, other: Number) -> 'Ticks':
+        a, b, scale = self._aligned(other)
+        return Ticks(b - a, scale)
+
+    def __mul__(self, other: Number) -> 'Ticks':
+        other = Ticks.parse(other)
+        return Ticks(self.value * other.value, self.scale + other.scale)
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> 'Ticks':
+        return Ticks(-self.value, self.scale)
+
+    def __abs__(self) -> 'Ticks':
+        return Ticks(abs(self.value), self.scale)
+
+    def __bool__(self) -> bool:
+        return self.value != 0
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Ticks, Decimal, int)):
+            return NotImplemented
+        a, b, _ = self._aligned(other)
+        return a == b
+
+    def __lt__(self, other) -> bool:
+        if not isinstance(other, (Ticks, Decimal, int)):
+            return NotImplemented
+        a, b, _ = self._aligned(other)
+        return a < b
+
+    def __hash__(self) -> int:
+        # Equal numbers of different scales have the same hash, as Decimals do
+        return hash(self.to_decimal())
+
+    def __float__(self) -> float:
+        return self.value / _pow10(self.scale)
+
+    def __str__(self) -> str:
+        """Plain notation with all digits of the scale, never exponent one"""
+        sign = '-' if self.value < 0 else ''
+        digits = str(abs(self.value))
+        if self.scale == 0:
+            return sign + digits
+        digits = digits.rjust(self.scale + 1, '0')
+        return f'{sign}{digits[:-self.scale]}.{digits[-self.scale:]}'
+
+    def __repr__(self) -> str:
+        return f"Ticks('{self}')"
@@ -0,0 +1,219 @@
+"""
+Pluggable transports of BingX clients, see set_transport:
+ - RecordingTransport sends requests to exchange and appends every request with its response to cassette;
+ - ReplayTransport serves responses from cassette without exchange, with optional latency injection.
+Cassette is JSON lines file, gzipped when its name ends with .gz, in which case every line is a gzip member of its own,
+so processes recording into the same cassette append whole lines under file lock without corrupting it.
+API keys are kept only as short digests which tell accounts apart, while signatures, timestamps and listen keys
+are not stored at all.
+"""
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Mapping
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+
+from bingX.exceptions import CassetteMissError
+
+# Parameters which differ between otherwise identical requests, or are secret
+VOLATILE_PARAMS = frozenset({"timestamp", "signature", "recvWindow"})
+SECRET_PARAMS = frozenset({"listenKey"})
+REDACTED = "redacted"
+
+
+def _account(headers: Mapping[str, Any]) -> str:
+    api_key = next((value for name, value in headers.items() if name.lower() == "x-bx-apikey"), "")
+    return hashlib.sha256(str(api_key).encode()).hexdigest()[:12] if api_key else ""
+
+
+def _split(url: str) -> tuple[str, dict[str, str]]:
+    """Endpoint and parameters of signed url, without volatile and with secret ones redacted"""
+    parts = urlsplit(url)
+    params = {
+        key: REDACTED if key in SECRET_PARAMS else value
+        for key, value in parse_qsl(parts.query, keep_blank_values=True) if key not in VOLATILE_PARAMS
+    }
+    return parts.path, params
+
+
+def _redact_body(body: str) -> str:
+    # Other bodies are stored as they are, as reencoding could change digits of numbers
+    if not any(f'"{key}"' in body for key in SECRET_PARAMS):
+        return body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+
+    def redact(value):
+        if isinstance(value, dict):
+            return {k: REDACTED if k in SECRET_PARAMS else redact(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [redact(v) for v in value]
+        return value
+
+    return json.dumps(redact(data), separators=(",", ":"))
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + "t", encoding="utf-8") if str(path).endswith(".gz") else open(path, mode,
+                                                                                                encoding="utf-8")
+
+
+class Transport:
+    """Sends signed request, url already has all parameters and signature in it"""
+
+    def request(self, method: str, url: str, headers: Mapping[str, Any]) -> requests.Response:
+        raise NotImplementedError
+
+    async def arequest(self, method: str, url: str, headers: Mapping[str, Any]) -> httpx.Response:
+        response = await asyncio.to_thread(self.request, method, url, headers)
+        return httpx.Response(response.status_code, content=response.content,
+                              request=httpx.Request(method, url))
+
+
+class RecordingTransport(Transport):
+    def __init__(self, path: str, session: requests.Session | None = None):
+        """
+        :param path: Cassette interactions are appended to, it's created if missing. Several processes, i.e. web
+        workers forked after transport is set, may record into the same cassette
+        :param session: Session requests are sent with
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def _append(self, line: str) -> None:
+        data = line.encode("utf-8")
+        if str(self.path).endswith(".gz"):
+            data = gzip.compress(data)
+
+        with self._lock:
+            # Handle is opened once per process, forked process opens its own instead of sharing inherited offset
+            if self._file is None or self._pid != os.getpid():
+                self._file = open(self.path, "ab", buffering=0)
+                self._pid = os.getpid()
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                self._file.write(data)
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+
+    def request(self, method: str, url: str, headers: Mapping[str, Any]) -> requests.Response:
+        start = time.perf_counter()
+        response = self._session.request(method, url, headers=dict(headers))
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        endpoint, params = _split(url)
+        interaction = {"m": method, "e": endpoint, "p": params, "a": _account(headers),
+                       "s": response.status_code, "b": _redact_body(response.text), "t": elapsed_ms}
+        self._append(json.dumps(interaction, separators=(",", ":"), sort_keys=True) + "\n")
+        return response
+
+
+class ReplayTransport(Transport):
+    def __init__(self, path: str, latency: float | None = 0.0, jitter: float = 0.0, seed: int = 0):
+        """
+        Request is answered with the first not yet served recording of the same request, the last one is repeated
+        once all are served. Request made with other parameters, i.e. time range of orders history, falls back
+        to recordings of the same endpoint and account, and then to ones of the endpoint. Every recording is served
+        once whichever way it's matched, the loose ones don't serve it again.
+
+        :param path: Recorded cassette
+        :param latency: Seconds every response is delayed by, None replays recorded durations
+        :param jitter: Up to that many seconds are added to latency, the same seed gives the same delays
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Queues hold indexes of interactions, which are left in other queues once served and skipped there
+        self._interactions: list[dict] = []
+        self._consumed: list[bool] = []
+        self._queues: dict[tuple, deque] = defaultdict(deque)
+        self._last: dict[tuple, dict] = {}
+        self.served = 0
+
+        with _open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    for key in self._keys(interaction["m"], interaction["e"], interaction["p"], interaction["a"]):
+                        self._queues[key].append(len(self._interactions))
+                    self._interactions.append(interaction)
+                    self._consumed.append(False)
+
+    @staticmethod
+    def _keys(method: str, endpoint: str, params: dict, account: str) -> tuple[tuple, ...]:
+        """Keys from exact to loose"""
+        return (
+            (method, endpoint, account, tuple(sorted(params.items()))),
+            (method, endpoint, account),
+            (method, endpoint),
+        )
+
+    def _interaction(self, method: str, url: str, headers: Mapping[str, Any]) -> dict:
+        endpoint, params = _split(url)
+        with self._lock:
+            for key in self._keys(method, endpoint, params, _account(headers)):
+                queue = self._queues.get(key)
+                while queue and self._consumed[queue[0]]:
+                    queue.popleft()
+                if queue:
+                    index = queue.popleft()
+                    self._consumed[index] = True
+                    interaction = self._interactions[index]
+                    # It's the last served recording of all its keys, i.e. of exact request when matched loosely
+                    for served_key in self._keys(interaction["m"], interaction["e"], interaction["p"],
+                                                 interaction["a"]):
+                        self._last[served_key] = interaction
+                    break
+                if key in self._last:
+                    interaction = self._last[key]
+                    break
+            else:
+                raise CassetteMissError(f"No recorded response for {method} {endpoint} {params}")
+
+            self.served += 1
+            delay = interaction.get("t", 0) / 1000 if self.latency is None else self.latency
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+        return {**interaction, "delay": delay}
+
+    def request(self, method: str, url: str, headers: Mapping[str, Any]) -> requests.Response:
+        interaction = self._interaction(method, url, headers)
+        if interaction["delay"]:
+            time.sleep(interaction["delay"])
+
+        response = requests.Response()
+        response.status_code = interaction["s"]
+        response._content = interaction["b"].encode()
+        response.encoding = "utf-8"
+        response.url = url
+        return response
+
+    async def arequest(self, method: str, url: str, headers: Mapping[str, Any]) -> httpx.Response:
+        interaction = self._interaction(method, url, headers)
+        if interaction["delay"]:
+            await asyncio.sleep(interaction["delay"])
+        return httpx.Response(interaction["s"], content=interaction["b"].encode(),
+                              request=httpx.Request(method, url))
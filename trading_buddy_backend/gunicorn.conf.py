@@ -0,0 +1,38 @@
+# Gunicorn picks this file up from working directory.
+# SERVER_MODE=asgi runs Django as ASGI app under uvicorn workers, so async views can serve other requests
+# while waiting for exchange, otherwise classic sync WSGI workers are used
+import os
+import shutil
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+if server_mode == 'asgi':
+    wsgi_app = 'trading_buddy_backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'trading_buddy_backend.wsgi:application'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Files of metrics left by workers of previous run would be aggregated with ones of new workers
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+def child_exit(server, worker):
+    # With PROMETHEUS_MULTIPROC_DIR metrics of workers are aggregated from files, ones of exited workers are dropped
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
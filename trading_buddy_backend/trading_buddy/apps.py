@@ -1,7 +1,53 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class TradingBuddyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trading_buddy'
 
+    def ready(self):
+        import bingX
+
+        from .services import profiling
+
+        bingX.set_base_url(settings.BINGX_REST_URL)
+        bingX.set_request_observer(self._observe_bingx_request)
+        profiling.install()
+
+        if settings.TRACING:
+            from .services import tracing
+
+            tracing.configure(settings.TRACING, settings.TRACING_SAMPLE_RATE, settings.TRACING_SERVICE_NAME,
+                              file_path=settings.TRACING_FILE, otlp_endpoint=settings.TRACING_OTLP_ENDPOINT)
+            bingX.set_request_span(tracing.request_span)
+
+        if settings.BINGX_TRANSPORT:
+            bingX.set_transport(self._bingx_transport())
+
+        if settings.EXCHANGE_SHARED_GET_TTL > 0:
+            from django.core.cache import caches
+
+            bingX.set_shared_cache(caches[settings.EXCHANGE_CACHE_ALIAS], settings.EXCHANGE_SHARED_GET_TTL,
+                                   settings.EXCHANGE_SHARED_GET_ENDPOINTS)
+
+    @staticmethod
+    def _observe_bingx_request(*args):
+        from .services import metrics, profiling
+
+        metrics.observe_bingx_request(*args)
+        profiling.observe_bingx_request(*args)
+
+    @staticmethod
+    def _bingx_transport():
+        from bingX.transport import RecordingTransport, ReplayTransport
+
+        if settings.BINGX_TRANSPORT == 'record':
+            return RecordingTransport(settings.BINGX_CASSETTE)
+        if settings.BINGX_TRANSPORT == 'replay':
+            latency = settings.BINGX_REPLAY_LATENCY_MS
+            return ReplayTransport(settings.BINGX_CASSETTE,
+                                   latency=None if latency == 'recorded' else float(latency) / 1000,
+                                   jitter=settings.BINGX_REPLAY_JITTER_MS / 1000)
+        raise ImproperlyConfigured(f"Unknown BINGX_TRANSPORT: {settings.BINGX_TRANSPORT}, use record or replay")
@@ -0,0 +1,429 @@
+"""
+Local stand-in of BingX used by benchmarks and view tests: REST endpoints order management and market data of
+position views rely on, and @lastPrice market stream.
+It keeps orders and positions of accounts in memory, keyed by API key, fills entry orders on demand and counts every
+request it serves, so benchmarks can tell how many exchange calls each code path makes.
+Only the fields the app reads are emulated, signatures are not checked.
+"""
+import base64
+import gzip
+import hashlib
+import itertools
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+ENTRY_TYPES = ('LIMIT', 'TRIGGER_LIMIT')
+
+
+class FakeBingX:
+    def __init__(self, symbols: dict[str, Decimal], tick_rate: float = 10.0, latency: float = 0.0,
+                 quantity_precision: int = 3, price_precision: int = 2, max_leverage: int = 100):
+        """
+        :param symbols: Prices symbols start from, they random walk in market stream
+        :param tick_rate: @lastPrice updates per second pushed to every subscribed connection
+        :param latency: Seconds every REST response is delayed by, to emulate round trip to exchange
+        """
+        self.prices = dict(symbols)
+        self.tick_rate = tick_rate
+        self.latency = latency
+        self.quantity_precision = quantity_precision
+        self.price_precision = price_precision
+        self.max_leverage = max_leverage
+
+        self.orders: dict[str, dict[int, dict]] = {}  # api key -> order id -> order
+        self.positions: dict[str, dict[str, dict]] = {}  # api key -> symbol -> position
+        self.history: dict[str, list[dict]] = {}  # api key -> filled and cancelled orders
+
+        self.calls = Counter()  # (method, path) -> number of requests
+        self.ticks_sent = 0
+        self.ws_connections = 0
+        self._streaming = threading.Event()
+
+        self._ids = itertools.count(1_000_000)
+        self._lock = threading.Lock()
+        self._http = None
+        self._ws = None
+
+    ##### LIFECYCLE #####
+    def start(self) -> 'FakeBingX':
+        self._streaming.set()
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), _make_rest_handler(self))
+        self._http.daemon_threads = True
+        self._ws = _ThreadingTCPServer(('127.0.0.1', 0), _make_ws_handler(self))
+        for server in (self._http, self._ws):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in (self._http, self._ws):
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def stop_market_stream(self):
+        """Stops market stream and disconnects its clients"""
+        self._streaming.clear()
+        if self._ws is not None:
+            self._ws.shutdown()
+            self._ws.server_close()
+            self._ws = None
+
+    @property
+    def rest_url(self) -> str:
+        return f'http://127.0.0.1:{self._http.server_address[1]}'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://127.0.0.1:{self._ws.server_address[1]}/swap-market'
+
+    def snapshot_calls(self) -> Counter:
+        with self._lock:
+            return Counter(self.calls)
+
+    ##### EXCHANGE STATE #####
+    def fill_entry_orders(self) -> int:
+        """
+        Fills every open entry order at its price: position is opened and attached stop-loss and take-profit
+        become open orders bound to it, as BingX does.
+        :return: Number of filled orders
+        """
+        filled = 0
+        with self._lock:
+            for api_key, orders in self.orders.items():
+                for order in [order for order in orders.values() if order['type'] in ENTRY_TYPES]:
+                    del orders[order['orderId']]
+                    position_id = next(self._ids)
+                    self.positions.setdefault(api_key, {})[order['symbol']] = {
+                        'symbol': order['symbol'],
+                        'positionId': str(position_id),
+                        'positionSide': order['positionSide'],
+                        'positionAmt': order['origQty'],
+                        'availableAmt': order['origQty'],
+                        'avgPrice': order['price'],
+                        'markPrice': order['price'],
+                        'leverage': 10,
+                        'unrealizedProfit': '0',
+                        'realisedProfit': '0',
+                        'initialMargin': '0',
+                    }
+                    self.history.setdefault(api_key, []).append(
+                        {**order, 'status': 'FILLED', 'positionID': position_id, 'executedQty': order['origQty'],
+                         'profit': '0', 'commission': '0'})
+
+                    exit_side = 'SELL' if order['side'] == 'BUY' else 'BUY'
+                    for attached, order_type in (('stopLoss', 'STOP_MARKET'), ('takeProfit', 'TAKE_PROFIT_MARKET')):
+                        if order.get(attached):
+                            self._add_order(api_key, {
+                                'symbol': order['symbol'], 'side': exit_side, 'positionSide': order['positionSide'],
+                                'type': order_type, 'origQty': order['origQty'],
+                                'stopPrice': str(order[attached]['stopPrice']), 'positionID': position_id,
+                            })
+                    filled += 1
+        return filled
+
+    def close_positions(self, share: float) -> int:
+        """
+        Closes given share of open positions by their stop-losses, leaving closing orders in orders history.
+        :return: Number of closed positions
+        """
+        closed = 0
+        with self._lock:
+            for api_key, positions in self.positions.items():
+                for symbol in list(positions)[:int(len(positions) * share)]:
+                    position = positions.pop(symbol)
+                    position_id = int(position['positionId'])
+                    orders = self.orders.get(api_key, {})
+                    for order in [order for order in orders.values() if order['positionID'] == position_id]:
+                        del orders[order['orderId']]
+                    self.history[api_key].append({
+                        'orderId': next(self._ids), 'symbol': symbol, 'type': 'STOP_MARKET', 'status': 'FILLED',
+                        'positionID': position_id, 'executedQty': position['availableAmt'],
+                        'profit': '-10', 'commission': '-0.5',
+                    })
+                    closed += 1
+        return closed
+
+    def _add_order(self, api_key: str, order: dict) -> dict:
+        order = {'orderId': next(self._ids), 'status': 'NEW', 'positionID': 0, 'price': '0', 'stopPrice': '0',
+                 'time': int(time.time() * 1000), **order}
+        self.orders.setdefault(api_key, {})[order['orderId']] = order
+        return order
+
+    def next_price(self, symbol: str) -> Decimal:
+        """Random walk of price by up to 0.05% per tick"""
+        with self._lock:
+            price = self.prices[symbol] * Decimal(1 + random.uniform(-0.0005, 0.0005))
+            price = price.quantize(Decimal(1).scaleb(-self.price_precision))
+            self.prices[symbol] = price
+            return price
+
+    ##### REST #####
+    def handle_rest(self, method: str, path: str, params: dict[str, str], api_key: str) -> tuple[int, dict]:
+        with self._lock:
+            self.calls[(method, path)] += 1
+
+        route = _ROUTES.get((method, path))
+        if route is None:
+            return 404, {'code': 100400, 'msg': f'{method} {path} is not emulated'}
+
+        with self._lock:
+            return 200, {'code': 0, 'msg': '', 'data': route(self, params, api_key)}
+
+    def _by_symbol(self, params, row):
+        """Row of the symbol when it's given, otherwise rows of all symbols, as quote endpoints of BingX answer"""
+        if 'symbol' in params:
+            return row(params['symbol'], self.prices[params['symbol']]) if params['symbol'] in self.prices else {}
+        return [row(symbol, price) for symbol, price in self.prices.items()]
+
+    def _price(self, params, api_key):
+        return self._by_symbol(params, lambda symbol, price: {'symbol': symbol, 'price': str(price)})
+
+    def _ticker(self, params, api_key):
+        return self._by_symbol(params, lambda symbol, price: {
+            'symbol': symbol, 'lastPrice': str(price), 'priceChangePercent': '0', 'highPrice': str(price),
+            'lowPrice': str(price), 'quoteVolume': '0',
+        })
+
+    def _premium_index(self, params, api_key):
+        return self._by_symbol(params, lambda symbol, price: {
+            'symbol': symbol, 'markPrice': str(price), 'lastFundingRate': '0', 'nextFundingTime': 0,
+        })
+
+    def _contracts(self, params, api_key):
+        symbols = [params['symbol']] if 'symbol' in params else list(self.prices)
+        return [{'symbol': symbol, 'quantityPrecision': self.quantity_precision,
+                 'pricePrecision': self.price_precision} for symbol in symbols if symbol in self.prices]
+
+    def _balance(self, params, api_key):
+        return {'balance': {'asset': 'USDT', 'balance': '10000', 'equity': '10000', 'unrealizedProfit': '0',
+                            'realisedProfit': '0', 'availableMargin': '10000', 'usedMargin': '0'}}
+
+    def _positions(self, params, api_key):
+        positions = self.positions.get(api_key, {})
+        if 'symbol' in params:
+            return [positions[params['symbol']]] if params['symbol'] in positions else []
+        return list(positions.values())
+
+    def _open_orders(self, params, api_key):
+        orders = self.orders.get(api_key, {}).values()
+        return {'orders': [dict(order) for order in orders if params.get('symbol', order['symbol']) == order['symbol']]}
+
+    def _create_order(self, params, api_key):
+        order = {key: params[key] for key in ('symbol', 'side', 'positionSide', 'type') if key in params}
+        order['origQty'] = params.get('quantity', '0')
+        order['price'] = params.get('price', '0')
+        order['stopPrice'] = params.get('stopPrice', '0')
+        for attached in ('stopLoss', 'takeProfit'):
+            if attached in params:
+                order[attached] = json.loads(params[attached])
+
+        # Exit orders are bound to open position of the symbol
+        position = self.positions.get(api_key, {}).get(order.get('symbol'))
+        if order.get('type') not in ENTRY_TYPES and position is not None:
+            order['positionID'] = int(position['positionId'])
+        return {'order': dict(self._add_order(api_key, order))}
+
+    def _cancel_order(self, params, api_key):
+        order = self.orders.get(api_key, {}).pop(int(params.get('orderId', 0)), None)
+        if order is None:
+            return {}
+        self.history.setdefault(api_key, []).append(
+            {**order, 'status': 'CANCELLED', 'executedQty': '0', 'profit': '0', 'commission': '0'})
+        return {'order': order}
+
+    def _orders_history(self, params, api_key):
+        history = self.history.get(api_key, [])
+        return {'orders': [dict(order) for order in history if params.get('symbol', order['symbol']) == order['symbol']]}
+
+    def _leverage(self, params, api_key):
+        return {'longLeverage': 10, 'shortLeverage': 10, 'maxLongLeverage': self.max_leverage,
+                'maxShortLeverage': self.max_leverage}
+
+    def _ok(self, params, api_key):
+        return {}
+
+
+_ROUTES = {
+    ('GET', '/openApi/swap/v2/quote/contracts'): FakeBingX._contracts,
+    ('GET', '/openApi/swap/v2/quote/price'): FakeBingX._price,
+    ('GET', '/openApi/swap/v2/quote/ticker'): FakeBingX._ticker,
+    ('GET', '/openApi/swap/v2/quote/premiumIndex'): FakeBingX._premium_index,
+    ('GET', '/openApi/swap/v2/user/balance'): FakeBingX._balance,
+    ('GET', '/openApi/swap/v2/user/positions'): FakeBingX._positions,
+    ('GET', '/openApi/swap/v2/trade/openOrders'): FakeBingX._open_orders,
+    ('POST', '/openApi/swap/v2/trade/order'): FakeBingX._create_order,
+    ('DELETE', '/openApi/swap/v2/trade/order'): FakeBingX._cancel_order,
+    ('GET', '/openApi/swap/v2/trade/allOrders'): FakeBingX._orders_history,
+    ('GET', '/openApi/swap/v2/trade/leverage'): FakeBingX._leverage,
+    ('POST', '/openApi/swap/v2/trade/leverage'): FakeBingX._leverage,
+    ('POST', '/openApi/swap/v2/trade/marginType'): FakeBingX._ok,
+}
+
+
+def _make_rest_handler(exchange: FakeBingX):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, as requests session and httpx client of the app reuse connections
+        protocol_version = 'HTTP/1.1'
+
+        def _handle(self):
+            url = urlsplit(self.path)
+            params = dict(parse_qsl(url.query, keep_blank_values=True))
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+
+            if exchange.latency:
+                time.sleep(exchange.latency)
+
+            status, body = exchange.handle_rest(self.command, url.path, params, self.headers.get('X-BX-APIKEY', ''))
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+##### MARKET STREAM #####
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _ws_frame(payload: bytes, opcode: int) -> bytes:
+    """Unmasked frame, as server frames are"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _read_exact(sock: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed')
+        data += chunk
+    return data
+
+
+def _read_ws_frame(sock: socket.socket) -> tuple[int, bytes]:
+    """Reads masked client frame, fragmentation isn't supported as the app doesn't fragment messages"""
+    first, second = _read_exact(sock, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', _read_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _read_exact(sock, 8))[0]
+    mask = _read_exact(sock, 4) if second & 0x80 else b'\0\0\0\0'
+    payload = _read_exact(sock, length)
+    return first & 0x0F, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+def _make_ws_handler(exchange: FakeBingX):
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            sock = self.request
+            if not self._handshake(sock):
+                return
+
+            with exchange._lock:
+                exchange.ws_connections += 1
+
+            subscribed = threading.Event()
+            closed = threading.Event()
+            symbol = []
+            send_lock = threading.Lock()
+
+            def send(payload: bytes, opcode: int = 0x2):
+                with send_lock:
+                    sock.sendall(_ws_frame(payload, opcode))
+
+            def read():
+                try:
+                    while not closed.is_set():
+                        opcode, payload = _read_ws_frame(sock)
+                        if opcode == 0x8:
+                            break
+                        if opcode == 0x9:
+                            send(payload, 0xA)
+                        elif opcode == 0x1 and payload != b'Pong':
+                            data_type = json.loads(payload).get('dataType', '')
+                            symbol.append(data_type.split('@')[0])
+                            subscribed.set()
+                except (ConnectionError, OSError, ValueError):
+                    pass
+                closed.set()
+
+            threading.Thread(target=read, daemon=True).start()
+
+            try:
+                subscribed.wait(10)
+                interval = 1 / exchange.tick_rate if exchange.tick_rate > 0 else None
+                next_ping = time.monotonic() + 5
+                while not closed.is_set() and exchange._streaming.is_set() and symbol and interval:
+                    price = exchange.next_price(symbol[0])
+                    message = {'code': 0, 'dataType': f'{symbol[0]}@lastPrice',
+                               'data': {'e': 'lastPriceUpdate', 'E': int(time.time() * 1000), 's': symbol[0],
+                                        'c': str(price)}}
+                    send(gzip.compress(json.dumps(message).encode()))
+                    with exchange._lock:
+                        exchange.ticks_sent += 1
+
+                    # BingX asks clients to answer Ping with Pong
+                    if time.monotonic() >= next_ping:
+                        send(gzip.compress(b'Ping'))
+                        next_ping = time.monotonic() + 5
+                    closed.wait(interval)
+            except OSError:
+                pass
+            finally:
+                closed.set()
+                try:
+                    sock.sendall(_ws_frame(b'', 0x8))
+                except OSError:
+                    pass
+
+        @staticmethod
+        def _handshake(sock: socket.socket) -> bool:
+            request = b''
+            while b'\r\n\r\n' not in request:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    return False
+                request += chunk
+
+            headers = dict(line.split(': ', 1) for line in request.decode().split('\r\n')[1:] if ': ' in line)
+            key = next((value for name, value in headers.items() if name.lower() == 'sec-websocket-key'), None)
+            if key is None:
+                return False
+
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            sock.sendall(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                          f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+            return True
+
+    return Handler
@@ -0,0 +1,328 @@
+"""
+Benchmark of order management hot paths against local BingX stand-in (fake_bingx.py):
+ - placing: place_open_order for every position of every account, optionally from several threads;
+ - listening: BingXPriceListener per pending position, fed with @lastPrice ticks at configured rate;
+ - polling: OrderPoller cycles over all accounts after entry orders are filled and some positions are closed.
+Each phase reports throughput, latency percentiles, REST calls by endpoint and DB queries.
+Accounts and positions are created in the database the benchmark is given, benchmark command uses a test one.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+import bingX
+from ..models import Account, Position, User
+from ..services.exchanges.exchanges import BingXExc
+from ..services.exchanges.listeners import BingXPriceListener
+from ..services.exchanges.pollers import OrderPoller
+from .fake_bingx import FakeBingX
+
+QUANTITY_PRECISION = 3
+PRICE_PRECISION = 2
+
+# Stand-in has its own contracts and balances, so they must not be cached in, or read from, caches of the app
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+    settings.STATS_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                 'LOCATION': 'benchmark-stats'},
+    settings.EXCHANGE_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                    'LOCATION': 'benchmark-exchange'},
+}
+
+
+@dataclass
+class BenchmarkConfig:
+    accounts: int = 5
+    positions: int = 5  # per account, each on its own symbol
+    tick_rate: float = 10.0  # @lastPrice updates per second per listener
+    listen_seconds: float = 10.0
+    check_interval: float | None = None  # seconds between cancel checks of listener, None keeps listener's own
+    poll_cycles: int = 5
+    close_share: float = 0.2  # share of positions closed on exchange after the first poll cycle
+    concurrency: int = 1  # threads placing orders
+    latency: float = 0.0  # seconds added to every REST response
+
+
+def percentiles(samples: list[float]) -> dict[str, float | None]:
+    """Milliseconds percentiles of durations in seconds"""
+    if not samples:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    ms = np.asarray(samples) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {'p50': round(float(p50), 3), 'p90': round(float(p90), 3), 'p99': round(float(p99), 3),
+            'max': round(float(ms.max()), 3)}
+
+
+class QueryCounter:
+    """Counts queries and their time on connections of all threads, connections opened later included"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.queries += 1
+                self.seconds += elapsed
+
+    def _install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def start(self):
+        connection_created.connect(self._install, weak=False)
+        for conn in connections.all(initialized_only=True):
+            self._install(None, conn)
+
+    def stop(self):
+        connection_created.disconnect(self._install)
+
+    def snapshot(self) -> tuple[int, float]:
+        with self._lock:
+            return self.queries, self.seconds
+
+
+class _Phase:
+    """Difference of REST calls and DB queries between start and end of a phase"""
+
+    def __init__(self, fake: FakeBingX, queries: QueryCounter):
+        self.fake, self.queries = fake, queries
+
+    def __enter__(self):
+        self._calls = self.fake.snapshot_calls()
+        self._queries = self.queries.snapshot()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        calls = self.fake.snapshot_calls()
+        calls.subtract(self._calls)
+        self.rest_calls = {f'{method} {path}': count for (method, path), count in sorted(calls.items()) if count}
+        queries, query_seconds = self.queries.snapshot()
+        self.db_queries = queries - self._queries[0]
+        self.db_seconds = query_seconds - self._queries[1]
+
+    @property
+    def total_rest_calls(self) -> int:
+        return sum(self.rest_calls.values())
+
+
+class _ThreadConnections:
+    """Closes DB connections opened by worker threads, which Django leaves open when threads finish"""
+
+    def __init__(self):
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def track(self):
+        with self._lock:
+            if connection not in self._connections:
+                self._connections.append(connection)
+
+    def close(self):
+        for conn in self._connections:
+            conn.inc_thread_sharing()
+            try:
+                conn.close()
+            finally:
+                conn.dec_thread_sharing()
+        self._connections.clear()
+
+
+class _TimedPriceListener(BingXPriceListener):
+    def __init__(self, tool, exchange, check_interval: float | None = None):
+        super().__init__(tool, exchange)
+        if check_interval is not None:
+            self.check_interval = check_interval
+        self.message_seconds: list[float] = []
+        self.check_seconds: list[float] = []
+
+    def on_message(self, ws, message):
+        start = time.perf_counter()
+        super().on_message(ws, message)
+        self.message_seconds.append(time.perf_counter() - start)
+
+    def check_price_for_order_cancellation(self, price):
+        last_check = self._last_check_time
+        start = time.perf_counter()
+        super().check_price_for_order_cancellation(price)
+        # Checks skipped by throttling aren't counted
+        if self._last_check_time != last_check:
+            self.check_seconds.append(time.perf_counter() - start)
+
+    def listen_for_events(self):
+        try:
+            super().listen_for_events()
+        finally:
+            connection.close()
+
+
+def symbols(count: int) -> dict[str, Decimal]:
+    return {f'BENCH{i}-USDT': Decimal(100 + i) for i in range(count)}
+
+
+def create_accounts(count: int) -> list[Account]:
+    accounts = []
+    for i in range(count):
+        user = User.objects.create_user(username=f'benchmark{i}', email=f'benchmark{i}@example.com',
+                                        deposit=Decimal(10000))
+        account = Account.objects.create(user=user, name='Benchmark', exchange=Account.Exchange.BINGX,
+                                         api_key=f'benchmark-key-{i}', secret_key='benchmark-secret',
+                                         risk_percent=Decimal(1))
+        user.current_account = account
+        user.save(update_fields=['current_account'])
+        accounts.append(account)
+    return accounts
+
+
+def _order_prices(price: Decimal) -> tuple[Decimal, Decimal, list[Decimal]]:
+    """Pending long below market, so neither its take-profit nor fill is reached by random walk of a few ticks"""
+    tick = Decimal(1).scaleb(-PRICE_PRECISION)
+    entry = (price * Decimal('0.99')).quantize(tick)
+    stop = (entry * Decimal('0.98')).quantize(tick)
+    return entry, stop, [(entry * (1 + Decimal('0.03') * k)).quantize(tick) for k in (1, 2, 3)]
+
+
+def bench_placing(fake: FakeBingX, queries: QueryCounter, accounts: list[Account], config: BenchmarkConfig) -> dict:
+    jobs = [(BingXExc(account), symbol, price) for account in accounts
+            for symbol, price in symbols(config.positions).items()]
+    workers = _ThreadConnections()
+
+    def place(job) -> tuple[float, bool]:
+        exc, symbol, price = job
+        workers.track()
+        entry, stop, take_profits = _order_prices(price)
+        start = time.perf_counter()
+        success, _ = exc.place_open_order(symbol, Decimal(0), entry, stop, take_profits, 1, None, 10, Decimal(1))
+        return time.perf_counter() - start, success
+
+    with _Phase(fake, queries) as phase:
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+            results = list(executor.map(place, jobs))
+    workers.close()
+
+    return {
+        'orders': len(jobs),
+        'failed': sum(not success for _, success in results),
+        'seconds': round(phase.seconds, 3),
+        'orders_per_second': round(len(jobs) / phase.seconds, 2),
+        'latency_ms': percentiles([seconds for seconds, _ in results]),
+        'rest_calls_per_order': round(phase.total_rest_calls / len(jobs), 2) if jobs else None,
+        'db_queries_per_order': round(phase.db_queries / len(jobs), 2) if jobs else None,
+        'rest_calls': phase.rest_calls,
+    }
+
+
+def bench_listening(fake: FakeBingX, queries: QueryCounter, config: BenchmarkConfig) -> dict:
+    listeners = [
+        _TimedPriceListener(position.tool.name, BingXExc(position.account), config.check_interval)
+        for position in Position.objects.filter(last_status='NEW').select_related('tool', 'account__user')
+    ]
+    ticks_sent = fake.ticks_sent
+
+    with _Phase(fake, queries) as phase:
+        threads = [threading.Thread(target=listener.listen_for_events, daemon=True) for listener in listeners]
+        for thread in threads:
+            thread.start()
+        time.sleep(config.listen_seconds)
+
+        for listener in listeners:
+            listener.stop_listening()
+        for thread in threads:
+            thread.join(timeout=10)
+
+    message_seconds = [seconds for listener in listeners for seconds in listener.message_seconds]
+    check_seconds = [seconds for listener in listeners for seconds in listener.check_seconds]
+    return {
+        'listeners': len(listeners),
+        'seconds': round(phase.seconds, 3),
+        'ticks_sent': fake.ticks_sent - ticks_sent,
+        'ticks_handled': len(message_seconds),
+        'ticks_per_second': round(len(message_seconds) / phase.seconds, 2),
+        'message_latency_ms': percentiles(message_seconds),
+        'cancel_checks': len(check_seconds),
+        'cancel_check_latency_ms': percentiles(check_seconds),
+        'db_queries_per_check': round(phase.db_queries / len(check_seconds), 2) if check_seconds else None,
+        'rest_calls': phase.rest_calls,
+    }
+
+
+def bench_polling(fake: FakeBingX, queries: QueryCounter, config: BenchmarkConfig) -> dict:
+    poller = OrderPoller()
+    filled = fake.fill_entry_orders()
+    closed = 0
+    cycles = []
+
+    for cycle in range(config.poll_cycles):
+        positions = Position.objects.count()
+        with _Phase(fake, queries) as phase:
+            poller.poll_accounts_for_position_statuses()
+        cycles.append({
+            'cycle': cycle + 1,
+            'positions': positions,
+            'ms': round(phase.seconds * 1000, 3),
+            'rest_calls': phase.total_rest_calls,
+            'db_queries': phase.db_queries,
+            'db_ms': round(phase.db_seconds * 1000, 3),
+            'rest_calls_by_endpoint': phase.rest_calls,
+        })
+        # Positions are closed once poller knows their ids, so the next cycle finishes their trades
+        if cycle == 0 and config.close_share > 0:
+            closed = fake.close_positions(config.close_share)
+
+    durations = [cycle['ms'] / 1000 for cycle in cycles]
+    return {
+        'filled': filled,
+        'closed_on_exchange': closed,
+        'cycle_ms': percentiles(durations),
+        'positions_per_second': round(sum(c['positions'] for c in cycles) / sum(durations), 2) if cycles else None,
+        'cycles': cycles,
+    }
+
+
+def _share_exchange_cache():
+    """Points shared GET responses of bingX client to exchange cache of current settings, see TradingBuddyConfig"""
+    if settings.EXCHANGE_SHARED_GET_TTL > 0:
+        bingX.set_shared_cache(caches[settings.EXCHANGE_CACHE_ALIAS], settings.EXCHANGE_SHARED_GET_TTL,
+                               settings.EXCHANGE_SHARED_GET_ENDPOINTS)
+
+
+def run(config: BenchmarkConfig) -> dict:
+    """Runs all phases in order against fresh stand-in, the database must have no benchmark accounts yet"""
+    fake = FakeBingX(symbols(config.positions), tick_rate=config.tick_rate, latency=config.latency,
+                     quantity_precision=QUANTITY_PRECISION, price_precision=PRICE_PRECISION).start()
+    queries = QueryCounter()
+    queries.start()
+    bingX.set_base_url(fake.rest_url)
+
+    try:
+        with override_settings(BINGX_WS_URL=fake.ws_url, CACHES=BENCHMARK_CACHES):
+            _share_exchange_cache()
+            accounts = create_accounts(config.accounts)
+            results = {'placing': bench_placing(fake, queries, accounts, config)}
+            results['listening'] = bench_listening(fake, queries, config)
+            fake.stop_market_stream()
+            results['polling'] = bench_polling(fake, queries, config)
+    finally:
+        bingX.set_base_url(settings.BINGX_REST_URL)
+        _share_exchange_cache()
+        queries.stop()
+        fake.stop()
+
+    return results
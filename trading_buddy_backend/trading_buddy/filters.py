@@ -2,6 +2,8 @@ from dataclasses import dataclass, field
 from datetime import date, datetime
 from typing import Optional
 
+from django.db.models import Q
+
 
 @dataclass
 class TradeFilters:
@@ -25,3 +27,24 @@ class TradeFilters:
             tool_name=params.getlist('tool_name'),
             timeframe=params.getlist('timeframe'),
         )
+
+    def as_q(self) -> Q:
+        """Conditions on Trade fields, empty filters match every trade"""
+        conditions = Q()
+
+        if self.date_from:
+            conditions &= Q(end_time__gte=self.date_from)
+        if self.date_to:
+            conditions &= Q(end_time__lte=self.date_to)
+        if self.trade_setup:
+            conditions &= Q(trade_setup__in=self.trade_setup)
+        if self.profitable is not None:
+            conditions &= Q(pnl_usd__gt=0) if self.profitable else Q(pnl_usd__lt=0)
+        if self.side:
+            conditions &= Q(side=self.side)
+        if self.tool_name:
+            conditions &= Q(tool__name__in=self.tool_name)
+        if self.timeframe:
+            conditions &= Q(timeframe__in=self.timeframe)
+
+        return conditions
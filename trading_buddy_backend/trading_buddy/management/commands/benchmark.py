@@ -0,0 +1,91 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+from loguru import logger
+
+from ...benchmarks.harness import BenchmarkConfig, run
+
+
+def _latency(values: dict) -> str:
+    return ' / '.join('-' if values[key] is None else f'{values[key]:.2f}' for key in ('p50', 'p90', 'p99', 'max'))
+
+
+def _calls(calls: dict[str, int]) -> str:
+    return ', '.join(f'{endpoint} x{count}' for endpoint, count in calls.items()) or '-'
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks placing orders, price listeners and order poller against local BingX stand-in, '
+            'in a test database which is created for the run and dropped afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=5)
+        parser.add_argument('--positions', type=int, default=5, help='Positions per account, one per symbol')
+        parser.add_argument('--tick-rate', type=float, default=10, help='Price updates per second per listener')
+        parser.add_argument('--listen-seconds', type=float, default=10)
+        parser.add_argument('--check-interval', type=float,
+                            help="Seconds between cancel checks of listener, listener's own by default")
+        parser.add_argument('--poll-cycles', type=int, default=5)
+        parser.add_argument('--close-share', type=float, default=0.2,
+                            help='Share of positions closed on exchange after the first poll cycle')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads placing orders')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Delay of every REST response')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse test database left by previous run')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+        parser.add_argument('--log-level', default='WARNING')
+
+    def handle(self, *args, **options):
+        logger.remove()
+        logger.add(sys.stderr, level=options['log_level'])
+
+        config = BenchmarkConfig(
+            accounts=options['accounts'],
+            positions=options['positions'],
+            tick_rate=options['tick_rate'],
+            listen_seconds=options['listen_seconds'],
+            check_interval=options['check_interval'],
+            poll_cycles=options['poll_cycles'],
+            close_share=options['close_share'],
+            concurrency=options['concurrency'],
+            latency=options['latency_ms'] / 1000,
+        )
+
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            results = run(config)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        placing, listening, polling = results['placing'], results['listening'], results['polling']
+        self.stdout.write('Latencies are p50 / p90 / p99 / max, in ms\n')
+
+        self.stdout.write(f"Placing {placing['orders']} orders ({placing['failed']} failed) "
+                          f"with {config.concurrency} thread(s)")
+        self.stdout.write(f"  {placing['orders_per_second']} orders/s, latency {_latency(placing['latency_ms'])}")
+        self.stdout.write(f"  per order: {placing['rest_calls_per_order']} REST calls, "
+                          f"{placing['db_queries_per_order']} DB queries")
+        self.stdout.write(f"  REST: {_calls(placing['rest_calls'])}\n")
+
+        self.stdout.write(f"Listening with {listening['listeners']} listeners for {listening['seconds']}s")
+        self.stdout.write(f"  {listening['ticks_handled']} of {listening['ticks_sent']} ticks handled, "
+                          f"{listening['ticks_per_second']} ticks/s, latency {_latency(listening['message_latency_ms'])}")
+        self.stdout.write(f"  {listening['cancel_checks']} cancel checks, latency "
+                          f"{_latency(listening['cancel_check_latency_ms'])}, "
+                          f"{listening['db_queries_per_check']} DB queries per check")
+        self.stdout.write(f"  REST: {_calls(listening['rest_calls'])}\n")
+
+        self.stdout.write(f"Polling after {polling['filled']} fills, {polling['closed_on_exchange']} positions closed "
+                          f"on exchange after the first cycle")
+        self.stdout.write(f"  cycle latency {_latency(polling['cycle_ms'])}, "
+                          f"{polling['positions_per_second']} positions/s")
+        for cycle in polling['cycles']:
+            self.stdout.write(f"  #{cycle['cycle']}: {cycle['positions']} positions, {cycle['ms']:.1f} ms, "
+                              f"{cycle['rest_calls']} REST calls, {cycle['db_queries']} DB queries "
+                              f"({cycle['db_ms']:.1f} ms)")
+            self.stdout.write(f"      REST: {_calls(cycle['rest_calls_by_endpoint'])}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from loguru import logger
+
+from ...storage import GARBAGE_GRACE_SECONDS, screenshot_storage
+
+
+class Command(BaseCommand):
+    help = 'Removes content-addressed screenshots which no trade references anymore'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-seconds', type=int, default=GARBAGE_GRACE_SECONDS,
+                            help='Files saved or reused more recently than that are kept')
+
+    def handle(self, *args, **options):
+        removed = screenshot_storage.collect_garbage(options['grace_seconds'])
+        logger.info(f'Removed {removed} unreferenced screenshots')
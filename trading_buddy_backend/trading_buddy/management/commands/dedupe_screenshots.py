@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from loguru import logger
+
+from ...models import Trade
+from ...storage import CAS_PREFIX, screenshot_storage
+
+
+class Command(BaseCommand):
+    help = 'Moves screenshots stored under legacy per-trade names into content-addressed storage'
+
+    def handle(self, *args, **options):
+        legacy = ~Q(screenshot__startswith=f'{CAS_PREFIX}/') & ~Q(screenshot='') & Q(screenshot__isnull=False)
+        legacy_thumbnails = (~Q(screenshot_thumbnail__startswith=f'{CAS_PREFIX}/')
+                             & ~Q(screenshot_thumbnail='') & Q(screenshot_thumbnail__isnull=False))
+
+        names = set(Trade.objects.filter(legacy).values_list('screenshot', flat=True))
+        names |= set(Trade.objects.filter(legacy_thumbnails).values_list('screenshot_thumbnail', flat=True))
+        logger.info(f'Moving {len(names)} files into content-addressed storage...')
+
+        moved = 0
+        for name in names:
+            if not screenshot_storage.exists(name):
+                logger.warning(f'Missing file {name}, skipping')
+                continue
+
+            with screenshot_storage.open(name, 'rb') as f:
+                new_name = screenshot_storage.save(name, f)
+
+            Trade.objects.filter(screenshot=name).update(screenshot=new_name)
+            Trade.objects.filter(screenshot_thumbnail=name).update(screenshot_thumbnail=new_name)
+            screenshot_storage.delete(name)
+            moved += 1
+
+        logger.info(f'Moved {moved} files')
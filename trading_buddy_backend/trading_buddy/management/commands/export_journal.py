@@ -0,0 +1,61 @@
+import sys
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+
+from ...filters import TradeFilters
+from ...models import User
+from ...services.utils.journal_export import EXPORT_FORMATS, iter_export_rows, parquet_available, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Exports journal trades of user into CSV or Parquet file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--file-format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', default='-', help='Path of output file, stdout by default')
+        parser.add_argument('--investing', action='store_true', help='Export investments instead of trades')
+
+        # Same filters as in journal
+        parser.add_argument('--date-from', type=lambda d: datetime.strptime(d, '%Y-%m-%d'))
+        parser.add_argument('--date-to', type=lambda d: datetime.strptime(d, '%Y-%m-%d'))
+        parser.add_argument('--trade-setup', action='append', default=[])
+        parser.add_argument('--profitable', choices=['true', 'false'])
+        parser.add_argument('--side', choices=['LONG', 'SHORT'])
+        parser.add_argument('--tool-name', action='append', default=[])
+        parser.add_argument('--timeframe', action='append', default=[])
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        file_format = options['file_format']
+        if file_format == 'parquet' and not parquet_available():
+            raise CommandError('Parquet export requires pyarrow to be installed')
+
+        filters = TradeFilters(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            trade_setup=options['trade_setup'],
+            profitable=options['profitable'] == 'true' if options['profitable'] else None,
+            side=options['side'],
+            tool_name=options['tool_name'],
+            timeframe=options['timeframe'],
+        )
+
+        chunks = stream_export(file_format, iter_export_rows(user, filters, investing=options['investing']))
+
+        if options['output'] == '-':
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            out.flush()
+        else:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            logger.info(f"Exported journal of {user.username} into {options['output']}")
@@ -0,0 +1,49 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+
+from ...models import Account
+from ...services.utils.journal_import import CsvSource, JsonSource, NotionSource, JournalImporter, PAGE_SIZE, \
+    IMAGE_WORKERS
+
+
+class Command(BaseCommand):
+    help = 'Imports historic trades into journal of account from Notion database, CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_id', type=int)
+        parser.add_argument('source', choices=['notion', 'csv', 'json'])
+        parser.add_argument('--path', help='Path to CSV or JSON file, columns are the same as in journal export')
+        parser.add_argument('--database-id', help='Id of Notion database, token is taken from NOTION_TOKEN env var')
+        parser.add_argument('--checkpoint', help='Path of checkpoint file, rerun with the same one to resume import')
+        parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+        parser.add_argument('--image-workers', type=int, default=IMAGE_WORKERS)
+
+    def handle(self, *args, **options):
+        try:
+            account = Account.objects.get(pk=options['account_id'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Account {options['account_id']} does not exist")
+
+        match options['source']:
+            case 'notion':
+                if not options['database_id'] or not os.getenv('NOTION_TOKEN'):
+                    raise CommandError('Notion import requires --database-id and NOTION_TOKEN env var')
+                source = NotionSource(options['database_id'], os.environ['NOTION_TOKEN'],
+                                      workers=options['image_workers'])
+            case 'csv' | 'json' as file_type:
+                if not options['path']:
+                    raise CommandError(f'{file_type.upper()} import requires --path')
+                source_class = CsvSource if file_type == 'csv' else JsonSource
+                source = source_class(options['path'], page_size=options['page_size'])
+
+        importer = JournalImporter(account, source, checkpoint_path=options['checkpoint'],
+                                   image_workers=options['image_workers'])
+        stats = importer.run()
+
+        for error in stats.errors:
+            logger.warning(f'Skipped row: {error}')
+        logger.info(f'Imported {stats.imported} trades with {stats.images} screenshots, skipped {stats.skipped} rows')
+        if stats.images:
+            logger.info('Run process_screenshots command to compress imported screenshots and generate thumbnails')
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from loguru import logger
+
+from ...models import Trade
+from ...services.utils.screenshots import process_screenshot
+
+
+def _process(trade_id: int) -> bool:
+    try:
+        return process_screenshot(trade_id)
+    except Exception as e:
+        logger.warning(f'Failed to process screenshot of trade {trade_id}: {e}')
+        return False
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Compresses screenshots and generates thumbnails for trades which have no thumbnail yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.SCREENSHOT_WORKERS)
+
+    def handle(self, *args, **options):
+        trade_ids = list(
+            Trade.objects.exclude(Q(screenshot='') | Q(screenshot__isnull=True))
+            .filter(Q(screenshot_thumbnail='') | Q(screenshot_thumbnail__isnull=True))
+            .values_list('pk', flat=True)
+        )
+        logger.info(f'Processing screenshots of {len(trade_ids)} trades...')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            processed = sum(pool.map(_process, trade_ids))
+
+        logger.info(f'Processed {processed} of {len(trade_ids)} screenshots')
@@ -1,32 +1,45 @@
 import time
 from threading import Thread
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import OperationalError, connection
+from django.db import OperationalError, close_old_connections
 from loguru import logger
 
-from ...models import Position
+from ...models import Account, Position
 from ...services.exchanges.exchanges import BingXExc, ByBitExc, BingXPriceListener
+from ...services import metrics
+from ...services.exchanges import market_snapshot
+from ...services.exchanges.listeners import BingXAccountListener
 
 exc_map = {"BingX": BingXExc, "ByBit": ByBitExc}
 
 
 class Command(BaseCommand):
-    help = 'Manager of websocket listeners which track price changes'
+    help = 'Manager of websocket listeners which track price changes and account balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metrics-port', type=int, default=settings.LISTENERS_METRICS_PORT,
+                            help='Port Prometheus metrics are served on, 0 turns them off')
 
     def handle(self, *args, **options):
+        metrics.serve(options['metrics_port'])
         logger.info('Initializing SINGLE instance of price listeners manager...')
         active_listeners = {}
+        active_account_listeners = {}
 
         consecutive_errors = 0
 
+        # Snapshot is refreshed on its own schedule, as iteration of the loop below takes longer than its sleep
+        Thread(target=refresh_market_snapshot_periodically, daemon=True).start()
+
         while True:
             try:
-                # Always close stale connections before attempting work,
-                # because Django doesn't automatically update connections for threads - one thread - one connection
-                if not connection.is_usable():
-                    connection.close()
+                # Long-running loop is not a request, so connection housekeeping which Django does around requests
+                # is done here: broken connections and ones older than CONN_MAX_AGE are closed, others are reused
+                close_old_connections()
 
                 lookup_positions_and_handle_listeners(active_listeners)
+                lookup_accounts_and_handle_listeners(active_account_listeners)
 
                 consecutive_errors = 0
 
@@ -77,3 +90,55 @@ def lookup_positions_and_handle_listeners(active_listeners: dict):
             logger.info(f"Stopping listener for {tool}")
             active_listeners[tool]["listener"].stop_listening()
             del active_listeners[tool]
+
+
+def lookup_accounts_and_handle_listeners(active_listeners: dict):
+    """Keeps one user data stream per BingX account, which pushes balance changes into balance cache"""
+    accounts = {account.pk: account for account in Account.objects.filter(exchange=Account.Exchange.BINGX)
+                .exclude(api_key='').select_related('user')}
+
+    # Streams of removed accounts or accounts which API keys were changed are stopped
+    for account_id in list(active_listeners):
+        account = accounts.get(account_id)
+        if account is None or account.api_key != active_listeners[account_id]["api_key"]:
+            logger.info(f"Stopping user data stream of account {account_id}")
+            active_listeners[account_id]["listener"].stop_listening()
+            del active_listeners[account_id]
+
+    for account_id, account in accounts.items():
+        if account_id not in active_listeners:
+            logger.info(f'Initializing user data stream of account {account_id}')
+
+            listener = BingXAccountListener(BingXExc(account))
+
+            t = Thread(target=listener.listen_for_events, daemon=True)
+            t.start()
+
+            active_listeners[account_id] = {"listener": listener, "thread": t, "api_key": account.api_key}
+
+
+def refresh_market_snapshot_periodically():
+    """Refreshes market snapshot every MARKET_SNAPSHOT_INTERVAL, counted from start of the previous refresh"""
+    while True:
+        started = time.monotonic()
+        try:
+            close_old_connections()
+            refresh_market_snapshot()
+        except Exception as e:
+            logger.warning(f'Failed to refresh market snapshot: {e}')
+        time.sleep(max(settings.MARKET_SNAPSHOT_INTERVAL - (time.monotonic() - started), 0))
+
+
+def refresh_market_snapshot():
+    """
+    Keeps market snapshot fresh for web workers, regardless of whether account streams are up.
+    Any BingX account's client works, as market data is public, without accounts nothing reads the snapshot
+    """
+    account = Account.objects.filter(exchange=Account.Exchange.BINGX).exclude(api_key='').first()
+    if account is None:
+        return
+
+    try:
+        market_snapshot.refresh_snapshot(BingXExc(account).client.market)
+    except Exception as e:
+        logger.warning(f'Failed to refresh market snapshot: {e}')
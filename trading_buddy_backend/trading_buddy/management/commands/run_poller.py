@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from loguru import logger
 
+from ...services import metrics
 from ...services.exchanges.pollers import OrderPoller
 
 
 class Command(BaseCommand):
     help = 'Launches SINGLE instance of OrderPoller'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--metrics-port', type=int, default=settings.POLLER_METRICS_PORT,
+                            help='Port Prometheus metrics are served on, 0 turns them off')
+
     def handle(self, *args, **options):
+        metrics.serve(options['metrics_port'])
         logger.info('Initializing order poller...')
 
         poller = OrderPoller()
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...filters import TradeFilters
+from ...models import User
+from ...services.analytics.kline_store import INTERVALS_MS
+from ...services.analytics.rule_sweep import RANKING_METRICS, build_rule_sets
+
+
+def _values(cast):
+    """Comma separated list of values"""
+    return lambda value: [cast(item) for item in value.split(',') if item]
+
+
+class Command(BaseCommand):
+    help = ('Replays journaled trades of user with every combination of position management rules and prints '
+            'combinations ranked by outcome, candles have to be synced with sync_klines first')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--move-stop-after', type=_values(int), default=[], help='i.e. 0,1,2')
+        parser.add_argument('--move-stop-after-rr', type=_values(float), default=[],
+                            help='i.e. 0,1,1.5,2, where 0 turns breakeven by risk reward off')
+        parser.add_argument('--num-take-profits', type=_values(int), default=[], help='i.e. 1,2,3')
+        parser.add_argument('--cancel-over-r', type=_values(float), default=[],
+                            help='Overbuy/overlow cancel levels, in risks beyond entry')
+        parser.add_argument('--cancel-take-r', type=_values(float), default=[],
+                            help='Take-profit cancel levels, in risks from entry towards take-profits')
+        parser.add_argument('--interval', '-i', choices=list(INTERVALS_MS))
+        parser.add_argument('--order-by', choices=list(RANKING_METRICS), default='total_r')
+        parser.add_argument('--top', type=int, default=20, help='Number of best combinations printed')
+        parser.add_argument('--investing', action='store_true')
+
+        # Same filters as in journal
+        parser.add_argument('--date-from', type=lambda d: datetime.strptime(d, '%Y-%m-%d'))
+        parser.add_argument('--date-to', type=lambda d: datetime.strptime(d, '%Y-%m-%d'))
+        parser.add_argument('--trade-setup', action='append', default=[])
+        parser.add_argument('--side', choices=['LONG', 'SHORT'])
+        parser.add_argument('--tool-name', action='append', default=[])
+        parser.add_argument('--timeframe', action='append', default=[])
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        filters = TradeFilters(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            trade_setup=options['trade_setup'],
+            side=options['side'],
+            tool_name=options['tool_name'],
+            timeframe=options['timeframe'],
+        )
+
+        rule_sets = build_rule_sets(options['move_stop_after'], options['move_stop_after_rr'],
+                                    options['num_take_profits'], options['cancel_over_r'], options['cancel_take_r'])
+        rows = user.sweep_trade_rules(rule_sets, filters, options['interval'], options['order_by'],
+                                      investing=options['investing'])
+
+        columns = ('rank', 'move_stop_after', 'move_stop_after_rr', 'num_take_profits', 'cancel_over_r',
+                   'cancel_take_r', 'filled_trades', 'win_rate', 'total_r', 'avg_r', 'profit_factor', 'total_pnl')
+        table = [columns] + [tuple('-' if row[column] is None else str(row[column]) for column in columns)
+                             for row in rows[:options['top']]]
+        widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+        for line in table:
+            self.stdout.write('  '.join(value.rjust(width) for value, width in zip(line, widths)))
+
+        self.stdout.write(f'{len(rule_sets)} combinations replayed')
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+
+from bingX.perpetual.v2.market import Market
+from ...models import Account, Tool
+from ...services.analytics.kline_store import INTERVALS_MS, KlineStore
+
+
+class Command(BaseCommand):
+    help = 'Downloads closed candles of symbols into local kline store, continuing from the last stored candle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols in exchange format, i.e. BTC-USDT')
+        parser.add_argument('--interval', '-i', action='append', choices=list(INTERVALS_MS),
+                            help='Can be repeated, 1h by default')
+        parser.add_argument('--tools', action='store_true', help='Also sync all tools of BingX accounts')
+        parser.add_argument('--stored', action='store_true', help='Also sync all symbols which are already stored')
+        parser.add_argument('--since', type=lambda d: datetime.strptime(d, '%Y-%m-%d').replace(tzinfo=timezone.utc),
+                            help='Start of history for symbols synced for the first time, YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        store = KlineStore()
+        intervals = options['interval'] or ['1h']
+
+        symbols = {symbol.upper() for symbol in options['symbols']}
+        if options['tools']:
+            symbols.update(Tool.objects.filter(account__exchange=Account.Exchange.BINGX)
+                           .values_list('name', flat=True).distinct())
+        if options['stored']:
+            symbols.update(store.symbols())
+
+        if not symbols:
+            raise CommandError('No symbols to sync, pass them as arguments or use --tools/--stored')
+
+        # Candles are public market data, so credentials of any account do
+        account = Account.objects.filter(exchange=Account.Exchange.BINGX).exclude(api_key='').first()
+        if account is None:
+            raise CommandError('BingX account is required to access market data')
+        market = Market(account.api_key, account.secret_key)
+
+        since_ms = int(options['since'].timestamp() * 1000) if options['since'] else None
+
+        total = 0
+        for symbol in sorted(symbols):
+            for interval in intervals:
+                try:
+                    total += store.sync(market, symbol, interval, since_ms)
+                except Exception as e:
+                    logger.warning(f'Failed to sync {interval} candles of {symbol}: {e}')
+
+        self.stdout.write(f'Stored {total} candles of {len(symbols)} symbols')
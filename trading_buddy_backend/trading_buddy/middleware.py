@@ -0,0 +1,96 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from loguru import logger
+
+from trading_buddy.services import metrics, profiling, tracing
+
+# Values of TRACING_HEADER which force tracing of request on or off
+_FORCE_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+class TracingMiddleware:
+    """Makes root span of request, see services/tracing.py, and returns trace id of traced request in X-Trace-Id"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _forced(self, request) -> bool | None:
+        return _FORCE_VALUES.get(request.headers.get(settings.TRACING_HEADER, '').lower())
+
+    @staticmethod
+    def _finish(root, request, response):
+        match = request.resolver_match
+        if root is not None and root.is_recording():
+            if match is not None:
+                root.update_name(f'{request.method} {match.route}')
+                root.set_attribute('http.route', match.route)
+            root.set_attribute('http.response.status_code', response.status_code)
+            response['X-Trace-Id'] = tracing.trace_id(root)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not tracing.enabled():
+            return self.get_response(request)
+
+        with tracing.server_span(request.method, request.path, self._forced(request)) as root:
+            return self._finish(root, request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if not tracing.enabled():
+            return await self.get_response(request)
+
+        with tracing.server_span(request.method, request.path, self._forced(request)) as root:
+            return self._finish(root, request, await self.get_response(request))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles every request (see services/profiling.py) into per-route metrics, and checks DB queries it made against
+    QUERY_BUDGETS of its route: exceeded budget is logged, or raises QueryBudgetExceeded when budgets are enforced,
+    so N+1 regressions fail tests. With PROFILING_SERVER_TIMING profile is returned in Server-Timing header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _finish(request, response, profile: profiling.Profile):
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        metrics.observe_view(request.method, route, profile)
+
+        if settings.PROFILING_SERVER_TIMING:
+            response['Server-Timing'] = profile.server_timing()
+
+        budget = profiling.check_budget(route, profile, settings.QUERY_BUDGETS)
+        if budget is not None:
+            msg = f'{request.method} {route} made {profile.queries} DB queries, its budget is {budget}'
+            if settings.QUERY_BUDGET_ENFORCE:
+                raise profiling.QueryBudgetExceeded(msg)
+            logger.warning(msg)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        with profiling.profile() as profile:
+            response = self.get_response(request)
+        return self._finish(request, response, profile)
+
+    async def __acall__(self, request):
+        with profiling.profile(measure_cpu=False) as profile:
+            response = await self.get_response(request)
+        return self._finish(request, response, profile)
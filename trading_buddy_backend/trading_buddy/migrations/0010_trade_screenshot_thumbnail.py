@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_buddy', '0009_remove_trade_tags_alter_account_exchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='screenshot_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:35
+
+import trading_buddy.models
+import trading_buddy.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_buddy', '0010_trade_screenshot_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trade',
+            name='screenshot',
+            field=models.ImageField(null=True, storage=trading_buddy.storage.get_screenshot_storage, upload_to=trading_buddy.models.Trade.screenshot_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='trade',
+            name='screenshot_thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=trading_buddy.storage.get_screenshot_storage, upload_to=''),
+        ),
+    ]
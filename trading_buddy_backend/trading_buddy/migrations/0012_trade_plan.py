@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:50
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_buddy', '0011_screenshot_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='cancel_levels',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.DecimalField(decimal_places=12, max_digits=20), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='entry_price',
+            field=models.DecimalField(blank=True, decimal_places=12, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='move_stop_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='move_stop_after_rr',
+            field=models.DecimalField(blank=True, decimal_places=12, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='stop_price',
+            field=models.DecimalField(blank=True, decimal_places=12, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='take_profit_prices',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.DecimalField(decimal_places=12, max_digits=20), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='trigger_price',
+            field=models.DecimalField(blank=True, decimal_places=12, max_digits=20, null=True),
+        ),
+    ]
@@ -6,15 +6,22 @@ from datetime import datetime
 from decimal import Decimal
 from itertools import accumulate
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import ForeignKey, Sum, Q
+from django.db import models, connection
+from django.db.models import ForeignKey, Sum
 from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
 
 from trading_buddy.filters import TradeFilters
+from trading_buddy.services.analytics.journal_analytics import TradeColumns, compute_journal_analytics
+from trading_buddy.services.analytics.rule_sweep import RuleSet, sweep
+from trading_buddy.services.analytics.trade_replay import TradePlans, load_candles, replay
+from trading_buddy.services.tracing import traced
+from trading_buddy.stats_cache import cached_stats, bump_stats_version
+from trading_buddy.storage import get_screenshot_storage
 
 
 class User(AbstractUser):
@@ -23,6 +30,12 @@ class User(AbstractUser):
     current_account = models.OneToOneField('Account', related_name='+', on_delete=models.SET_NULL, null=True,
                                            blank=True)
 
+    async def aget_current_account(self):
+        """Related objects can't be lazily loaded in async code, so async views fetch current account with this"""
+        if self.current_account_id is None:
+            return None
+        return await Account.objects.select_related('user').aget(pk=self.current_account_id)
+
     def _get_accounts(self, investing=False):
         if investing:
             return self.accounts.filter(exchange=Account.Exchange.INVESTING)
@@ -30,6 +43,7 @@ class User(AbstractUser):
 
     # All accounts means all 'trading' accounts, if investing trades are required specify 'all_accounts=True' and 'investing=True'
     # `all_accounts=False` means that only trades from current selected account will be fetched
+    @cached_stats
     def get_pnl_calendar_data(self, year, month, all_accounts=False, investing=False):
         try:
             year = int(year)
@@ -66,6 +80,7 @@ class User(AbstractUser):
 
         return pnl_by_day, None
 
+    @cached_stats
     def get_total_pnl(self, all_accounts=False, investing=False):
         if all_accounts:
             user_accounts = self._get_accounts(investing)
@@ -78,6 +93,7 @@ class User(AbstractUser):
         total_pnl = trades.aggregate(total_pnl=Sum('pnl_usd'))['total_pnl']
         return round(total_pnl, 2) if total_pnl is not None else 0
 
+    @cached_stats
     def get_winrate(self, year: int = None, month: int = None, investing=False):
         """
         :return: Winrate - number from 0 to 1
@@ -109,6 +125,7 @@ class User(AbstractUser):
         else:
             return 0
 
+    @cached_stats
     def get_num_trades(self, year: int, month: int, investing=False):
         user_accounts = self._get_accounts(investing)
 
@@ -129,6 +146,7 @@ class User(AbstractUser):
 
         return len(trades)
 
+    @cached_stats
     def get_tools_with_biggest_winrates(self, investing=False):
         user_accounts = self._get_accounts(investing)
         trades = Trade.objects.filter(account__in=user_accounts, start_time__isnull=False, end_time__isnull=False)
@@ -148,6 +166,7 @@ class User(AbstractUser):
 
         return sorted(tool_stats.values(), key=lambda x: x['winrate'], reverse=True)
 
+    @cached_stats
     def get_pnl_progression_over_days(self, investing=False):
         user_accounts = self._get_accounts(investing)
         trades = Trade.objects.filter(account__in=user_accounts, start_time__isnull=False, end_time__isnull=False)
@@ -173,6 +192,156 @@ class User(AbstractUser):
             for day, pnl, cum_pnl in zip(days, pnl_values, cumulative_pnl)
         ]
 
+    @cached_stats
+    def get_stats_dashboard(self, year: int, month: int, investing=False):
+        """
+        Computes everything the stats page needs from a single scan of trades, instead of separate
+        queries behind pnl calendar, total pnl, winrates, number of trades, tools winrates and pnl progression.
+        Values match the ones returned by the dedicated methods above.
+        """
+        try:
+            year = int(year)
+            month = int(month)
+            datetime(year, month, 1)
+        except ValueError as e:
+            return None, f"Invalid year/month: {e}"
+
+        trades = (
+            Trade.objects.filter(account__in=self._get_accounts(investing))
+            .order_by('end_time')
+            .values_list('start_time', 'end_time', 'pnl_usd', 'tool__name')
+        )
+
+        total_pnl = Decimal(0)
+        num_closed = wins_closed = 0
+        num_month = wins_month = 0
+        pnl_by_day = {}  # Calendar of requested month
+        daily_pnl = {}  # Whole history, ordered by day thanks to ordering by end_time
+        tool_stats = {}
+
+        for start_time, end_time, pnl, tool_name in trades.iterator(chunk_size=2000):
+            total_pnl += pnl
+            if end_time is None:
+                continue
+
+            num_closed += 1
+            is_win = pnl > 0
+            wins_closed += is_win
+
+            day = end_time.strftime('%Y-%m-%d')
+            in_month = end_time.year == year and end_time.month == month
+            if in_month:
+                pnl_by_day[day] = pnl_by_day.get(day, 0) + pnl
+
+            # Rest of stats only count trades which have been actually opened
+            if start_time is None:
+                continue
+
+            if in_month:
+                num_month += 1
+                wins_month += is_win
+
+            daily_pnl[day] = daily_pnl.get(day, 0) + pnl
+
+            if tool_name not in tool_stats:
+                tool_stats[tool_name] = {'tool': tool_name, 'total_trades': 0, 'winning_trades': 0, 'winrate': 0}
+            tool_stats[tool_name]['total_trades'] += 1
+            tool_stats[tool_name]['winning_trades'] += is_win
+
+        for stats in tool_stats.values():
+            stats['winrate'] = round(stats['winning_trades'] / stats['total_trades'], 2)
+
+        progression = []
+        cumulative_pnl = 0
+        for day, pnl in daily_pnl.items():
+            cumulative_pnl += pnl
+            progression.append({
+                'day': day,
+                'daily_pnl': round(float(pnl), 2),
+                'cumulative_pnl': round(float(cumulative_pnl), 2)
+            })
+
+        return {
+            'pnl_by_day': pnl_by_day,
+            'total_pnl': round(total_pnl, 2),
+            'winrate': round(wins_closed / num_closed, 4) if num_closed else 0,
+            'month_winrate': round(wins_month / num_month, 4) if num_month else 0,
+            'month_num_trades': num_month,
+            'tools_winrates': sorted(tool_stats.values(), key=lambda x: x['winrate'], reverse=True),
+            'pnl_progression': progression,
+        }, None
+
+    @cached_stats
+    def get_journal_analytics(self, investing=False):
+        """
+        Equity curve, drawdowns, R-multiples, expectancy, profit factor, Sharpe/Sortino, streaks and
+        per-setup/per-tool breakdowns of finished trades, see services/analytics/journal_analytics.py
+        """
+        trades = Trade.objects.filter(account__in=self._get_accounts(investing))
+        return compute_journal_analytics(TradeColumns.from_queryset(trades))
+
+    @cached_stats
+    def get_setup_performance(self, filters: TradeFilters = None, investing=False):
+        """
+        Performance of finished trades grouped by setup x timeframe x side, with subtotals per setup,
+        per setup x timeframe and grand total, computed by a single GROUP BY ROLLUP query.
+        Rows where grouping column is rolled up have it set to None and `level` tells which columns are grouped:
+        0 - setup/timeframe/side, 1 - setup/timeframe, 3 - setup, 7 - grand total.
+        """
+        trades_sql, trades_params = (self.get_filtered_trades(filters, investing)
+                                     .order_by().values('pk').query.sql_with_params())
+
+        query = f"""
+            SELECT trade_setup, timeframe, side,
+                   GROUPING(trade_setup, timeframe, side) AS level,
+                   COUNT(*) AS total_trades,
+                   COUNT(*) FILTER (WHERE pnl_usd > 0) AS winning_trades,
+                   AVG(pnl_usd / risk_usd) FILTER (WHERE risk_usd > 0) AS avg_r,
+                   COALESCE(SUM(pnl_usd), 0) AS total_pnl,
+                   COALESCE(SUM(commission_usd), 0) AS commission
+            FROM {Trade._meta.db_table}
+            WHERE end_time IS NOT NULL AND id IN ({trades_sql})
+            GROUP BY ROLLUP (trade_setup, timeframe, side)
+            ORDER BY trade_setup NULLS LAST, level, timeframe NULLS LAST, side NULLS LAST
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, trades_params)
+            columns = [col.name for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        for row in rows:
+            row['winrate'] = round(row['winning_trades'] / row['total_trades'], 4) if row['total_trades'] else 0
+            row['avg_r'] = round(row['avg_r'], 4) if row['avg_r'] is not None else None
+
+        return rows
+
+    def replay_trades(self, filters: TradeFilters = None, interval: str = None, max_bars: int = None,
+                      investing=False):
+        """
+        Replays position management rules over stored candles for journaled trades with stored plan,
+        see services/analytics/trade_replay.py
+        :return: ReplayResult
+        """
+        interval = interval or settings.REPLAY_INTERVAL
+        max_bars = max_bars or settings.REPLAY_MAX_BARS
+
+        plans = TradePlans.from_trades(self.get_filtered_trades(filters, investing))
+        return replay(plans, load_candles(plans, interval, max_bars), max_bars)
+
+    def sweep_trade_rules(self, rule_sets: list[RuleSet], filters: TradeFilters = None, interval: str = None,
+                          order_by: str = 'total_r', investing=False) -> list[dict]:
+        """
+        Replays journaled trades with every given set of rules, see services/analytics/rule_sweep.py
+        :return: Rule sets with replay summary, ranked by order_by metric
+        """
+        interval = interval or settings.REPLAY_INTERVAL
+        max_bars = settings.REPLAY_MAX_BARS
+
+        plans = TradePlans.from_trades(self.get_filtered_trades(filters, investing))
+        return sweep(plans, load_candles(plans, interval, max_bars), max_bars, rule_sets, order_by,
+                     workers=settings.SWEEP_WORKERS)
+
     def get_filtered_trades(self, filters: TradeFilters = None, investing=False):
         accounts = self._get_accounts(investing)
         trades = Trade.objects.filter(account__in=accounts)
@@ -180,24 +349,7 @@ class User(AbstractUser):
         if not filters:
             return trades.order_by('-pk')
 
-        conditions = Q()
-
-        if filters.date_from:
-            conditions &= Q(end_time__gte=filters.date_from)
-        if filters.date_to:
-            conditions &= Q(end_time__lte=filters.date_to)
-        if filters.trade_setup:
-            conditions &= Q(trade_setup__in=filters.trade_setup)
-        if filters.profitable is not None:
-            conditions &= Q(pnl_usd__gt=0) if filters.profitable else Q(pnl_usd__lt=0)
-        if filters.side:
-            conditions &= Q(side=filters.side)
-        if filters.tool_name:
-            conditions &= Q(tool__name__in=filters.tool_name)
-        if filters.timeframe:
-            conditions &= Q(timeframe__in=filters.timeframe)
-
-        return trades.filter(conditions).order_by('-pk')
+        return trades.filter(filters.as_q()).order_by('-pk')
 
 
 # Exchange account
@@ -294,17 +446,29 @@ class Position(models.Model):
         self.trade.pnl_usd = self.pnl_usd
         self.trade.commission_usd = self.commission_usd
         self.trade.result = reason
+        # Cancel levels could be changed while position was pending
+        self.trade.cancel_levels = self.cancel_levels
         self.trade.save()
         self.delete()
+        bump_stats_version(self.account)
 
-    def save(self, *args, **kwargs):
+    @staticmethod
+    def plan_levels(side: str, take_profit_prices: list, cancel_levels: list) -> tuple[list, list]:
+        """
+        :return: Take-profits sorted and default cancel levels set, as positions store them
+        """
         # Sort them in order as they are being approached by price if in favor of position, reverse=False - ascending
-        self.take_profit_prices = sorted(self.take_profit_prices, key=Decimal, reverse=self.side == 'SHORT')
+        take_profit_prices = sorted(take_profit_prices, key=Decimal, reverse=side == 'SHORT')
         # Configure default cancel levels
-        self.cancel_levels = [
-            self.cancel_levels[0] if len(self.cancel_levels) > 0 else None,  # overbuy/overlow
-            self.take_profit_prices[0] if len(self.take_profit_prices) > 0 else None  # take-profit
+        cancel_levels = [
+            cancel_levels[0] if len(cancel_levels) > 0 else None,  # overbuy/overlow
+            take_profit_prices[0] if len(take_profit_prices) > 0 else None  # take-profit
         ]
+        return take_profit_prices, cancel_levels
+
+    def save(self, *args, **kwargs):
+        self.take_profit_prices, self.cancel_levels = self.plan_levels(self.side, self.take_profit_prices,
+                                                                       self.cancel_levels)
         # Then call the original save method
         super().save(*args, **kwargs)
 
@@ -371,6 +535,22 @@ class Trade(models.Model):
 
     account = models.ForeignKey('Account', related_name='trades', null=True, on_delete=models.SET_NULL)
 
+    # Plan of position, kept after position is closed so trade can be replayed, see services/analytics/trade_replay.py
+    # Empty for trades opened before it was stored and for imported ones
+    trigger_price = models.DecimalField(decimal_places=12, max_digits=20, null=True, blank=True)
+    entry_price = models.DecimalField(decimal_places=12, max_digits=20, null=True, blank=True)
+    stop_price = models.DecimalField(decimal_places=12, max_digits=20, null=True, blank=True)
+    take_profit_prices = ArrayField(
+        base_field=models.DecimalField(decimal_places=12, max_digits=20),
+        default=list, blank=True
+    )
+    cancel_levels = ArrayField(
+        base_field=models.DecimalField(decimal_places=12, max_digits=20),
+        default=list, blank=True
+    )
+    move_stop_after = models.IntegerField(null=True, blank=True)
+    move_stop_after_rr = models.DecimalField(null=True, blank=True, decimal_places=12, max_digits=20)
+
     def screenshot_upload_path(self, filename):
         account_id = self.account.id if self.account else 'unknown'
         user_id = "unknown"
@@ -385,10 +565,15 @@ class Trade(models.Model):
 
     # The actual image file URL relative to your media root is stored in screenshot.url
     # also has relative path: .name, absolute path, .path, actual file object: .file
-    screenshot = models.ImageField(upload_to=screenshot_upload_path,
+    # Files are stored by hash of their content (see storage.py), upload path only provides the extension now.
+    # Screenshots uploaded before that keep their chart_screenshots/... names until dedupe_screenshots is run
+    screenshot = models.ImageField(upload_to=screenshot_upload_path, storage=get_screenshot_storage,
                                    null=True)  # screenshots folder inside MEDIA_ROOT, check settings.py
+    # Small preview for journal grid, generated off the request path by services/utils/screenshots.py
+    screenshot_thumbnail = models.ImageField(storage=get_screenshot_storage, null=True, blank=True)
 
     @classmethod
+    @traced('Trade.create_trade')
     def create_trade(cls, side: str, account: Account, tool_name: str, risk_percent: Decimal, risk_usd: Decimal,
                      leverage: int, trigger_price: Decimal, entry_price: Decimal,
                      stop_price: Decimal, take_profits: list[Decimal], move_stop_after: int,
@@ -403,8 +588,14 @@ class Trade(models.Model):
         except Tool.DoesNotExist:
             tool_obj = Tool.objects.create(account=account, name=tool_name)
 
+        # Trade keeps plan as position stores it, with take-profits sorted and default cancel levels set
+        take_profits, cancel_levels = Position.plan_levels(side, take_profits, [])
+
         trade = cls.objects.create(side=side, tool=tool_obj, risk_percent=risk_percent, risk_usd=risk_usd,
-                                   account=account, start_time=start_time)
+                                   account=account, start_time=start_time, trigger_price=trigger_price,
+                                   entry_price=entry_price, stop_price=stop_price,
+                                   take_profit_prices=take_profits, cancel_levels=cancel_levels,
+                                   move_stop_after=move_stop_after, move_stop_after_rr=move_stop_after_rr)
 
         Position.objects.create(tool=tool_obj, side=side, leverage=leverage, trigger_price=trigger_price,
                                 entry_price=entry_price,
@@ -1,10 +1,13 @@
 from datetime import datetime
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import validate_email
 from rest_framework import serializers
 from .models import Account, Trade, Tool
+from .services.analytics.kline_store import INTERVALS_MS
+from .services.analytics.rule_sweep import RANKING_METRICS
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 """
@@ -254,15 +257,191 @@ class PnLProgressionSerializer(serializers.Serializer):
     cumulative_pnl = serializers.DecimalField(decimal_places=2, max_digits=20)
 
 
+class StatsDashboardSerializer(serializers.Serializer):
+    pnl_by_day = serializers.DictField(
+        child=serializers.DecimalField(decimal_places=10, default=0.00, max_digits=20),
+    )
+    total_pnl = serializers.DecimalField(decimal_places=2, max_digits=20)
+    winrate = serializers.FloatField()
+    month_winrate = serializers.FloatField()
+    month_num_trades = serializers.IntegerField()
+    tools_winrates = ToolsWithWinratesSerializer(many=True)
+    pnl_progression = PnLProgressionSerializer(many=True)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['pnl_by_day'] = {
+            day: clean_decimal_str(Decimal(amount))
+            for day, amount in data['pnl_by_day'].items()
+        }
+        return data
+
+
+class AnalyticsSummarySerializer(serializers.Serializer):
+    total_trades = serializers.IntegerField()
+    longs = serializers.IntegerField()
+    shorts = serializers.IntegerField()
+    winrate = serializers.FloatField()
+    total_pnl = serializers.FloatField()
+    total_commission = serializers.FloatField()
+    gross_profit = serializers.FloatField()
+    gross_loss = serializers.FloatField()
+    profit_factor = serializers.FloatField(allow_null=True)
+    avg_win = serializers.FloatField()
+    avg_loss = serializers.FloatField()
+    payoff_ratio = serializers.FloatField(allow_null=True)
+    expectancy = serializers.FloatField()
+    expectancy_r = serializers.FloatField(allow_null=True)
+    median_r = serializers.FloatField(allow_null=True)
+    avg_holding_hours = serializers.FloatField()
+    max_drawdown = serializers.FloatField()
+    current_drawdown = serializers.FloatField()
+    max_drawdown_duration_days = serializers.FloatField()
+    max_drawdown_duration_trades = serializers.IntegerField()
+    sharpe = serializers.FloatField(allow_null=True)
+    sortino = serializers.FloatField(allow_null=True)
+    max_win_streak = serializers.IntegerField()
+    max_loss_streak = serializers.IntegerField()
+    current_streak = serializers.IntegerField(help_text='Positive for winning streak, negative for losing one')
+
+
+class RMultipleBinSerializer(serializers.Serializer):
+    r_from = serializers.FloatField()
+    r_to = serializers.FloatField()
+    count = serializers.IntegerField()
+
+
+class AnalyticsSerializer(serializers.Serializer):
+    summary = AnalyticsSummarySerializer(allow_null=True)
+    r_distribution = RMultipleBinSerializer(many=True)
+
+
+class GroupPerformanceSerializer(serializers.Serializer):
+    name = serializers.CharField(allow_null=True)
+    total_trades = serializers.IntegerField()
+    winrate = serializers.FloatField()
+    total_pnl = serializers.FloatField()
+    commission = serializers.FloatField()
+    expectancy = serializers.FloatField()
+    avg_r = serializers.FloatField(allow_null=True)
+    profit_factor = serializers.FloatField(allow_null=True)
+
+
+class AnalyticsBreakdownSerializer(serializers.Serializer):
+    by_setup = GroupPerformanceSerializer(many=True)
+    by_tool = GroupPerformanceSerializer(many=True)
+
+
+class EquityPointSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    equity = serializers.FloatField()
+    drawdown = serializers.FloatField()
+
+
+class SetupPerformanceSerializer(serializers.Serializer):
+    trade_setup = serializers.CharField(allow_null=True)
+    timeframe = serializers.CharField(allow_null=True)
+    side = serializers.CharField(allow_null=True)
+    level = serializers.IntegerField(
+        help_text='Bitmask of rolled up columns: 0 - setup/timeframe/side, 1 - setup/timeframe, 3 - setup, 7 - total')
+    total_trades = serializers.IntegerField()
+    winning_trades = serializers.IntegerField()
+    winrate = serializers.FloatField()
+    avg_r = serializers.FloatField(allow_null=True)
+    total_pnl = serializers.DecimalField(decimal_places=2, max_digits=20)
+    commission = serializers.DecimalField(decimal_places=2, max_digits=20)
+
+
+class ReplaySummarySerializer(serializers.Serializer):
+    total_trades = serializers.IntegerField()
+    filled_trades = serializers.IntegerField()
+    cancelled_trades = serializers.IntegerField()
+    open_trades = serializers.IntegerField()
+    win_rate = serializers.FloatField(allow_null=True)
+    total_r = serializers.FloatField(allow_null=True)
+    avg_r = serializers.FloatField(allow_null=True)
+    profit_factor = serializers.FloatField(allow_null=True)
+    total_pnl = serializers.FloatField(allow_null=True)
+
+
+class ReplayedTradeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=['not_filled', 'cancelled', 'closed', 'open'])
+    exit_reason = serializers.ChoiceField(choices=['stop', 'breakeven', 'take_profits'], allow_null=True)
+    fill_time = serializers.IntegerField(allow_null=True, help_text='Open time of fill candle, unix ms')
+    exit_time = serializers.IntegerField(allow_null=True, help_text='Open time of exit candle, unix ms')
+    exit_price = serializers.FloatField(allow_null=True)
+    takes_filled = serializers.IntegerField()
+    breakeven = serializers.BooleanField()
+    pnl_usd = serializers.FloatField(allow_null=True, help_text='Gross, without commissions')
+    r_multiple = serializers.FloatField(allow_null=True)
+
+
+class ReplaySerializer(serializers.Serializer):
+    summary = ReplaySummarySerializer()
+    trades = ReplayedTradeSerializer(many=True)
+
+
+class RuleSweepSerializer(serializers.Serializer):
+    """Values of each rule to combine, empty list keeps rule each trade was opened with"""
+    move_stop_after = serializers.ListField(child=serializers.IntegerField(min_value=0), default=list,
+                                            max_length=50)
+    move_stop_after_rr = serializers.ListField(
+        child=serializers.FloatField(min_value=0), default=list, max_length=50,
+        help_text='0 turns breakeven by risk reward off, so move_stop_after is used instead')
+    num_take_profits = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=10), default=list,
+                                             max_length=10)
+    cancel_over_r = serializers.ListField(
+        child=serializers.FloatField(min_value=0), default=list, max_length=50,
+        help_text='Overbuy/overlow cancel level, in risks beyond entry')
+    cancel_take_r = serializers.ListField(
+        child=serializers.FloatField(min_value=0), default=list, max_length=50,
+        help_text='Take-profit cancel level, in risks from entry towards take-profits')
+    interval = serializers.ChoiceField(choices=list(INTERVALS_MS), required=False)
+    order_by = serializers.ChoiceField(choices=list(RANKING_METRICS), default='total_r')
+    limit = serializers.IntegerField(min_value=1, default=100)
+
+    def validate(self, data):
+        combinations = 1
+        for field in ('move_stop_after', 'move_stop_after_rr', 'num_take_profits', 'cancel_over_r', 'cancel_take_r'):
+            combinations *= max(len(data[field]), 1)
+        if combinations > settings.SWEEP_MAX_COMBINATIONS:
+            raise serializers.ValidationError(
+                f"Sweep has {combinations} combinations, at most {settings.SWEEP_MAX_COMBINATIONS} are allowed")
+        return data
+
+
+class RuleSweepRowSerializer(ReplaySummarySerializer):
+    rank = serializers.IntegerField()
+    move_stop_after = serializers.IntegerField(allow_null=True)
+    move_stop_after_rr = serializers.FloatField(allow_null=True)
+    num_take_profits = serializers.IntegerField(allow_null=True)
+    cancel_over_r = serializers.FloatField(allow_null=True)
+    cancel_take_r = serializers.FloatField(allow_null=True)
+
+
+class RuleSweepJobSerializer(serializers.Serializer):
+    job_id = serializers.CharField()
+    status = serializers.ChoiceField(choices=['queued', 'running', 'done', 'failed'])
+    combinations = serializers.IntegerField()
+    # Only set once sweep is done or failed
+    rows = RuleSweepRowSerializer(many=True, required=False)
+    error = serializers.CharField(required=False)
+
+
 ##### JOURNAL #####
 class ShowTradeSerializer(serializers.ModelSerializer):
     # DRF automatically calls get_screenshot_url before to_representation to set this param
     screenshot_url = serializers.SerializerMethodField()
+    # Null until uploaded screenshot is processed, full size screenshot is loaded only when opened
+    thumbnail_url = serializers.SerializerMethodField()
     trade_number = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Trade
-        exclude = ['screenshot']
+        # Plan of trade is only kept for replays, see services/analytics/trade_replay.py
+        exclude = ['screenshot', 'screenshot_thumbnail', 'trigger_price', 'entry_price', 'stop_price',
+                   'take_profit_prices', 'cancel_levels', 'move_stop_after', 'move_stop_after_rr']
 
     def get_screenshot_url(self, obj):
         request = self.context.get('request')
@@ -271,6 +450,12 @@ class ShowTradeSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.screenshot.url)
         return None
 
+    def get_thumbnail_url(self, obj):
+        request = self.context.get('request')
+        if obj.screenshot_thumbnail:
+            return request.build_absolute_uri(obj.screenshot_thumbnail.url)
+        return None
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
 
@@ -400,6 +585,37 @@ class PositionToOpenSerializer(serializers.Serializer):
         return data
 
 
+class PositionScenarioSerializer(serializers.Serializer):
+    entry_p = serializers.DecimalField(decimal_places=10, max_digits=20, min_value=0)
+    stop_p = serializers.DecimalField(decimal_places=10, max_digits=20, min_value=0)
+    take_profits = serializers.ListField(
+        child=serializers.DecimalField(decimal_places=10, max_digits=20)
+    )
+    leverage = serializers.IntegerField(min_value=1)
+    volume = serializers.DecimalField(decimal_places=10, max_digits=20, required=False, allow_null=True)
+
+    def validate(self, data):
+        data = super().validate(data)
+
+        entry_p = data['entry_p']
+        stop_p = data['stop_p']
+
+        if entry_p == stop_p:
+            raise serializers.ValidationError("Stop price must differ from entry price")
+
+        if entry_p > stop_p and any(tp <= entry_p for tp in data['take_profits']):
+            raise serializers.ValidationError("Take profits must be above entry price for long position")
+        elif entry_p < stop_p and any(tp >= entry_p for tp in data['take_profits']):
+            raise serializers.ValidationError("Take profits must be below entry price for short position")
+
+        return data
+
+
+class PositionScenariosSerializer(serializers.Serializer):
+    tool = serializers.CharField()
+    scenarios = PositionScenarioSerializer(many=True, min_length=1, max_length=100)
+
+
 class ProcessedPositionToOpenSerializer(serializers.Serializer):
     volume = serializers.DecimalField(decimal_places=10, default=0.00, max_digits=20)
     margin = serializers.DecimalField(decimal_places=10, default=0.00, max_digits=20)
@@ -414,6 +630,85 @@ class ProcessedPositionToOpenSerializer(serializers.Serializer):
         return data
 
 
+class PriceRangeSerializer(serializers.Serializer):
+    start = serializers.DecimalField(decimal_places=10, max_digits=20, min_value=0)
+    end = serializers.DecimalField(decimal_places=10, max_digits=20, min_value=0)
+    steps = serializers.IntegerField(min_value=1, max_value=100, default=1,
+                                     help_text='Number of evenly spaced prices from start to end, both included')
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        start, end, steps = data['start'], data['end'], data['steps']
+        if steps == 1:
+            return [start]
+        return [start + (end - start) * i / (steps - 1) for i in range(steps)]
+
+
+class LeverageRangeSerializer(serializers.Serializer):
+    start = serializers.IntegerField(min_value=1)
+    end = serializers.IntegerField(min_value=1)
+    step = serializers.IntegerField(min_value=1, default=1)
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        if data['end'] < data['start']:
+            raise serializers.ValidationError("End leverage must not be less than start one")
+        return list(range(data['start'], data['end'] + 1, data['step']))
+
+
+class PositionGridSerializer(serializers.Serializer):
+    tool = serializers.CharField()
+    entry = PriceRangeSerializer()
+    stop = PriceRangeSerializer()
+    leverage = LeverageRangeSerializer()
+    take_profits = serializers.ListField(
+        child=serializers.DecimalField(decimal_places=10, max_digits=20), default=list
+    )
+
+    def validate(self, data):
+        cells = len(data['entry']) * len(data['stop']) * len(data['leverage'])
+        if cells > settings.POSITION_GRID_MAX_CELLS:
+            raise serializers.ValidationError(
+                f"Grid has {cells} combinations, at most {settings.POSITION_GRID_MAX_CELLS} are allowed")
+        return data
+
+
+class PositionGridCellSerializer(ProcessedPositionToOpenSerializer):
+    entry_p = serializers.DecimalField(decimal_places=10, max_digits=20)
+    stop_p = serializers.DecimalField(decimal_places=10, max_digits=20)
+    leverage = serializers.IntegerField()
+    risk_reward = serializers.FloatField(allow_null=True, help_text='Potential profit to potential loss')
+    liquidation_price = serializers.FloatField(allow_null=True, help_text='Estimate for cross margin')
+    liquidation_distance_percent = serializers.FloatField(allow_null=True,
+                                                          help_text='Price move from entry to liquidation')
+    stop_before_liquidation = serializers.BooleanField(allow_null=True)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field in ['entry_p', 'stop_p']:
+            data[field] = clean_decimal_str(Decimal(data[field]))
+        return data
+
+
+class ToolMarketDataSerializer(serializers.Serializer):
+    tool = serializers.CharField()
+    last_price = serializers.DecimalField(decimal_places=12, max_digits=30, allow_null=True)
+    price_change_percent = serializers.DecimalField(decimal_places=4, max_digits=20, allow_null=True)
+    high_price = serializers.DecimalField(decimal_places=12, max_digits=30, allow_null=True)
+    low_price = serializers.DecimalField(decimal_places=12, max_digits=30, allow_null=True)
+    quote_volume = serializers.DecimalField(decimal_places=4, max_digits=30, allow_null=True)
+    mark_price = serializers.DecimalField(decimal_places=12, max_digits=30, allow_null=True)
+    funding_rate = serializers.DecimalField(decimal_places=8, max_digits=20, allow_null=True)
+    next_funding_time = serializers.IntegerField(allow_null=True, help_text="Unix time in milliseconds")
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field in ['last_price', 'high_price', 'low_price', 'mark_price']:
+            if data[field] is not None:
+                data[field] = clean_decimal_str(Decimal(data[field]))
+        return data
+
+
 class PendingPositionSerializer(serializers.Serializer):
     trade_id = serializers.IntegerField()
     tool = serializers.CharField()
@@ -433,11 +728,12 @@ class PendingPositionSerializer(serializers.Serializer):
     cancel_levels = serializers.ListField(
         child=serializers.DecimalField(decimal_places=12, max_digits=20, allow_null=True),
     )
+    last_price = serializers.DecimalField(decimal_places=12, max_digits=30, required=False, allow_null=True)
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        for field in ['entry_price', 'trigger_price', 'stop_price', 'margin', 'volume']:
-            if field in data:
+        for field in ['entry_price', 'trigger_price', 'stop_price', 'margin', 'volume', 'last_price']:
+            if data.get(field) is not None:
                 data[field] = clean_decimal_str(Decimal(data[field]))
 
         if data['trigger_price'] == 0:
@@ -0,0 +1,249 @@
+"""
+Vectorised analytics over closed trades of the journal.
+Trades are loaded into columnar NumPy arrays with a single query, after that every metric is computed
+with array operations, so the cost of analytics doesn't depend on Python loops over trades.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+SECONDS_IN_DAY = 24 * 60 * 60
+TRADING_DAYS_IN_YEAR = 365  # crypto markets work every day
+
+# R-multiple histogram edges, values outside are put into outermost bins
+R_BINS = np.arange(-3, 5.5, 0.5)
+
+
+@dataclass
+class TradeColumns:
+    pnl: np.ndarray  # float64, net pnl in USD
+    risk_usd: np.ndarray  # float64
+    commission: np.ndarray  # float64
+    start_ts: np.ndarray  # int64, unix seconds
+    end_ts: np.ndarray  # int64, unix seconds
+    side: np.ndarray  # int8, 1 for LONG and -1 for SHORT
+    tool_code: np.ndarray  # int64 indices into `tools`
+    setup_code: np.ndarray  # int64 indices into `setups`
+    tools: np.ndarray  # str labels of tools
+    setups: np.ndarray  # str labels of setups, empty string for trades without setup
+
+    @property
+    def size(self) -> int:
+        return self.pnl.size
+
+    @classmethod
+    def from_queryset(cls, trades) -> 'TradeColumns':
+        """
+        :param trades: Queryset of Trade objects, only finished trades are taken into account
+        """
+        rows = list(
+            trades.filter(start_time__isnull=False, end_time__isnull=False)
+            .order_by('end_time', 'pk')
+            .values_list('pnl_usd', 'risk_usd', 'commission_usd', 'start_time', 'end_time', 'side', 'tool__name',
+                         'trade_setup')
+        )
+
+        if not rows:
+            return cls(*(np.empty(0, dtype=dtype) for dtype in
+                         (np.float64, np.float64, np.float64, np.int64, np.int64, np.int8, np.int64, np.int64)),
+                       tools=np.empty(0, dtype=str), setups=np.empty(0, dtype=str))
+
+        pnl, risk_usd, commission, start_time, end_time, side, tool_name, trade_setup = zip(*rows)
+
+        tools, tool_code = np.unique(np.array(tool_name, dtype=str), return_inverse=True)
+        setups, setup_code = np.unique(np.array([setup or '' for setup in trade_setup], dtype=str),
+                                       return_inverse=True)
+
+        return cls(
+            pnl=np.array(pnl, dtype=np.float64),
+            risk_usd=np.array(risk_usd, dtype=np.float64),
+            commission=np.array(commission, dtype=np.float64),
+            start_ts=np.array([dt.timestamp() for dt in start_time], dtype=np.int64),
+            end_ts=np.array([dt.timestamp() for dt in end_time], dtype=np.int64),
+            side=np.where(np.array(side, dtype=str) == 'LONG', 1, -1).astype(np.int8),
+            tool_code=tool_code.astype(np.int64),
+            setup_code=setup_code.astype(np.int64),
+            tools=tools,
+            setups=setups,
+        )
+
+
+def _num(value, digits: int = 4) -> float | None:
+    """Converts numpy scalar into JSON friendly float, undefined values become None"""
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        return None
+    return round(value, digits) + 0.0  # gets rid of negative zeros
+
+
+def _ratio(numerator, denominator, digits: int = 4) -> float | None:
+    return _num(numerator / denominator, digits) if denominator else None
+
+
+def calc_drawdown(equity: np.ndarray, end_ts: np.ndarray, start_ts: int) -> dict:
+    """
+    :param equity: Cumulative pnl after each trade
+    :param end_ts: Close time of each trade
+    :param start_ts: Moment from which equity curve starts
+    """
+    # Equity curve starts from zero, before the first trade
+    peak = np.maximum.accumulate(np.maximum(equity, 0))
+    drawdown = equity - peak
+
+    idx = np.arange(equity.size)
+    at_peak = drawdown >= 0
+    # Index of the last trade which made new high, -1 means that the curve hasn't got above the start yet
+    last_peak_idx = np.maximum.accumulate(np.where(at_peak, idx, -1))
+    peak_ts = np.where(last_peak_idx >= 0, end_ts[np.maximum(last_peak_idx, 0)], start_ts)
+
+    underwater_seconds = np.where(at_peak, 0, end_ts - peak_ts)
+    underwater_trades = np.where(at_peak, 0, idx - last_peak_idx)
+
+    return {
+        'max_drawdown': _num(-drawdown.min(), 2),
+        'current_drawdown': _num(-drawdown[-1], 2),
+        'max_drawdown_duration_days': _num(underwater_seconds.max() / SECONDS_IN_DAY, 2),
+        'max_drawdown_duration_trades': int(underwater_trades.max()),
+    }
+
+
+def calc_streaks(pnl: np.ndarray) -> dict:
+    outcome = np.sign(pnl)
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(outcome)) + 1))
+    run_lengths = np.diff(np.concatenate((run_starts, [pnl.size])))
+    run_outcome = outcome[run_starts]
+
+    return {
+        'max_win_streak': int(run_lengths[run_outcome > 0].max(initial=0)),
+        'max_loss_streak': int(run_lengths[run_outcome < 0].max(initial=0)),
+        # Positive for winning streak, negative for losing one
+        'current_streak': int(run_lengths[-1] * run_outcome[-1]),
+    }
+
+
+def calc_daily_ratios(pnl: np.ndarray, end_ts: np.ndarray) -> dict:
+    """
+    Sharpe and Sortino ratios over daily pnl in USD, days without trades count as zero pnl days.
+    """
+    day = end_ts // SECONDS_IN_DAY
+    daily_pnl = np.bincount(day - day.min(), weights=pnl)
+
+    if daily_pnl.size < 2:
+        return {'sharpe': None, 'sortino': None}
+
+    mean = daily_pnl.mean()
+    std = daily_pnl.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(daily_pnl, 0) ** 2))
+    annualization = np.sqrt(TRADING_DAYS_IN_YEAR)
+
+    return {
+        'sharpe': _ratio(mean * annualization, std),
+        'sortino': _ratio(mean * annualization, downside),
+    }
+
+
+def calc_r_distribution(r_multiples: np.ndarray) -> list[dict]:
+    counts, edges = np.histogram(np.clip(r_multiples, R_BINS[0], R_BINS[-1]), bins=R_BINS)
+    return [
+        {'r_from': _num(lo, 2), 'r_to': _num(hi, 2), 'count': int(count)}
+        for lo, hi, count in zip(edges[:-1], edges[1:], counts)
+    ]
+
+
+def calc_group_breakdown(codes: np.ndarray, labels: np.ndarray, cols: TradeColumns) -> list[dict]:
+    """
+    Per group performance, all groups are computed at once via bincount over group codes.
+    """
+    k = labels.size
+    pnl = cols.pnl
+    has_risk = cols.risk_usd > 0
+
+    count = np.bincount(codes, minlength=k)
+    wins = np.bincount(codes, weights=pnl > 0, minlength=k)
+    total_pnl = np.bincount(codes, weights=pnl, minlength=k)
+    commission = np.bincount(codes, weights=cols.commission, minlength=k)
+    gross_profit = np.bincount(codes, weights=np.maximum(pnl, 0), minlength=k)
+    gross_loss = -np.bincount(codes, weights=np.minimum(pnl, 0), minlength=k)
+    r_sum = np.bincount(codes[has_risk], weights=pnl[has_risk] / cols.risk_usd[has_risk], minlength=k)
+    r_count = np.bincount(codes[has_risk], minlength=k)
+
+    groups = [
+        {
+            'name': str(labels[i]) or None,
+            'total_trades': int(count[i]),
+            'winrate': _ratio(wins[i], count[i]),
+            'total_pnl': _num(total_pnl[i], 2),
+            'commission': _num(commission[i], 2),
+            'expectancy': _ratio(total_pnl[i], count[i], 2),
+            'avg_r': _ratio(r_sum[i], r_count[i]),
+            'profit_factor': _ratio(gross_profit[i], gross_loss[i]),
+        }
+        for i in np.flatnonzero(count)
+    ]
+
+    return sorted(groups, key=lambda group: group['total_pnl'], reverse=True)
+
+
+def calc_equity_curve(pnl: np.ndarray, end_ts: np.ndarray) -> list[dict]:
+    """
+    Equity and drawdown at the end of each day with closed trades.
+    """
+    day = end_ts // SECONDS_IN_DAY
+    days, day_idx = np.unique(day, return_inverse=True)
+    equity = np.cumsum(np.bincount(day_idx, weights=pnl))
+    drawdown = equity - np.maximum.accumulate(np.maximum(equity, 0))
+    dates = days.astype('datetime64[D]').astype(str)
+
+    return [
+        {'day': str(date), 'equity': _num(eq, 2), 'drawdown': _num(dd, 2)}
+        for date, eq, dd in zip(dates, equity, drawdown)
+    ]
+
+
+def compute_journal_analytics(cols: TradeColumns) -> dict:
+    if cols.size == 0:
+        return {'summary': None, 'r_distribution': [], 'by_setup': [], 'by_tool': [], 'equity_curve': []}
+
+    pnl = cols.pnl
+    wins = pnl > 0
+    losses = pnl < 0
+    has_risk = cols.risk_usd > 0
+    r_multiples = pnl[has_risk] / cols.risk_usd[has_risk]
+
+    gross_profit = pnl[wins].sum()
+    gross_loss = -pnl[losses].sum()
+    avg_win = pnl[wins].mean() if wins.any() else 0
+    avg_loss = -pnl[losses].mean() if losses.any() else 0
+
+    equity = np.cumsum(pnl)
+
+    summary = {
+        'total_trades': int(cols.size),
+        'longs': int((cols.side > 0).sum()),
+        'shorts': int((cols.side < 0).sum()),
+        'winrate': _num(wins.mean()),
+        'total_pnl': _num(equity[-1], 2),
+        'total_commission': _num(cols.commission.sum(), 2),
+        'gross_profit': _num(gross_profit, 2),
+        'gross_loss': _num(gross_loss, 2),
+        'profit_factor': _ratio(gross_profit, gross_loss),
+        'avg_win': _num(avg_win, 2),
+        'avg_loss': _num(avg_loss, 2),
+        'payoff_ratio': _ratio(avg_win, avg_loss),
+        'expectancy': _num(pnl.mean(), 2),
+        'expectancy_r': _num(r_multiples.mean()) if r_multiples.size else None,
+        'median_r': _num(np.median(r_multiples)) if r_multiples.size else None,
+        'avg_holding_hours': _num((cols.end_ts - cols.start_ts).mean() / 3600, 2),
+        **calc_drawdown(equity, cols.end_ts, int(cols.start_ts.min())),
+        **calc_daily_ratios(pnl, cols.end_ts),
+        **calc_streaks(pnl),
+    }
+
+    return {
+        'summary': summary,
+        'r_distribution': calc_r_distribution(r_multiples),
+        'by_setup': calc_group_breakdown(cols.setup_code, cols.setups, cols),
+        'by_tool': calc_group_breakdown(cols.tool_code, cols.tools, cols),
+        'equity_curve': calc_equity_curve(pnl, cols.end_ts),
+    }
@@ -0,0 +1,165 @@
+"""
+Local store of OHLCV candles downloaded from exchange, so chart overlays, analytics and simulations don't re-download
+them. Candles of each symbol and interval are kept in their own append-only file of fixed size records, which is
+memory-mapped for reading, and synced incrementally from the last stored candle.
+Only closed candles are stored, so stored data never changes and files are only appended to.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from loguru import logger
+
+from bingX.perpetual.v2.market import Market
+
+KLINE_DTYPE = np.dtype([
+    ('time', '<i8'),  # open time, unix milliseconds
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+# Intervals of fixed length supported by BingX, 1M is left out as months differ in length
+INTERVALS_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+# Maximum number of candles BingX returns per request
+PAGE_LIMIT = 1440
+
+
+def _now_ms() -> int:
+    return int(timezone.now().timestamp() * 1000)
+
+
+def _to_records(candles: list[dict]) -> np.ndarray:
+    records = np.empty(len(candles), dtype=KLINE_DTYPE)
+    for i, candle in enumerate(candles):
+        records[i] = (int(candle['time']), float(candle['open']), float(candle['high']), float(candle['low']),
+                      float(candle['close']), float(candle['volume']))
+    return records
+
+
+class KlineStore:
+    def __init__(self, root: str | os.PathLike | None = None):
+        self.root = Path(root or settings.KLINES_DIR)
+
+    def path(self, symbol: str, interval: str) -> Path:
+        if interval not in INTERVALS_MS:
+            raise ValueError(f'Unsupported interval: {interval}')
+        return self.root / symbol.upper() / f'{interval}.bin'
+
+    def load(self, symbol: str, interval: str, start_ms: int | None = None, end_ms: int | None = None) -> np.ndarray:
+        """
+        :return: Read-only memory-mapped candles with open time within [start_ms, end_ms), sorted by time
+        """
+        path = self.path(symbol, interval)
+        # Record being appended at the moment is left out
+        count = path.stat().st_size // KLINE_DTYPE.itemsize if path.exists() else 0
+        if count == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+
+        candles = np.memmap(path, dtype=KLINE_DTYPE, mode='r', shape=(count,))
+        times = candles['time']
+        start = 0 if start_ms is None else int(np.searchsorted(times, start_ms, side='left'))
+        end = count if end_ms is None else int(np.searchsorted(times, end_ms, side='left'))
+        return candles[start:end]
+
+    def last_time(self, symbol: str, interval: str) -> int | None:
+        candles = self.load(symbol, interval)
+        return int(candles['time'][-1]) if len(candles) else None
+
+    def symbols(self) -> dict[str, list[str]]:
+        """
+        :return: Stored intervals keyed by symbol
+        """
+        if not self.root.exists():
+            return {}
+        return {
+            symbol_dir.name: sorted(path.stem for path in symbol_dir.glob('*.bin'))
+            for symbol_dir in sorted(self.root.iterdir()) if symbol_dir.is_dir()
+        }
+
+    @contextmanager
+    def _locked(self, path: Path) -> Iterator:
+        """Only one process syncs a file at a time, readers don't need the lock as records are only appended"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_suffix('.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def sync(self, market: Market, symbol: str, interval: str, since_ms: int | None = None) -> int:
+        """
+        Appends candles closed since the last stored one, or since since_ms if nothing is stored yet,
+        downloading them page by page.
+        :return: Number of appended candles
+        """
+        path = self.path(symbol, interval)
+        step = INTERVALS_MS[interval]
+
+        with self._locked(path):
+            if path.exists():
+                # Interrupted append could leave incomplete record at the end
+                size = path.stat().st_size
+                if size % KLINE_DTYPE.itemsize:
+                    os.truncate(path, size - size % KLINE_DTYPE.itemsize)
+
+            last = self.last_time(symbol, interval)
+            if last is not None:
+                start = last + step
+            elif since_ms is not None:
+                start = since_ms - since_ms % step
+            else:
+                start = _now_ms() - settings.KLINES_DEFAULT_HISTORY_DAYS * 24 * 60 * 60_000
+                start -= start % step
+
+            # Candle which is still forming isn't stored
+            closed_until = _now_ms() // step * step
+
+            appended = 0
+            with open(path, 'ab') as f:
+                while start < closed_until:
+                    end = min(start + PAGE_LIMIT * step, closed_until)
+                    candles = market.get_k_line_data(symbol, interval, start_time=start, end_time=end - 1,
+                                                     limit=PAGE_LIMIT)
+
+                    records = _to_records(candles) if isinstance(candles, list) else _to_records([candles])
+                    if len(records):
+                        records.sort(order='time')
+                        records = records[(records['time'] >= start) & (records['time'] < closed_until)]
+
+                    if len(records):
+                        f.write(records.tobytes())
+                        f.flush()
+                        appended += len(records)
+                        start = int(records['time'][-1]) + step
+                    else:
+                        # Nothing was traded in the window, i.e. before listing of the symbol
+                        start = end
+
+        if appended:
+            logger.info(f'Stored {appended} {interval} candles of {symbol}')
+        return appended
@@ -0,0 +1,127 @@
+"""
+Sweep of position management rules over journaled trades: every combination of breakeven, take-profit and cancel level
+settings is replayed by trade_replay and combinations are ranked by their outcome.
+Candles following trades are gathered once per worker process, so a combination only costs array operations.
+Workers are spawned rather than forked, as sweeps run on a thread of web worker, and forking a process with threads
+is unsafe. Web app runs sweeps in background, see sweep_jobs.py.
+"""
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from .trade_replay import TradePlans, prepare_windows, replay
+
+RANKING_METRICS = ('total_r', 'avg_r', 'profit_factor', 'win_rate', 'total_pnl')
+
+# Below that many combinations sweep runs in the calling process, as starting workers takes longer than the sweep
+MIN_PARALLEL_COMBINATIONS = 50
+# Hard cap of worker processes of one sweep, whatever number is asked for
+MAX_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Rules replayed instead of the ones trades were opened with, None keeps rule of each trade"""
+    move_stop_after: int | None = None
+    move_stop_after_rr: float | None = None  # 0 turns breakeven by risk reward off, so takes rule is used
+    num_take_profits: int | None = None  # take-profits evenly spread between entry and the farthest one of trade
+    cancel_over_r: float | None = None  # overbuy/overlow cancel level, in risks beyond entry
+    cancel_take_r: float | None = None  # take-profit cancel level, in risks towards take-profits
+
+    def as_dict(self) -> dict:
+        return {
+            'move_stop_after': self.move_stop_after,
+            'move_stop_after_rr': self.move_stop_after_rr,
+            'num_take_profits': self.num_take_profits,
+            'cancel_over_r': self.cancel_over_r,
+            'cancel_take_r': self.cancel_take_r,
+        }
+
+
+def build_rule_sets(move_stop_after=(None,), move_stop_after_rr=(None,), num_take_profits=(None,),
+                    cancel_over_r=(None,), cancel_take_r=(None,)) -> list[RuleSet]:
+    """Grid of all combinations of given values"""
+    return [RuleSet(*combination) for combination in itertools.product(
+        move_stop_after or (None,), move_stop_after_rr or (None,), num_take_profits or (None,),
+        cancel_over_r or (None,), cancel_take_r or (None,),
+    )]
+
+
+def apply_rules(plans: TradePlans, rules: RuleSet) -> TradePlans:
+    """
+    :return: Plans of the same trades with rules replaced, symbols, sides and starts stay the same,
+    so candle windows of original plans can be reused
+    """
+    side = plans.side.astype(np.float64)
+    risk = np.abs(plans.entry - plans.stop)
+    changes = {}
+
+    if rules.move_stop_after is not None:
+        changes['move_stop_after'] = np.full(plans.size, rules.move_stop_after, dtype=np.int64)
+
+    if rules.move_stop_after_rr is not None:
+        changes['move_stop_after_rr'] = np.full(plans.size, rules.move_stop_after_rr or np.nan)
+
+    if rules.num_take_profits is not None:
+        n = rules.num_take_profits
+        num_takes = (~np.isnan(plans.take_profits)).sum(axis=1)
+        farthest = plans.take_profits[np.arange(plans.size), np.maximum(num_takes - 1, 0)]
+        steps = np.arange(1, n + 1) / n
+        changes['take_profits'] = plans.entry[:, None] + (farthest - plans.entry)[:, None] * steps[None, :]
+        changes['take_volumes'] = np.full((plans.size, n), 1 / n)
+
+    if rules.cancel_over_r is not None:
+        changes['cancel_over'] = plans.entry - side * rules.cancel_over_r * risk
+    if rules.cancel_take_r is not None:
+        changes['cancel_take'] = plans.entry + side * rules.cancel_take_r * risk
+
+    return replace(plans, **changes)
+
+
+# State of worker process, set once by _init_worker
+_worker_plans: TradePlans | None = None
+_worker_windows = None
+
+
+def _init_worker(plans: TradePlans, candles_by_symbol: dict[str, np.ndarray], max_bars: int):
+    global _worker_plans, _worker_windows
+    _worker_plans = plans
+    _worker_windows = prepare_windows(plans, candles_by_symbol, max_bars)
+
+
+def _replay_rule_sets(plans: TradePlans, windows, rule_sets: list[RuleSet]) -> list[dict]:
+    return [{**rules.as_dict(), **replay(apply_rules(plans, rules), windows=windows).summary()} for rules in rule_sets]
+
+
+def _run(rule_sets: list[RuleSet]) -> list[dict]:
+    return _replay_rule_sets(_worker_plans, _worker_windows, rule_sets)
+
+
+def sweep(plans: TradePlans, candles_by_symbol: dict[str, np.ndarray], max_bars: int, rule_sets: list[RuleSet],
+          order_by: str = 'total_r', workers: int | None = None) -> list[dict]:
+    """
+    :return: Rule sets with summary of their replay, best first according to order_by metric
+    """
+    if order_by not in RANKING_METRICS:
+        raise ValueError(f'Unsupported ranking metric: {order_by}')
+
+    workers = min(workers or os.cpu_count() or 1, MAX_WORKERS, len(rule_sets))
+    if workers <= 1 or len(rule_sets) < MIN_PARALLEL_COMBINATIONS:
+        rows = _replay_rule_sets(plans, prepare_windows(plans, candles_by_symbol, max_bars), rule_sets)
+    else:
+        # A few batches per worker keep them busy when some batches replay slower
+        batch = -(-len(rule_sets) // (workers * 4))
+        batches = [rule_sets[i:i + batch] for i in range(0, len(rule_sets), batch)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(plans, candles_by_symbol, max_bars)) as executor:
+            rows = [row for batch_rows in executor.map(_run, batches) for row in batch_rows]
+
+    # Combinations without filled trades have no metrics and go last
+    rows.sort(key=lambda row: (row[order_by] is None, -(row[order_by] or 0)))
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+    return rows
@@ -0,0 +1,89 @@
+"""
+Background rule sweeps of web app. Sweep can take minutes, so request only queues it and gets job id, and job state
+with ranked combinations once it's done is kept in stats cache, which is shared by all web workers, so any of them
+can answer polls of the job. Each web worker runs SWEEP_CONCURRENCY sweeps at a time and queues at most
+SWEEP_MAX_QUEUED more, jobs of worker which was restarted are lost and expire with SWEEP_RESULT_TTL.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from loguru import logger
+
+from trading_buddy.filters import TradeFilters
+from trading_buddy.models import User
+from trading_buddy.services.analytics.rule_sweep import RuleSet
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+_executor = ThreadPoolExecutor(max_workers=settings.SWEEP_CONCURRENCY, thread_name_prefix='rule-sweeps')
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class SweepQueueFull(Exception):
+    """Raised when web worker already has as many sweeps running and queued as it's allowed to"""
+    pass
+
+
+def _cache():
+    return caches[settings.STATS_CACHE_ALIAS]
+
+
+def _key(job_id: str) -> str:
+    return f'sweep:job:{job_id}'
+
+
+def _save(job_id: str, job: dict) -> None:
+    _cache().set(_key(job_id), job, timeout=settings.SWEEP_RESULT_TTL)
+
+
+def _run(job_id: str, job: dict, rule_sets: list[RuleSet], filters: TradeFilters, interval: str | None,
+         order_by: str, limit: int):
+    global _pending
+
+    try:
+        _save(job_id, {**job, 'status': RUNNING})
+        rows = User.objects.get(pk=job['user_id']).sweep_trade_rules(rule_sets, filters, interval, order_by)
+        _save(job_id, {**job, 'status': DONE, 'rows': rows[:limit]})
+    except Exception as e:
+        logger.exception(f'Rule sweep {job_id} failed: {e}')
+        _save(job_id, {**job, 'status': FAILED, 'error': str(e)})
+    finally:
+        with _pending_lock:
+            _pending -= 1
+        # Worker threads have their own DB connections, which aren't closed by request cycle
+        connection.close()
+
+
+def submit(user, rule_sets: list[RuleSet], filters: TradeFilters, interval: str | None, order_by: str,
+           limit: int) -> dict:
+    """
+    Queues sweep of user's trades, see User.sweep_trade_rules
+    :return: Job with job_id to poll it by
+    """
+    global _pending
+
+    with _pending_lock:
+        if _pending >= settings.SWEEP_CONCURRENCY + settings.SWEEP_MAX_QUEUED:
+            raise SweepQueueFull('Too many rule sweeps are running, try again later')
+        _pending += 1
+
+    job_id = uuid.uuid4().hex
+    job = {'job_id': job_id, 'user_id': user.pk, 'status': QUEUED, 'combinations': len(rule_sets)}
+    _save(job_id, job)
+    _executor.submit(_run, job_id, job, rule_sets, filters, interval, order_by, limit)
+    return job
+
+
+def get(job_id: str, user) -> dict | None:
+    """
+    :return: Job of user, None if there is no such job or it expired
+    """
+    job = _cache().get(_key(job_id))
+    if job is None or job['user_id'] != user.pk:
+        return None
+    return job
@@ -0,0 +1,421 @@
+"""
+Replay of position management rules of OrderPoller and price listeners over historical candles.
+Many trades are replayed at once: candles following each trade are gathered into (trades x bars) arrays and
+moments of trigger, fill, cancellation, take-profits, breakeven and stop are found with array operations.
+
+Rules replayed are the same as the live ones:
+ - primary order is TRIGGER_LIMIT when trigger price is set, LIMIT at entry price otherwise;
+ - pending order is cancelled when price reaches overbuy/overlow or take-profit cancel level before it's filled;
+ - position is split between take-profits as calc_take_profits_volumes does, largest volume goes to the first one;
+ - stop-loss is moved to entry after move_stop_after_rr reward is reached, or, when it isn't set and there are
+   several take-profits, after move_stop_after take-profits are filled (right after fill for zero).
+
+Only OHLC of candles is known, so path of price inside a candle is assumed to be open-low-high-close for
+candles closed up and open-high-low-close for the others. Stop-loss moved to breakeven starts working from the next
+candle, as poller only moves it after the fact. Orders are filled completely when price touches them, partial fills
+aren't replayed.
+"""
+import math
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Iterator
+
+import numpy as np
+
+from .kline_store import INTERVALS_MS, KLINE_DTYPE, KlineStore
+from ..exchanges import math_helper as mh
+
+STATUS_NOT_FILLED = 0  # primary order hasn't been triggered or filled within replayed candles
+STATUS_CANCELLED = 1
+STATUS_CLOSED = 2
+STATUS_OPEN = 3  # position is still open at the end of replayed candles, pnl is marked at last close
+STATUS_LABELS = ('not_filled', 'cancelled', 'closed', 'open')
+
+EXIT_NONE = 0
+EXIT_STOP = 1
+EXIT_BREAKEVEN = 2
+EXIT_TAKE_PROFITS = 3
+EXIT_LABELS = (None, 'stop', 'breakeven', 'take_profits')
+
+# Limits size of (trades x bars) arrays, trades are replayed in chunks of at most that many cells.
+# Replay of a chunk makes a few dozen of such arrays, so it takes tens of MB at most
+CHUNK_CELLS = 250_000
+
+
+@dataclass
+class TradePlans:
+    """Plans of trades in columnar form, prices are float64 and missing values are NaN"""
+    symbol: np.ndarray  # str
+    side: np.ndarray  # int8, 1 for LONG and -1 for SHORT
+    start_ms: np.ndarray  # int64, moment primary order was placed
+    trigger: np.ndarray  # 0 for plain limit order
+    entry: np.ndarray
+    stop: np.ndarray
+    take_profits: np.ndarray  # (trades x max number of take-profits), in order they are approached by price
+    take_volumes: np.ndarray  # same shape, share of volume closed by each take-profit
+    move_stop_after: np.ndarray  # int64
+    move_stop_after_rr: np.ndarray
+    cancel_over: np.ndarray  # overbuy/overlow level
+    cancel_take: np.ndarray  # take-profit cancel level
+    volume: np.ndarray  # position volume in coins
+    ids: list = field(default_factory=list)  # trade ids or any labels of hypothetical trades
+
+    @property
+    def size(self) -> int:
+        return self.side.size
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> 'TradePlans':
+        """
+        :param records: Dicts with symbol, side, start_ms, entry_price, stop_price, take_profit_prices and optionally
+        id, trigger_price, move_stop_after, move_stop_after_rr, cancel_levels, volume or risk_usd, and
+        quantity_precision, which makes volumes of take-profits rounded the same way they are on exchange
+        """
+        n = len(records)
+        max_takes = max((len(record['take_profit_prices']) for record in records), default=0)
+        take_profits = np.full((n, max(max_takes, 1)), np.nan)
+        take_volumes = np.zeros_like(take_profits)
+        volume = np.ones(n)
+
+        for i, record in enumerate(records):
+            side = record['side']
+            takes = sorted((float(price) for price in record['take_profit_prices']), reverse=side == 'SHORT')
+            take_profits[i, :len(takes)] = takes
+
+            risk = abs(float(record['entry_price']) - float(record['stop_price']))
+            if record.get('volume'):
+                volume[i] = float(record['volume'])
+            elif record.get('risk_usd') and risk:
+                volume[i] = float(record['risk_usd']) / risk
+            take_volumes[i, :len(takes)] = _take_shares(volume[i], len(takes), record.get('quantity_precision'))
+
+        def column(key, default=math.nan):
+            return np.array([default if record.get(key) is None else float(record[key]) for record in records],
+                            dtype=np.float64)
+
+        def cancel_level(index):
+            return np.array([
+                float(levels[index]) if len(levels) > index and levels[index] is not None else np.nan
+                for levels in (record.get('cancel_levels') or [] for record in records)
+            ], dtype=np.float64)
+
+        return cls(
+            symbol=np.array([record['symbol'] for record in records], dtype=str),
+            side=np.array([1 if record['side'] == 'LONG' else -1 for record in records], dtype=np.int8),
+            start_ms=np.array([int(record['start_ms']) for record in records], dtype=np.int64),
+            trigger=column('trigger_price', 0.0),
+            entry=column('entry_price'),
+            stop=column('stop_price'),
+            take_profits=take_profits,
+            take_volumes=take_volumes,
+            move_stop_after=column('move_stop_after', 0).astype(np.int64),
+            move_stop_after_rr=column('move_stop_after_rr'),
+            cancel_over=cancel_level(0),
+            cancel_take=cancel_level(1),
+            volume=volume,
+            ids=[record.get('id') for record in records],
+        )
+
+    @classmethod
+    def from_trades(cls, trades) -> 'TradePlans':
+        """
+        :param trades: Queryset of Trade objects, trades without stored plan are left out
+        """
+        rows = (trades.filter(entry_price__isnull=False, stop_price__isnull=False, start_time__isnull=False)
+                .order_by('start_time', 'pk')
+                .values('id', 'tool__name', 'side', 'start_time', 'risk_usd', 'trigger_price', 'entry_price',
+                        'stop_price', 'take_profit_prices', 'cancel_levels', 'move_stop_after', 'move_stop_after_rr'))
+
+        records = []
+        for row in rows:
+            if not row['take_profit_prices'] or row['entry_price'] == row['stop_price']:
+                continue
+            row['symbol'] = row.pop('tool__name')
+            row['start_ms'] = int(row.pop('start_time').timestamp() * 1000)
+            records.append(row)
+        return cls.from_records(records)
+
+
+def _take_shares(volume: float, num_take_profits: int, quantity_precision: int | None) -> list[float]:
+    if num_take_profits == 0:
+        return []
+    if quantity_precision is None or not volume:
+        return [1 / num_take_profits] * num_take_profits
+    volumes = mh.calc_take_profits_volumes(Decimal(str(volume)), quantity_precision, num_take_profits)
+    return [float(take_volume) / volume for take_volume in volumes]
+
+
+@dataclass
+class ReplayResult:
+    ids: list
+    status: np.ndarray  # int8, STATUS_*
+    exit_reason: np.ndarray  # int8, EXIT_*
+    fill_ms: np.ndarray  # int64 open time of candle in which primary order was filled, -1 if it wasn't
+    exit_ms: np.ndarray  # int64 open time of candle in which position was closed, -1 if it wasn't
+    exit_price: np.ndarray  # price of the last exit, NaN if there was none
+    takes_filled: np.ndarray  # int64
+    breakeven: np.ndarray  # bool, stop-loss was moved to entry
+    pnl_usd: np.ndarray  # gross pnl, without commissions
+    r_multiple: np.ndarray  # pnl in units of initial risk
+
+    @property
+    def size(self) -> int:
+        return self.status.size
+
+    def to_rows(self) -> list[dict]:
+        return [
+            {
+                'id': self.ids[i] if self.ids else i,
+                'status': STATUS_LABELS[self.status[i]],
+                'exit_reason': EXIT_LABELS[self.exit_reason[i]],
+                'fill_time': int(self.fill_ms[i]) if self.fill_ms[i] >= 0 else None,
+                'exit_time': int(self.exit_ms[i]) if self.exit_ms[i] >= 0 else None,
+                'exit_price': _num(self.exit_price[i], 12),
+                'takes_filled': int(self.takes_filled[i]),
+                'breakeven': bool(self.breakeven[i]),
+                'pnl_usd': _num(self.pnl_usd[i], 4),
+                'r_multiple': _num(self.r_multiple[i], 4),
+            }
+            for i in range(self.size)
+        ]
+
+    def summary(self) -> dict:
+        entered = self.status >= STATUS_CLOSED
+        r = self.r_multiple[entered]
+        wins = r[r > 0].sum()
+        losses = -r[r < 0].sum()
+        return {
+            'total_trades': self.size,
+            'filled_trades': int(entered.sum()),
+            'cancelled_trades': int((self.status == STATUS_CANCELLED).sum()),
+            'open_trades': int((self.status == STATUS_OPEN).sum()),
+            'win_rate': _num((r > 0).mean() * 100, 2) if r.size else None,
+            'total_r': _num(r.sum(), 4),
+            'avg_r': _num(r.mean(), 4) if r.size else None,
+            'profit_factor': _num(wins / losses, 4) if losses else None,
+            'total_pnl': _num(self.pnl_usd[entered].sum(), 2),
+        }
+
+
+def _num(value, digits: int) -> float | None:
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        return None
+    return round(value, digits) + 0.0
+
+
+def _empty_result(plans: TradePlans) -> ReplayResult:
+    n = plans.size
+    return ReplayResult(
+        ids=plans.ids,
+        status=np.full(n, STATUS_NOT_FILLED, dtype=np.int8),
+        exit_reason=np.full(n, EXIT_NONE, dtype=np.int8),
+        fill_ms=np.full(n, -1, dtype=np.int64),
+        exit_ms=np.full(n, -1, dtype=np.int64),
+        exit_price=np.full(n, np.nan),
+        takes_filled=np.zeros(n, dtype=np.int64),
+        breakeven=np.zeros(n, dtype=bool),
+        pnl_usd=np.zeros(n),
+        r_multiple=np.zeros(n),
+    )
+
+
+def _first(mask: np.ndarray, never: int) -> np.ndarray:
+    """Index of the first True in each row, never if there is none"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), never)
+
+
+def _take_rows(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """values[i, index[i]] for every row, index has to be valid"""
+    return np.take_along_axis(values, index[:, None], axis=1)[:, 0]
+
+
+@dataclass
+class CandleWindow:
+    """
+    Candles following placement of each trade of a chunk of trades of one symbol, prices are mirrored for SHORT trades.
+    It only depends on symbol, side and start of trades, so it's reused when variants of the same trades are replayed.
+    """
+    rows: np.ndarray  # indices of trades in plans
+    first_bar: np.ndarray  # index of the first replayed candle of each trade
+    times: np.ndarray  # open times of all candles of the symbol
+    high: np.ndarray  # (trades x bars), NaN past the last stored candle
+    low: np.ndarray
+    close: np.ndarray
+    low_first: np.ndarray  # candle goes to its low before its high
+    num_valid: np.ndarray  # number of stored candles of each trade
+
+    @property
+    def max_bars(self) -> int:
+        return self.high.shape[1]
+
+
+def _gather(plans: TradePlans, rows: np.ndarray, candles: np.ndarray, max_bars: int) -> CandleWindow:
+    times = candles['time']
+    # Candle in which order was placed is skipped, as it's unknown which part of it came after placement
+    first_bar = np.searchsorted(times, plans.start_ms[rows], side='right')
+    bars = first_bar[:, None] + np.arange(max_bars)[None, :]
+    valid = bars < len(candles)
+    bars = np.minimum(bars, len(candles) - 1)
+
+    # Prices are mirrored for SHORT trades, so rules only have to be written for LONG ones
+    long = (plans.side[rows] > 0)[:, None]
+    high, low, close = candles['high'][bars], candles['low'][bars], candles['close'][bars]
+    return CandleWindow(
+        rows=rows,
+        first_bar=first_bar,
+        times=times,
+        high=np.where(valid, np.where(long, high, -low), np.nan),
+        low=np.where(valid, np.where(long, low, -high), np.nan),
+        close=np.where(long, close, -close),
+        low_first=(close >= candles['open'][bars]) == long,
+        num_valid=valid.sum(axis=1),
+    )
+
+
+def iter_windows(plans: TradePlans, candles_by_symbol: dict[str, np.ndarray], max_bars: int
+                 ) -> Iterator[CandleWindow]:
+    """
+    Windows of chunks of trades, gathered one at a time, so only one chunk is in memory when they aren't kept
+    :param candles_by_symbol: Candles of KLINE_DTYPE sorted by time, trades of symbols without them aren't filled
+    :param max_bars: Number of candles after placement of primary order which are replayed
+    """
+    chunk = max(CHUNK_CELLS // max(max_bars, 1), 1)
+    for symbol in np.unique(plans.symbol):
+        candles = candles_by_symbol.get(symbol)
+        if candles is None or len(candles) == 0:
+            continue
+        symbol_rows = np.flatnonzero(plans.symbol == symbol)
+        for start in range(0, symbol_rows.size, chunk):
+            yield _gather(plans, symbol_rows[start:start + chunk], candles, max_bars)
+
+
+def prepare_windows(plans: TradePlans, candles_by_symbol: dict[str, np.ndarray], max_bars: int
+                    ) -> list[CandleWindow]:
+    """Windows of all trades, for replaying variants of the same trades"""
+    return list(iter_windows(plans, candles_by_symbol, max_bars))
+
+
+def _replay_window(plans: TradePlans, window: CandleWindow, result: ReplayResult):
+    """Replays trades of the window, writes outcome into result at rows of the window"""
+    rows, high, low, close, low_first = window.rows, window.high, window.low, window.close, window.low_first
+    max_bars = window.max_bars
+
+    col = np.arange(max_bars)[None, :]
+    never = max_bars
+    s = plans.side[rows].astype(np.float64)
+    entry, stop = plans.entry[rows] * s, plans.stop[rows] * s
+    trigger = plans.trigger[rows] * s
+
+    # Primary order
+    has_trigger = plans.trigger[rows] != 0
+    trigger_bar = np.where(has_trigger, _first((low <= trigger[:, None]) & (high >= trigger[:, None]), never), 0)
+    fill_bar = _first((low <= entry[:, None]) & (col >= trigger_bar[:, None]), never)
+
+    over, take = plans.cancel_over[rows] * s, plans.cancel_take[rows] * s
+    over_hit = low <= over[:, None]
+    take_hit = high >= take[:, None]
+    cancel_bar = _first(over_hit | take_hit, never)
+    # On the fill candle only run to cancel take-profit level made before price came down to entry cancels order
+    same_bar = cancel_bar == fill_bar
+    take_first = _take_rows(take_hit & ~low_first, np.minimum(cancel_bar, never - 1))
+    cancelled = (cancel_bar < fill_bar) | (same_bar & (fill_bar < never) & take_first)
+    filled = (fill_bar < never) & ~cancelled
+
+    # Price reaching levels after fill, high of the fill candle only counts when it came after the low
+    after_fill = (col > fill_bar[:, None]) | ((col == fill_bar[:, None]) & low_first)
+
+    takes = plans.take_profits[rows] * s[:, None]
+    take_volumes = plans.take_volumes[rows]
+    num_takes = (~np.isnan(takes)).sum(axis=1)
+    take_bars = np.column_stack([
+        _first((high >= takes[:, k, None]) & after_fill, never) for k in range(takes.shape[1])
+    ])
+    take_bars = np.where(np.arange(takes.shape[1])[None, :] < num_takes[:, None], take_bars, never)
+    # Takes are filled in order, the next one can't be filled before the previous
+    take_bars = np.maximum.accumulate(take_bars, axis=1)
+
+    risk = entry - stop
+    move_stop_after, move_stop_after_rr = plans.move_stop_after[rows], plans.move_stop_after_rr[rows]
+    has_rr = ~np.isnan(move_stop_after_rr)
+    rr_level = entry + np.nan_to_num(move_stop_after_rr) * risk
+    rr_bar = _first((high >= rr_level[:, None]) & after_fill, never)
+    after_takes = np.clip(move_stop_after, 0, takes.shape[1])
+    takes_bar = np.where(after_takes == 0, fill_bar,
+                         _take_rows(take_bars, np.maximum(after_takes - 1, 0)))
+    takes_bar = np.where(move_stop_after > num_takes, never, takes_bar)
+    breakeven_bar = np.where(has_rr, rr_bar, np.where(num_takes > 1, takes_bar, never))
+    breakeven_bar = np.where(filled, breakeven_bar, never)
+
+    stop_bar = _first((low <= stop[:, None]) & (col >= fill_bar[:, None]), never)
+    breakeven_stop_bar = _first((low <= entry[:, None]) & (col > breakeven_bar[:, None]), never)
+    stopped_at_entry = stop_bar > breakeven_bar
+    exit_stop_bar = np.where(stopped_at_entry, breakeven_stop_bar, stop_bar)
+    exit_stop_price = np.where(stopped_at_entry, entry, stop)
+
+    # Take-profit is filled before stop-loss on the same candle only when high comes before low, which isn't the case
+    # for the fill candle, where low comes first
+    stop_row = np.minimum(exit_stop_bar, never - 1)
+    take_before_stop = ~_take_rows(low_first, stop_row) & (exit_stop_bar != fill_bar)
+    take_done = ((take_bars < exit_stop_bar[:, None]) |
+                 ((take_bars == exit_stop_bar[:, None]) & take_before_stop[:, None])) & (take_bars < never)
+    take_done &= filled[:, None]
+    takes_filled = take_done.sum(axis=1)
+    all_taken = filled & (takes_filled == num_takes)
+    stopped = filled & ~all_taken & (exit_stop_bar < never)
+
+    remaining = np.clip(1 - np.where(take_done, take_volumes, 0).sum(axis=1), 0, None)
+    take_pnl = np.where(take_done, (takes - entry[:, None]) * take_volumes, 0).sum(axis=1)
+
+    last_valid = np.maximum(window.num_valid - 1, 0)
+    last_close = _take_rows(close, last_valid)
+    exit_bar = np.where(all_taken, _take_rows(take_bars, np.maximum(num_takes - 1, 0)),
+                        np.where(stopped, exit_stop_bar, never))
+    exit_price = np.where(all_taken, _take_rows(takes, np.maximum(num_takes - 1, 0)),
+                          np.where(stopped, exit_stop_price, np.where(filled, last_close, np.nan)))
+    rest_pnl = np.where(all_taken, 0, (exit_price - entry) * remaining)
+    pnl_per_coin = np.where(filled, take_pnl + np.nan_to_num(rest_pnl), 0)
+
+    def bar_time(bar):
+        index = np.minimum(window.first_bar + np.minimum(bar, never - 1), len(window.times) - 1)
+        return np.where(bar < never, window.times[index], -1)
+
+    result.status[rows] = np.select([cancelled, all_taken | stopped, filled],
+                                    [STATUS_CANCELLED, STATUS_CLOSED, STATUS_OPEN], STATUS_NOT_FILLED)
+    result.exit_reason[rows] = np.select(
+        [all_taken, stopped & stopped_at_entry, stopped], [EXIT_TAKE_PROFITS, EXIT_BREAKEVEN, EXIT_STOP], EXIT_NONE)
+    result.fill_ms[rows] = np.where(filled, bar_time(fill_bar), -1)
+    result.exit_ms[rows] = np.where(all_taken | stopped, bar_time(exit_bar), -1)
+    result.exit_price[rows] = exit_price * s
+    result.takes_filled[rows] = takes_filled
+    result.breakeven[rows] = filled & (breakeven_bar < np.minimum(exit_bar, never))
+    result.pnl_usd[rows] = pnl_per_coin * plans.volume[rows]
+    result.r_multiple[rows] = np.where(filled, pnl_per_coin / risk, 0)
+
+
+def replay(plans: TradePlans, candles_by_symbol: dict[str, np.ndarray] | None = None, max_bars: int | None = None,
+           windows: list[CandleWindow] | None = None) -> ReplayResult:
+    """
+    Either candles or windows prepared by prepare_windows for trades with the same symbols, sides and starts
+    have to be passed
+    """
+    if windows is None:
+        windows = iter_windows(plans, candles_by_symbol, max_bars)
+
+    result = _empty_result(plans)
+    for window in windows:
+        _replay_window(plans, window, result)
+    return result
+
+
+def load_candles(plans: TradePlans, interval: str, max_bars: int, store: KlineStore | None = None
+                 ) -> dict[str, np.ndarray]:
+    """Loads stored candles covering replayed period of every symbol of plans"""
+    store = store or KlineStore()
+    step = INTERVALS_MS[interval]
+    candles = {}
+    for symbol in np.unique(plans.symbol):
+        starts = plans.start_ms[plans.symbol == symbol]
+        loaded = store.load(symbol, interval, int(starts.min()) - step, int(starts.max()) + (max_bars + 1) * step)
+        candles[symbol] = np.asarray(loaded, dtype=KLINE_DTYPE)
+    return candles
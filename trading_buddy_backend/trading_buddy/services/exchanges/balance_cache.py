@@ -0,0 +1,106 @@
+"""
+Short-lived cache of exchange balances. It lives in the exchange cache, which is shared by web workers, poller and
+listeners, and concurrent misses for the same account within a process are coalesced into one exchange request.
+While user data stream of account is connected (see BingXAccountListener), exchange pushes every balance change,
+which refreshes the cache, so cached balance is trusted for BALANCE_STREAM_MAX_AGE instead of BALANCE_CACHE_TTL.
+"""
+import time
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import caches
+
+from bingX.single_flight import AsyncSingleFlight, SingleFlight
+
+_flight = SingleFlight()
+_aflight = AsyncSingleFlight()
+
+
+def _cache():
+    return caches[settings.EXCHANGE_CACHE_ALIAS]
+
+
+def _balance_key(account_id) -> str:
+    return f'balance:{account_id}'
+
+
+def _stream_key(account_id) -> str:
+    return f'balance:stream:{account_id}'
+
+
+def _timeout() -> float:
+    return max(settings.BALANCE_CACHE_TTL, settings.BALANCE_STREAM_MAX_AGE)
+
+
+def _fresh(entry: dict | None, max_age: float) -> dict[str, Any] | None:
+    if entry is not None and time.time() - entry['fetched_at'] <= max_age:
+        return entry['balance']
+    return None
+
+
+def _default_max_age(stream_alive: bool) -> float:
+    return _timeout() if stream_alive else settings.BALANCE_CACHE_TTL
+
+
+def store_balance(account_id, balance: dict[str, Any]) -> None:
+    _cache().set(_balance_key(account_id), {'balance': balance, 'fetched_at': time.time()}, timeout=_timeout())
+
+
+def mark_stream_alive(account_id, ttl: float) -> None:
+    """Called periodically by user data stream listener, stream is considered dead if it isn't refreshed within ttl"""
+    _cache().set(_stream_key(account_id), True, timeout=ttl)
+
+
+def mark_stream_closed(account_id) -> None:
+    _cache().delete(_stream_key(account_id))
+
+
+def refresh_balance(account_id, fetch: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    """Fetches balance from exchange and stores it, concurrent calls for one account share a single request"""
+
+    def fetch_and_store():
+        balance = fetch()
+        store_balance(account_id, balance)
+        return balance
+
+    return _flight.do(account_id, fetch_and_store)
+
+
+def get_balance(account_id, fetch: Callable[[], dict[str, Any]], max_age: float | None = None) -> dict[str, Any]:
+    """
+    :param fetch: Requests balance from exchange, called only if cached balance is missing or too old
+    :param max_age: Seconds cached balance may be old, by default depends on whether user data stream is connected,
+    pass 0 to always fetch fresh balance
+    """
+    if max_age != 0:
+        cache = _cache()
+        entries = cache.get_many([_balance_key(account_id), _stream_key(account_id)])
+        if max_age is None:
+            max_age = _default_max_age(entries.get(_stream_key(account_id), False))
+
+        balance = _fresh(entries.get(_balance_key(account_id)), max_age)
+        if balance is not None:
+            return balance
+
+    return refresh_balance(account_id, fetch)
+
+
+async def aget_balance(account_id, fetch: Callable[[], Awaitable[dict[str, Any]]],
+                       max_age: float | None = None) -> dict[str, Any]:
+    if max_age != 0:
+        cache = _cache()
+        entries = await cache.aget_many([_balance_key(account_id), _stream_key(account_id)])
+        if max_age is None:
+            max_age = _default_max_age(entries.get(_stream_key(account_id), False))
+
+        balance = _fresh(entries.get(_balance_key(account_id)), max_age)
+        if balance is not None:
+            return balance
+
+    async def fetch_and_store():
+        balance = await fetch()
+        await _cache().aset(_balance_key(account_id), {'balance': balance, 'fetched_at': time.time()},
+                            timeout=_timeout())
+        return balance
+
+    return await _aflight.do(account_id, fetch_and_store)
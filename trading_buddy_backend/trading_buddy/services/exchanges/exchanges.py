@@ -1,22 +1,35 @@
+import asyncio
+import contextvars
 import json
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_EVEN
 from typing import List, Tuple, Any
 import threading
 
+from django.conf import settings
 from django.utils import timezone
 from loguru import logger
 import time
 
 import bingX.exceptions
+from bingX import Ticks
 from bingX.perpetual.v2 import PerpetualV2
+from bingX.perpetual.v2.aio import AsyncPerpetualV2
 from bingX.perpetual.v2.types import (Order, OrderType, Side, PositionSide, MarginType, StopLossOrder, TakeProfitOrder,
                                       HistoryOrder)
 from ...models import Account, User, Position, Trade
 
+from ..exchanges import balance_cache, market_snapshot
 from ..exchanges import math_helper as mh
+from .. import tracing
 from .listeners import BingXPriceListener
 
 
+# Runs independent exchange requests of one call concurrently, threads only do HTTP and never touch database.
+# Requests are submitted with context of the caller, so their tracing spans are children of the caller's one
+_requests_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='exchange-requests')
+
+
 def format_dict_for_log(dict_data: dict | list) -> str:
     return json.dumps(dict_data, indent=2).replace("{", '').replace("}", '')
 
@@ -92,6 +105,13 @@ class Exchange:
     def _get_tool_precision_info(self, tool: str) -> Tuple[bool, dict[str, int]]:
         raise NotImplementedError("Method not implemented")
 
+    def preview_positions(self, tool: str, scenarios: List[dict[str, Any]]) -> Tuple[bool, str, List[dict[str, Decimal]]]:
+        raise NotImplementedError("Method not implemented")
+
+    def preview_position_grid(self, tool: str, entry_ps: List[Decimal], stop_ps: List[Decimal], leverages: List[int],
+                              take_ps: List[Decimal]) -> Tuple[bool, str, List[dict[str, Any]]]:
+        raise NotImplementedError("Method not implemented")
+
     def calc_position_volume_and_margin(self, tool: str, entry_p: Decimal, stop_p: Decimal, leverage: Decimal) -> tuple[
                                                                                                                       Decimal, Decimal] | \
                                                                                                                   tuple[
@@ -140,6 +160,9 @@ class Exchange:
     def get_pending_positions_info(self) -> List[dict[str, Any]]:
         raise NotImplementedError("Method not implemented")
 
+    def get_market_snapshot(self, symbols: set[str] | None = None) -> dict[str, dict[str, Any]]:
+        raise NotImplementedError("Method not implemented")
+
     def get_open_orders(self, position_id: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
         raise NotImplementedError("Method not implemented")
 
@@ -149,7 +172,32 @@ class Exchange:
     def get_position_result(self, db_pos: Position) -> dict[str, Any]:
         raise NotImplementedError("Method not implemented")
 
+    ##### ASYNC COUNTERPARTS, used by async views in ASGI mode #####
+    async def afresh_account(self) -> Account:
+        return await Account.objects.aget(pk=self._account.pk)
+
+    async def afresh_user(self) -> User:
+        return await User.objects.aget(pk=self._user.pk)
+
+    async def aget_account_details(self) -> Tuple[bool, str, Decimal, Decimal, Decimal | None, Decimal | None]:
+        raise NotImplementedError("Method not implemented")
+
+    async def aget_max_leverage(self, tool: str) -> Tuple[bool, str, int | None, int | None]:
+        raise NotImplementedError("Method not implemented")
+
+    async def apreview_positions(self, tool: str,
+                                 scenarios: List[dict[str, Any]]) -> Tuple[bool, str, List[dict[str, Decimal]]]:
+        raise NotImplementedError("Method not implemented")
 
+    async def apreview_position_grid(self, tool: str, entry_ps: List[Decimal], stop_ps: List[Decimal],
+                                     leverages: List[int], take_ps: List[Decimal]) -> Tuple[bool, str, List[dict[str, Any]]]:
+        raise NotImplementedError("Method not implemented")
+
+    async def aget_current_positions_info(self) -> Tuple[bool, str, List[dict[str, Any]]]:
+        raise NotImplementedError("Method not implemented")
+
+
+@tracing.trace_methods
 class BingXExc(Exchange):
     """
     BingX Exchange implementation as a Singleton per-account class.
@@ -168,6 +216,7 @@ class BingXExc(Exchange):
             return
 
         self.client = PerpetualV2(api_key=self.API_KEY, secret_key=self.SECRET_KEY)
+        self.aclient = AsyncPerpetualV2(api_key=self.API_KEY, secret_key=self.SECRET_KEY)
 
         # Listeners
         self.price_listeners_and_threads = {}
@@ -252,13 +301,23 @@ class BingXExc(Exchange):
         deposit, risk = self.get_deposit_and_risk()
 
         try:
-            details = self.client.account.get_details()['balance']
+            details = self._get_balance()
             return True, "Successfully retrieved all account details", deposit, risk, Decimal(
                 details['unrealizedProfit']), Decimal(details['availableMargin'])
         except Exception as e:
             logger.warning(f"Failed to get account details: {e}")
             return False, "Exchange side account details: unrealized and realized profits were unable to retrieved", deposit, risk, None, None
 
+    def fetch_balance(self) -> dict[str, Any]:
+        return self.client.account.get_details()['balance']
+
+    def _get_balance(self, max_age: float | None = None) -> dict[str, Any]:
+        """
+        Returns balance of perpetual account, cached balance is reused if it isn't older than max_age seconds,
+        see balance_cache for default.
+        """
+        return balance_cache.get_balance(self._account.pk, self.fetch_balance, max_age)
+
     def _get_tool_precision_info(self, tool: str) -> Tuple[bool, dict[str, int]]:
         """
         Gets precision information for a trading pair.
@@ -272,6 +331,26 @@ class BingXExc(Exchange):
             logger.warning(f"Failed to get tool precision info for {tool}")
             return False, {}
 
+    def _order_ticks(self, tool: str, prices: List[Decimal], volume: Decimal | None = None,
+                     precision_info: dict[str, int] | None = None) -> Tuple[bool, List[Ticks], Ticks | None]:
+        """
+        Converts prices and volume of order into ticks of contract precision, which are sent to exchange as they are.
+        :param tool: The trading pair.
+        :param prices: Prices, rounded to the nearest tick.
+        :param volume: Volume, floored to quantity precision as sizing does.
+        :param precision_info: Precision of tool if caller already has it, see _get_tool_precision_info.
+        :return: Whether precision was fetched, prices and volume in ticks.
+        """
+        if precision_info is None:
+            success, precision_info = self._get_tool_precision_info(tool)
+            if not success:
+                return False, [], None
+
+        price_ticks = [Ticks.from_decimal(price, precision_info['pricePrecision'], ROUND_HALF_EVEN)
+                       for price in prices]
+        volume_ticks = None if volume is None else Ticks.from_decimal(volume, precision_info['quantityPrecision'])
+        return True, price_ticks, volume_ticks
+
     def get_max_leverage(self, tool: str) -> Tuple[bool, str, int | None, int | None]:
         """
         Returns the maximum leverage for a trading pair.
@@ -346,6 +425,80 @@ class BingXExc(Exchange):
         else:
             return None, None
 
+    @staticmethod
+    def _preview_scenarios(scenarios: List[dict[str, Any]], deposit: Decimal, risk: Decimal,
+                           available_margin: Decimal, quantity_precision: int) -> List[dict[str, Decimal]]:
+        # All scenarios are sized at once, see mh.size_positions
+        return mh.size_positions(
+            [scenario['entry_p'] for scenario in scenarios],
+            [scenario['stop_p'] for scenario in scenarios],
+            [scenario['leverage'] for scenario in scenarios],
+            [scenario['take_profits'] for scenario in scenarios],
+            quantity_precision, deposit, risk, available_margin,
+            volumes=[scenario.get('volume') for scenario in scenarios],
+        ).rows()
+
+    def preview_positions(self, tool: str, scenarios: List[dict[str, Any]]) -> Tuple[bool, str, List[dict[str, Decimal]]]:
+        """
+        Calculates volume, margin, potential loss and profit for each scenario of position on the same tool.
+        Balance and contract info are fetched once for all scenarios and concurrently, balance comes from
+        short-lived cache, as preview is requested on every change of position form.
+        :param tool: The trading pair.
+        :param scenarios: Dicts with entry_p, stop_p, take_profits, leverage and optional volume.
+        :return: A tuple containing success flag, message and list of results in order of scenarios.
+        """
+        balance_future = _requests_executor.submit(contextvars.copy_context().run, self._get_balance)
+        prec_success, precision_info = self._get_tool_precision_info(tool)
+        deposit, risk = self.get_deposit_and_risk()
+
+        try:
+            available_margin = Decimal(balance_future.result()['availableMargin'])
+        except Exception as e:
+            logger.warning(f"Failed to get account details: {e}")
+            return False, "Failed to retrieve available margin from exchange", []
+
+        if not prec_success:
+            return False, f"Failed to retrieve contract info for {tool}", []
+
+        quantity_precision = precision_info['quantityPrecision']
+        return True, "Successfully processed positions", self._preview_scenarios(scenarios, deposit, risk,
+                                                                                 available_margin, quantity_precision)
+
+    @staticmethod
+    def _preview_grid(entry_ps: List[Decimal], stop_ps: List[Decimal], leverages: List[int], take_ps: List[Decimal],
+                      deposit: Decimal, risk: Decimal, available_margin: Decimal,
+                      precision_info: dict[str, int]) -> List[dict[str, Any]]:
+        # Grid prices are rounded to tick of the tool, prices which end up the same are sized once
+        price_precision = precision_info['pricePrecision']
+        entry_ps = list(dict.fromkeys(mh.round_to_digits(p, price_precision) for p in entry_ps))
+        stop_ps = list(dict.fromkeys(mh.round_to_digits(p, price_precision) for p in stop_ps))
+        return mh.size_position_grid(entry_ps, stop_ps, leverages, take_ps, precision_info['quantityPrecision'],
+                                     deposit, risk, available_margin,
+                                     settings.POSITION_GRID_MAINTENANCE_MARGIN_RATE)
+
+    def preview_position_grid(self, tool: str, entry_ps: List[Decimal], stop_ps: List[Decimal], leverages: List[int],
+                              take_ps: List[Decimal]) -> Tuple[bool, str, List[dict[str, Any]]]:
+        """
+        Sizes every combination of entry, stop and leverage for risk heatmap, see mh.size_position_grid.
+        Balance and contract info are fetched once, as in preview_positions.
+        :return: A tuple containing success flag, message and list of sized combinations.
+        """
+        balance_future = _requests_executor.submit(contextvars.copy_context().run, self._get_balance)
+        prec_success, precision_info = self._get_tool_precision_info(tool)
+        deposit, risk = self.get_deposit_and_risk()
+
+        try:
+            available_margin = Decimal(balance_future.result()['availableMargin'])
+        except Exception as e:
+            logger.warning(f"Failed to get account details: {e}")
+            return False, "Failed to retrieve available margin from exchange", []
+
+        if not prec_success:
+            return False, f"Failed to retrieve contract info for {tool}", []
+
+        return True, "Successfully processed position grid", self._preview_grid(
+            entry_ps, stop_ps, leverages, take_ps, deposit, risk, available_margin, precision_info)
+
     def _switch_margin_mode_to_cross(self, tool: str) -> None:
         """
         Switches the margin mode to cross for a tool
@@ -358,7 +511,8 @@ class BingXExc(Exchange):
 
     def _place_primary_order(self, tool: str, trigger_p: Decimal, entry_p: Decimal, stop_p: Decimal,
                              take_profit_p: Decimal,
-                             pos_side: PositionSide, volume: Decimal) -> Tuple[bool, str]:
+                             pos_side: PositionSide, volume: Decimal,
+                             precision_info: dict[str, int] | None = None) -> Tuple[bool, str]:
         """
         Places a primary order.
         :param tool: The trading pair.
@@ -368,8 +522,15 @@ class BingXExc(Exchange):
         :param take_profit_p: First take-profit price.
         :param pos_side: Position side (LONG/SHORT).
         :param volume: Trading volume.
+        :param precision_info: Precision of tool if caller already has it.
         :return: Order ID.
         """
+        success, prices, volume = self._order_ticks(tool, [trigger_p, entry_p, stop_p, take_profit_p], volume,
+                                                    precision_info)
+        if not success:
+            return False, "Failed to fetch contract precision"
+        trigger_p, entry_p, stop_p, take_profit_p = prices
+
         order_side = Side.BUY if entry_p > stop_p else Side.SELL
 
         # If trigger price is not specified, system treats order as a limit order
@@ -433,8 +594,13 @@ class BingXExc(Exchange):
                 logger.exception(f'Failed to place open order for {tool} due to failure to change leverage')
                 return False, "Failed to change leverage"
 
-            pot_loss, _ = self.calculate_position_potential_loss_and_profit(tool, entry_p, stop_p, take_profits,
-                                                                            volume)
+            # Precision is fetched once for both potential loss and order
+            success, precision_info = self._get_tool_precision_info(tool)
+            if not success:
+                return False, "Failed to fetch contract precision"
+
+            pot_loss, _ = mh.calculate_position_potential_loss_and_profit(entry_p, stop_p, take_profits, volume,
+                                                                          precision_info['quantityPrecision'])
             # Creating trade and linked position in db
             trade = Trade.create_trade(pos_side.value, self.fresh_account, tool, Decimal((pot_loss / deposit) * 100),
                                        pot_loss,
@@ -445,7 +611,7 @@ class BingXExc(Exchange):
                                        timezone.now())
 
             success, msg = self._place_primary_order(tool, trigger_p, entry_p, stop_p, take_profits[0], pos_side,
-                                                     volume)
+                                                     volume, precision_info)
 
             if success:
                 logger.success(f'Primary order for {tool} placed successfully')
@@ -469,6 +635,11 @@ class BingXExc(Exchange):
         :param volume: Trading volume.
         :param pos_side: Position side (LONG/SHORT).
         """
+        success, prices, volume = self._order_ticks(tool, [stop_p], volume)
+        if not success:
+            return False, "Failed to fetch contract precision"
+        stop_p = prices[0]
+
         order_side = Side.SELL if pos_side == "LONG" else Side.BUY
         order_type = OrderType.STOP_MARKET
 
@@ -594,14 +765,16 @@ class BingXExc(Exchange):
         order_side = Side.SELL if pos_side == "LONG" else Side.BUY
         order_type = OrderType.TAKE_PROFIT_MARKET
 
-        success, dict_with_quantity_precision = self._get_tool_precision_info(tool)
+        success, precision_info = self._get_tool_precision_info(tool)
 
         if not success:
             logger.error(f'Failed to fetch quantity precision for {tool} for placing take-profit orders')
             return False, "Failed to fetch quantity precision"
 
-        quantity_precision = dict_with_quantity_precision['quantityPrecision']
+        quantity_precision = precision_info['quantityPrecision']
 
+        take_profits = [Ticks.from_decimal(take_profit, precision_info['pricePrecision'], ROUND_HALF_EVEN)
+                        for take_profit in take_profits]
         volumes = mh.calc_take_profits_volumes(cum_volume, quantity_precision, len(take_profits))
 
         for take_profit, volume in zip(take_profits, volumes):
@@ -657,6 +830,37 @@ class BingXExc(Exchange):
             logger.warning(f'Failed to get orders for {tool}')
             return False, str(e), {}
 
+    @staticmethod
+    def _current_position_dict(position: dict[str, Any], db_pos: Position) -> dict[str, Any]:
+        """
+        :param position: Position data from exchange
+        :param db_pos: Position from database with trade loaded
+        """
+        tool_name = position['symbol']
+        trade = db_pos.trade
+
+        return {
+            'trade_id': trade.pk,
+            'tool': tool_name,
+            'pos_side': position['positionSide'],
+            'leverage': str(position['leverage']),
+            'volume': str(position['availableAmt']),
+            'margin': str(round(Decimal(position['margin']), 3)),
+            'avg_open': str(position['avgPrice']),
+            'current_pnl_risk_reward_ratio':
+                str(mh.floor_to_digits(
+                    (Decimal(position['unrealizedProfit']) + Decimal(
+                        position['realisedProfit'])) / trade.risk_usd,
+                    4)),
+            'realized_pnl': str(mh.floor_to_digits(Decimal(position['realisedProfit']), 4)),
+            'current_pnl':
+                str(mh.floor_to_digits(
+                    Decimal(position['unrealizedProfit']) + Decimal(position['realisedProfit']),
+                    4)),
+            'open_date': db_pos.start_time,
+            'description': trade.description,
+        }
+
     def get_current_positions_info(self) -> Tuple[bool, str, List[dict[str, Any]]]:
         """
         Gets information about all current positions.
@@ -665,42 +869,22 @@ class BingXExc(Exchange):
         try:
             positions = self.client.account.get_swap_positions()
 
+            # One query for all positions instead of one per position, with tool and trade joined
+            db_positions = {
+                db_pos.tool.name: db_pos
+                for db_pos in Position.objects.filter(account_id=self._account.pk).select_related('tool', 'trade')
+            }
+
             dicts = []
 
             for position in positions:
                 tool_name = position['symbol']
-                try:
-                    db_pos = self.fresh_account.positions.get(tool__name=tool_name)
-                except Position.DoesNotExist as e:
-                    logger.warning(
-                        f'There is an open position for {tool_name} on server, but it is not in database\n{e}')
+                db_pos = db_positions.get(tool_name)
+                if db_pos is None:
+                    logger.warning(f'There is an open position for {tool_name} on server, but it is not in database')
                     continue
 
-                trade = db_pos.trade
-
-                d = {
-                    'trade_id': trade.pk,
-                    'tool': tool_name,
-                    'pos_side': position['positionSide'],
-                    'leverage': str(position['leverage']),
-                    'volume': str(position['availableAmt']),
-                    'margin': str(round(Decimal(position['margin']), 3)),
-                    'avg_open': str(position['avgPrice']),
-                    'current_pnl_risk_reward_ratio':
-                        str(mh.floor_to_digits(
-                            (Decimal(position['unrealizedProfit']) + Decimal(
-                                position['realisedProfit'])) / trade.risk_usd,
-                            4)),
-                    'realized_pnl': str(mh.floor_to_digits(Decimal(position['realisedProfit']), 4)),
-                    'current_pnl':
-                        str(mh.floor_to_digits(
-                            Decimal(position['unrealizedProfit']) + Decimal(position['realisedProfit']),
-                            4)),
-                    'open_date': db_pos.start_time,
-                    'description': trade.description,
-                }
-
-                dicts.append(d)
+                dicts.append(self._current_position_dict(position, db_pos))
 
             return True, "Successfully retrieved current positions", dicts
         except Exception as e:
@@ -712,31 +896,43 @@ class BingXExc(Exchange):
         Gets information about all pending positions.
         :return: List of dictionaries containing pending position information.
         """
-        positions = Position.objects.filter(account=self.fresh_account).all()
+        positions = list(
+            Position.objects.filter(account_id=self._account.pk, last_status__in=["NEW", "PARTIALLY_FILLED"])
+            .select_related('tool')
+        )
+        snapshot = self.get_market_snapshot({pos.tool.name for pos in positions})
 
         dicts = []
 
         for pos in positions:
-            if pos.last_status in ["NEW", "PARTIALLY_FILLED"]:
-                d = {
-                    'trade_id': pos.trade.pk,
-                    'tool': pos.tool.name,
-                    'entry_price': str(pos.entry_price),
-                    'trigger_price': str(pos.trigger_price),
-                    'stop_price': str(pos.stop_price),
-                    'take_profit_prices': [str(price) for price in pos.take_profit_prices],
-                    'pos_side': pos.side,
-                    'leverage': str(pos.leverage),
-                    'volume': str(pos.primary_volume),
-                    'margin': str(round(Decimal(pos.entry_price * pos.primary_volume / pos.leverage), 3)),
-                    'cancel_levels': [str(level) if level is not None else level for level in pos.cancel_levels],
-                    'status': pos.last_status
-                }
-
-                dicts.append(d)
+            d = {
+                'trade_id': pos.trade_id,
+                'tool': pos.tool.name,
+                'entry_price': str(pos.entry_price),
+                'trigger_price': str(pos.trigger_price),
+                'stop_price': str(pos.stop_price),
+                'take_profit_prices': [str(price) for price in pos.take_profit_prices],
+                'pos_side': pos.side,
+                'leverage': str(pos.leverage),
+                'volume': str(pos.primary_volume),
+                'margin': str(round(Decimal(pos.entry_price * pos.primary_volume / pos.leverage), 3)),
+                'cancel_levels': [str(level) if level is not None else level for level in pos.cancel_levels],
+                'status': pos.last_status,
+                'last_price': snapshot.get(pos.tool.name, {}).get('last_price'),
+            }
+
+            dicts.append(d)
 
         return dicts
 
+    def get_market_snapshot(self, symbols: set[str] | None = None) -> dict[str, dict[str, Any]]:
+        """
+        Market data of all trading pairs keyed by symbol, served from snapshot without per-symbol requests.
+        :param symbols: Symbols caller needs, they are requested one by one if there is no snapshot.
+        :return: Empty dict if market data is unavailable.
+        """
+        return market_snapshot.get_snapshot(self.client.market, symbols)
+
     def get_open_orders(self, position_id: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
         """
         :return: Tuple of stop-loss order dict, and a list of take-profit order dicts
@@ -817,6 +1013,108 @@ class BingXExc(Exchange):
             logger.exception(f'Failed to get orders history for {db_pos.tool.name}')
             return Decimal(0), Decimal(0)
 
+    ##### ASYNC COUNTERPARTS #####
+    async def aget_deposit_and_risk(self) -> Tuple[Decimal, Decimal]:
+        user, account = await asyncio.gather(self.afresh_user(), self.afresh_account())
+        return user.deposit, account.risk_percent
+
+    async def aget_account_details(self) -> Tuple[bool, str, Decimal, Decimal, Decimal | None, Decimal | None]:
+        deposit, risk = await self.aget_deposit_and_risk()
+
+        try:
+            details = await self._aget_balance()
+            return True, "Successfully retrieved all account details", deposit, risk, Decimal(
+                details['unrealizedProfit']), Decimal(details['availableMargin'])
+        except Exception as e:
+            logger.warning(f"Failed to get account details: {e}")
+            return False, "Exchange side account details: unrealized and realized profits were unable to retrieved", deposit, risk, None, None
+
+    async def afetch_balance(self) -> dict[str, Any]:
+        return (await self.aclient.account.get_details())['balance']
+
+    async def _aget_balance(self, max_age: float | None = None) -> dict[str, Any]:
+        return await balance_cache.aget_balance(self._account.pk, self.afetch_balance, max_age)
+
+    async def _aget_tool_precision_info(self, tool: str) -> Tuple[bool, dict[str, int]]:
+        try:
+            info = await self.aclient.market.get_contract_info(tool)
+            return True, {"quantityPrecision": info['quantityPrecision'], "pricePrecision": info['pricePrecision']}
+        except Exception as e:
+            logger.warning(f"Failed to get tool precision info for {tool}")
+            return False, {}
+
+    async def aget_max_leverage(self, tool: str) -> Tuple[bool, str, int | None, int | None]:
+        try:
+            info = await self.aclient.trade.get_leverage(tool)
+            return True, "Successfully retrieved leverage limits", info["maxLongLeverage"], info["maxShortLeverage"]
+        except Exception as e:
+            logger.warning(f'Failed to get max leverage info for {tool}')
+            return False, "Failed to retrieve leverage limits", None, None
+
+    async def apreview_positions(self, tool: str,
+                                 scenarios: List[dict[str, Any]]) -> Tuple[bool, str, List[dict[str, Decimal]]]:
+        balance_task = asyncio.create_task(self._aget_balance())
+        (prec_success, precision_info), (deposit, risk) = await asyncio.gather(
+            self._aget_tool_precision_info(tool), self.aget_deposit_and_risk()
+        )
+
+        try:
+            available_margin = Decimal((await balance_task)['availableMargin'])
+        except Exception as e:
+            logger.warning(f"Failed to get account details: {e}")
+            return False, "Failed to retrieve available margin from exchange", []
+
+        if not prec_success:
+            return False, f"Failed to retrieve contract info for {tool}", []
+
+        quantity_precision = precision_info['quantityPrecision']
+        return True, "Successfully processed positions", self._preview_scenarios(scenarios, deposit, risk,
+                                                                                 available_margin, quantity_precision)
+
+    async def apreview_position_grid(self, tool: str, entry_ps: List[Decimal], stop_ps: List[Decimal],
+                                     leverages: List[int], take_ps: List[Decimal]) -> Tuple[bool, str, List[dict[str, Any]]]:
+        balance_task = asyncio.create_task(self._aget_balance())
+        (prec_success, precision_info), (deposit, risk) = await asyncio.gather(
+            self._aget_tool_precision_info(tool), self.aget_deposit_and_risk()
+        )
+
+        try:
+            available_margin = Decimal((await balance_task)['availableMargin'])
+        except Exception as e:
+            logger.warning(f"Failed to get account details: {e}")
+            return False, "Failed to retrieve available margin from exchange", []
+
+        if not prec_success:
+            return False, f"Failed to retrieve contract info for {tool}", []
+
+        return True, "Successfully processed position grid", self._preview_grid(
+            entry_ps, stop_ps, leverages, take_ps, deposit, risk, available_margin, precision_info)
+
+    async def aget_current_positions_info(self) -> Tuple[bool, str, List[dict[str, Any]]]:
+        try:
+            positions = await self.aclient.account.get_swap_positions()
+
+            db_positions = {
+                db_pos.tool.name: db_pos
+                async for db_pos in Position.objects.filter(account_id=self._account.pk).select_related('tool', 'trade')
+            }
+
+            dicts = []
+
+            for position in positions:
+                tool_name = position['symbol']
+                db_pos = db_positions.get(tool_name)
+                if db_pos is None:
+                    logger.warning(f'There is an open position for {tool_name} on server, but it is not in database')
+                    continue
+
+                dicts.append(self._current_position_dict(position, db_pos))
+
+            return True, "Successfully retrieved current positions", dicts
+        except Exception as e:
+            logger.warning(f'Failed to fetch current positions info: {e}')
+            return False, str(e), []
+
 
 class ByBitExc(Exchange):
     pass
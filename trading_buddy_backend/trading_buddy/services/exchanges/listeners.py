@@ -5,11 +5,14 @@ from decimal import Decimal
 import websocket
 import gzip
 import io
-from django.db import connection, OperationalError
+from django.conf import settings
+from django.db import close_old_connections, OperationalError
 
 from loguru import logger
 
 from ...models import User, Account
+from . import balance_cache
+from .. import metrics
 
 
 def format_dict_for_log(dict_data: dict) -> str:
@@ -82,7 +85,7 @@ class BingXListener(Listener):
 
         self.consecutive_errors = 0
 
-        self.ws_url = "wss://open-api-swap.bingx.com/swap-market"
+        self.ws_url = settings.BINGX_WS_URL
         self.exchange = exchange
 
 
@@ -93,6 +96,7 @@ class BingXPriceListener(BingXListener):
 
         self._last_check_time = time.monotonic()
         self.check_interval = 1
+        self._stopped = False
 
         super().__init__(exchange)
         self.logger = self.logger.bind(class_name=self.__class__.__name__)
@@ -103,9 +107,13 @@ class BingXPriceListener(BingXListener):
             return
         self._last_check_time = now
 
+        with metrics.cancel_check_seconds.time():
+            self._check_price_for_order_cancellation(price)
+
+    def _check_price_for_order_cancellation(self, price):
         try:
-            if not connection.is_usable():
-                connection.close()
+            # Every listener thread has its own connection, it's reused between price checks
+            close_old_connections()
 
             pos = self.fresh_account.positions.filter(tool__name=self.tool).first()
             if not pos:
@@ -155,14 +163,20 @@ class BingXPriceListener(BingXListener):
 
             try:
                 price = Decimal(dict_data["data"]["c"])
+                metrics.websocket_ticks.labels(self.tool).inc()
 
                 if price is not None:
                     self.check_price_for_order_cancellation(price)
             except Exception as e:
                 self.logger.debug(f'Failed to retrieve price data for {self.tool} from dict data sent by BingX')
 
+    def stop_listening(self):
+        self._stopped = True
+        if self.ws:
+            self.ws.close()
+
     def listen_for_events(self):
-        while True:
+        while not self._stopped:
             self.logger.info(f"Launching websocket: {self.ws_url}")
 
             self.ws = websocket.WebSocketApp(
@@ -174,12 +188,109 @@ class BingXPriceListener(BingXListener):
             )
 
             self.ws.run_forever()
+            if self._stopped:
+                break
 
             # Сюда код дойдет только если сокет закрылся (из-за ошибки или по инициативе сервера)
             self.logger.info("WebSocket closed connection. Restarting connection in 5 seconds...")
+            metrics.websocket_reconnects.labels(self.tool).inc()
             time.sleep(5)
 
 
+class BingXAccountListener(BingXListener):
+    """
+    Listens to user data stream of account and pushes balance changes into balance cache,
+    so frontend polling account details doesn't hit exchange REST API.
+    """
+    # Listen key is valid for an hour, BingX recommends extending it every 30 minutes
+    LISTEN_KEY_EXTEND_INTERVAL = 30 * 60
+    # Stream is announced as alive this often, and is considered dead after three missed announcements
+    ALIVE_INTERVAL = 10
+
+    def __init__(self, exchange):
+        super().__init__(exchange)
+        self.logger = self.logger.bind(class_name=self.__class__.__name__)
+
+        self.account_id = self._account.pk
+        self.listen_key = None
+        self._listen_key_extended_at = 0.0
+        self._alive_marked_at = 0.0
+        self._stopped = False
+
+    def _keep_alive(self):
+        now = time.monotonic()
+
+        if now - self._alive_marked_at >= self.ALIVE_INTERVAL:
+            balance_cache.mark_stream_alive(self.account_id, self.ALIVE_INTERVAL * 3)
+            self._alive_marked_at = now
+
+        if now - self._listen_key_extended_at >= self.LISTEN_KEY_EXTEND_INTERVAL:
+            status_code = self.exchange.client.other.extend_listen_key_validity_period(self.listen_key)
+            if status_code != 200:
+                self.logger.warning(f'Failed to extend listen key ({status_code}), reconnecting')
+                self.ws.close()
+            self._listen_key_extended_at = now
+
+    def on_account_update(self, event: dict):
+        """
+        ACCOUNT_UPDATE carries wallet balance and positions, but not available margin,
+        so cached balance is refreshed with one REST request per event instead of one per frontend poll.
+        """
+        balance_cache.refresh_balance(self.account_id, self.exchange.fetch_balance)
+        self.logger.debug(f'Balance of account {self.account_id} refreshed after {event.get("a", {}).get("m")}')
+
+    def on_message(self, ws, message):
+        utf8_data = super().on_message(ws, message)
+
+        try:
+            self._keep_alive()
+
+            if utf8_data and utf8_data != "Ping":
+                event = json.loads(utf8_data)
+                if event.get('e') == 'ACCOUNT_UPDATE':
+                    self.on_account_update(event)
+        except Exception as e:
+            self.logger.exception(f'Failed to process user data event of account {self.account_id}: {e}')
+
+    def on_close(self, ws, close_status_code, close_msg):
+        super().on_close(ws, close_status_code, close_msg)
+        balance_cache.mark_stream_closed(self.account_id)
+
+    def stop_listening(self):
+        self._stopped = True
+        if self.ws:
+            self.ws.close()
+
+    def listen_for_events(self):
+        while not self._stopped:
+            try:
+                self.listen_key = self.exchange.client.other.generate_listen_key()['listenKey']
+                self._listen_key_extended_at = time.monotonic()
+                # Balance could have changed while stream was disconnected
+                balance_cache.refresh_balance(self.account_id, self.exchange.fetch_balance)
+            except Exception as e:
+                self.logger.warning(f'Failed to start user data stream of account {self.account_id}: {e}')
+                time.sleep(30)
+                continue
+
+            self.logger.info(f"Launching user data stream of account {self.account_id}")
+
+            self.ws = websocket.WebSocketApp(
+                f"{self.ws_url}?listenKey={self.listen_key}",
+                on_open=self.on_open,
+                on_message=self.on_message,
+                on_error=self.on_error,
+                on_close=self.on_close,
+            )
+
+            self.ws.run_forever()
+
+            balance_cache.mark_stream_closed(self.account_id)
+            if not self._stopped:
+                self.logger.info("User data stream closed connection. Restarting connection in 5 seconds...")
+                time.sleep(5)
+
+
 """DEBUG"""
 if __name__ == "__main__":
     # Short
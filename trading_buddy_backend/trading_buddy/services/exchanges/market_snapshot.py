@@ -0,0 +1,159 @@
+"""
+Snapshot of market data of all BingX trading pairs: last price, 24h ticker, mark price and funding.
+It is taken with three requests (all-symbols ticker, prices and funding), kept in memory of the process and shared
+with other processes through exchange cache, so per-symbol lookups of watchlist and position views cost no requests.
+run_listeners refreshes it every MARKET_SNAPSHOT_INTERVAL. Web workers refresh it themselves only once it's stale, that
+is STALE_INTERVALS scheduled refreshes were missed, so while run_listeners is up they make no all-symbols requests.
+Requests never wait for all-symbols refresh: stale snapshot is still served while newer one is taken in background,
+and when there is no snapshot younger than MARKET_SNAPSHOT_MAX_AGE, market data is requested per symbol only for
+symbols the caller needs.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+from loguru import logger
+
+from bingX.perpetual.v2.market import Market
+
+CACHE_KEY = 'market:snapshot'
+# Snapshot is left to run_listeners until it's older than this many refresh intervals
+STALE_INTERVALS = 3
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='market-snapshot')
+# Separate from _executor, as refresh waits for requests it submits there
+_refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='market-snapshot-refresh')
+_refreshing: Future | None = None
+_refreshing_lock = threading.Lock()
+
+# {'taken_at': time.time(), 'symbols': {symbol: data}}
+_snapshot: dict[str, Any] | None = None
+# After failed refresh exchange isn't asked again until this time, so outage doesn't turn into request per lookup
+_retry_at = 0.0
+
+
+def _cache():
+    return caches[settings.EXCHANGE_CACHE_ALIAS]
+
+
+def _decimal(value) -> Decimal | None:
+    return None if value in (None, '') else Decimal(str(value))
+
+
+def _symbol_data(ticker: dict, price: dict, rate: dict) -> dict[str, Any]:
+    return {
+        'last_price': _decimal(price.get('price', ticker.get('lastPrice'))),
+        'price_change_percent': _decimal(ticker.get('priceChangePercent')),
+        'high_price': _decimal(ticker.get('highPrice')),
+        'low_price': _decimal(ticker.get('lowPrice')),
+        'quote_volume': _decimal(ticker.get('quoteVolume')),
+        'mark_price': _decimal(rate.get('markPrice')),
+        'funding_rate': _decimal(rate.get('lastFundingRate')),
+        'next_funding_time': rate.get('nextFundingTime'),
+    }
+
+
+def _take(market: Market) -> dict[str, dict[str, Any]]:
+    tickers, prices, funding = [future.result() for future in (
+        _executor.submit(market.get_tickers),
+        _executor.submit(market.get_latest_prices),
+        _executor.submit(market.get_current_funding_rates),
+    )]
+
+    return {symbol: _symbol_data(tickers.get(symbol, {}), prices.get(symbol, {}), funding.get(symbol, {}))
+            for symbol in tickers.keys() | prices.keys() | funding.keys()}
+
+
+def _take_symbols(market: Market, symbols: set[str]) -> dict[str, dict[str, Any]]:
+    """Market data of given symbols requested per symbol, symbols it couldn't be requested for are left out"""
+    futures = {symbol: (
+        _executor.submit(market.get_ticker, symbol),
+        _executor.submit(market.get_latest_price_of_trading_pair, symbol),
+        _executor.submit(market.get_current_funding_rate, symbol),
+    ) for symbol in symbols}
+
+    data = {}
+    for symbol, (ticker, price, rate) in futures.items():
+        try:
+            data[symbol] = _symbol_data(ticker.result(), price.result(), rate.result())
+        except Exception as e:
+            logger.warning(f'Failed to get market data of {symbol}: {e}')
+    return data
+
+
+def _is_fresh(snapshot: dict | None) -> bool:
+    return snapshot is not None and time.time() - snapshot['taken_at'] <= settings.MARKET_SNAPSHOT_INTERVAL
+
+
+def _is_stale(snapshot: dict | None) -> bool:
+    return snapshot is None or (time.time() - snapshot['taken_at']
+                                > settings.MARKET_SNAPSHOT_INTERVAL * STALE_INTERVALS)
+
+
+def refresh_snapshot(market: Market) -> dict[str, Any]:
+    """Takes new snapshot from exchange and shares it with other processes"""
+    global _snapshot
+
+    snapshot = {'taken_at': time.time(), 'symbols': _take(market)}
+    _cache().set(CACHE_KEY, snapshot, timeout=settings.MARKET_SNAPSHOT_MAX_AGE)
+    _snapshot = snapshot
+    return snapshot
+
+
+def _refresh(market: Market) -> None:
+    global _retry_at
+
+    if not _is_stale(_cache().get(CACHE_KEY)) or time.time() < _retry_at:
+        return
+    try:
+        refresh_snapshot(market)
+    except Exception as e:
+        logger.warning(f'Failed to refresh market snapshot: {e}')
+        _retry_at = time.time() + settings.MARKET_SNAPSHOT_INTERVAL
+
+
+def _refresh_in_background(market: Market) -> None:
+    """Requests made while snapshot is being refreshed don't queue refreshes of their own"""
+    global _refreshing
+
+    with _refreshing_lock:
+        if _refreshing is None or _refreshing.done():
+            _refreshing = _refresher.submit(_refresh, market)
+
+
+def _current() -> dict[str, Any] | None:
+    """The newest of snapshot of the process and shared one, None if both are older than MARKET_SNAPSHOT_MAX_AGE"""
+    global _snapshot
+
+    if not _is_fresh(_snapshot):
+        shared = _cache().get(CACHE_KEY)
+        if shared is not None and (_snapshot is None or shared['taken_at'] > _snapshot['taken_at']):
+            _snapshot = shared
+
+    snapshot = _snapshot
+    if snapshot is not None and time.time() - snapshot['taken_at'] <= settings.MARKET_SNAPSHOT_MAX_AGE:
+        return snapshot
+    return None
+
+
+def get_snapshot(market: Market, symbols: set[str] | None = None) -> dict[str, dict[str, Any]]:
+    """
+    :param market: Client used to refresh snapshot or request symbols, market data is the same for every account
+    :param symbols: Symbols requested one by one when there is no snapshot, None leaves result empty then
+    :return: Market data keyed by symbol, empty if it's unavailable
+    """
+    snapshot = _current()
+    if _is_stale(snapshot):
+        _refresh_in_background(market)
+
+    if snapshot is not None:
+        return snapshot['symbols']
+    return _take_symbols(market, symbols) if symbols else {}
+
+
+def get_symbol(market: Market, symbol: str) -> dict[str, Any] | None:
+    return get_snapshot(market, {symbol}).get(symbol)
@@ -1,14 +1,246 @@
+from dataclasses import dataclass
 from decimal import Decimal, ROUND_DOWN
-from typing import Tuple, List
+from functools import lru_cache
+from typing import Any, Tuple, List, Sequence
 from loguru import logger
 
+import numpy as np
 import pytz
 from datetime import datetime
 
+from bingX import Ticks
+
+MONEY_DIGITS = 2
+
+
+@lru_cache(maxsize=None)
+def _quantizer(digits: int) -> Decimal:
+    return Decimal(1).scaleb(-digits)
+
+
+@lru_cache(maxsize=None)
+def _pow10(digits: int) -> int:
+    return 10 ** digits
+
 
 def floor_to_digits(number: Decimal, digits: int) -> Decimal:
-    quant = Decimal('1.' + '0' * digits)
-    return number.quantize(quant, rounding=ROUND_DOWN)
+    return number.quantize(_quantizer(digits), rounding=ROUND_DOWN)
+
+
+def round_to_digits(number: Decimal, digits: int) -> Decimal:
+    return Decimal(number).quantize(_quantizer(digits))
+
+
+def _digits(value: Decimal | Ticks) -> int:
+    """Number of digits after decimal point"""
+    return Ticks.parse(value).scale
+
+
+def _ticks(values: Sequence[Decimal | Ticks], digits: int) -> np.ndarray:
+    """
+    Values as integer number of 10^-digits ticks, i.e. values of their Ticks. Arrays are of Python ints (object dtype),
+    so arithmetic stays exact whatever the magnitudes, while operations still run over all positions at once
+    """
+    return np.array([Ticks.from_decimal(value, digits).value for value in values], dtype=object)
+
+
+def _from_ticks(ticks, digits: int) -> Decimal:
+    return Ticks(int(ticks), digits).to_decimal()
+
+
+def _div_round_half_even(numerator, denominator):
+    """Exact counterpart of round(numerator / denominator) for positive denominator"""
+    quotient, remainder = numerator // denominator, numerator % denominator
+    twice = remainder * 2
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + np.where(round_up, 1, 0).astype(object)
+
+
+def _take_profit_volume_ticks(volume, volume_digits: int, quantity_precision: int, num_take_profits: np.ndarray,
+                              width: int) -> np.ndarray:
+    """
+    :param volume: Volumes in 10^-volume_digits ticks, volume_digits >= quantity_precision
+    :return: (positions x width) volumes of take-profits in 10^-quantity_precision ticks, largest first,
+    zero past number of take-profits of position
+    """
+    n = np.maximum(num_take_profits, 1).astype(object)
+    scale = _pow10(volume_digits - quantity_precision)
+
+    base = _div_round_half_even(volume, n * scale)
+    remaining = _div_round_half_even(volume - base * n * scale, scale)
+
+    column = np.arange(width)[None, :]
+    volumes = np.where(column < num_take_profits[:, None], base[:, None], 0).astype(object)
+    # Remaining volume is added to the first take-profit, which ends up last after sorting when it's negative
+    adjusted = np.where(remaining >= 0, 0, num_take_profits - 1)
+    volumes[np.arange(len(volume)), np.maximum(adjusted, 0)] += np.where(num_take_profits > 0, remaining, 0)
+    return volumes
+
+
+@dataclass
+class PositionSizes:
+    """Sizes of positions in integer ticks, see size_positions"""
+    volume: np.ndarray  # 10^-volume_digits ticks
+    margin: np.ndarray  # cents
+    potential_loss: np.ndarray  # cents
+    potential_profit: np.ndarray  # cents
+    volume_digits: int
+
+    def __len__(self) -> int:
+        return len(self.volume)
+
+    def row(self, i: int) -> dict[str, Decimal]:
+        return {
+            'volume': _from_ticks(self.volume[i], self.volume_digits),
+            'margin': _from_ticks(self.margin[i], MONEY_DIGITS),
+            'potential_loss': _from_ticks(self.potential_loss[i], MONEY_DIGITS),
+            'potential_profit': _from_ticks(self.potential_profit[i], MONEY_DIGITS),
+        }
+
+    def rows(self) -> list[dict[str, Decimal]]:
+        return [self.row(i) for i in range(len(self))]
+
+    def volume_ticks(self, i: int) -> Ticks:
+        """Volume of position as it goes to order"""
+        return Ticks(int(self.volume[i]), self.volume_digits)
+
+
+def size_positions(
+        entry_ps: Sequence[Decimal],
+        stop_ps: Sequence[Decimal],
+        leverages: Sequence[int],
+        take_ps: Sequence[Sequence[Decimal]],
+        quantity_precision: int,
+        deposit: Decimal = Decimal(0),
+        risk: Decimal = Decimal(0),
+        available_margin: Decimal = Decimal(0),
+        volumes: Sequence[Decimal | None] | None = None,
+) -> PositionSizes:
+    """
+    Sizes many candidate positions on the same tool at once: volume risking `risk` percent of deposit, capped by
+    available margin, margin, and potential loss and profit of take-profit ladder split by calc_take_profits_volumes.
+    All prices are converted into integer ticks of the finest precision among them, so results are exact
+    and equal to what per-position functions return.
+    :param take_ps: Take-profit prices of each position, in order volumes are assigned to them.
+    :param volumes: Volume of each position, None for positions which volume is calculated from risk.
+    """
+    n = len(entry_ps)
+    volumes = list(volumes) if volumes is not None else [None] * n
+    given = np.array([volume is not None for volume in volumes], dtype=bool)
+
+    price_digits = max([_digits(p) for p in (*entry_ps, *stop_ps) if p is not None] +
+                       [_digits(p) for ladder in take_ps for p in ladder] + [0])
+    volume_digits = max([quantity_precision] + [_digits(v) for v in volumes if v is not None])
+    scale = _pow10(price_digits + volume_digits)
+
+    entry, stop = _ticks(entry_ps, price_digits), _ticks(stop_ps, price_digits)
+    leverage = np.array([int(lev) for lev in leverages], dtype=object)
+    diff = np.abs(entry - stop)
+
+    # Volume risking given share of deposit, floored to quantity precision
+    allowed_loss = Decimal(deposit) * Decimal(risk) / 100
+    loss_digits = _digits(allowed_loss)
+    to_quantity = _pow10(volume_digits - quantity_precision)
+    volume = (int(allowed_loss.scaleb(loss_digits)) * _pow10(price_digits + quantity_precision)
+              // (np.where(diff > 0, diff, 1) * _pow10(loss_digits))) * to_quantity
+    volume = np.where(diff > 0, volume, 0)
+
+    # Capped by available margin: volume * entry / leverage <= available margin
+    margin_digits = _digits(Decimal(available_margin))
+    available = int(Decimal(available_margin).scaleb(margin_digits))
+    fits = available * scale * leverage >= volume * entry * _pow10(margin_digits)
+    allowed_volume = (leverage * available * _pow10(price_digits + quantity_precision)
+                      // (np.where(entry > 0, entry, 1) * _pow10(margin_digits))) * to_quantity
+    volume = np.where(fits, volume, allowed_volume)
+
+    if given.any():
+        volume = np.where(given, _ticks([v if v is not None else 0 for v in volumes], volume_digits), volume)
+
+    money = _pow10(MONEY_DIGITS)
+    margin = _div_round_half_even(volume * entry * money, scale * leverage)
+    potential_loss = diff * volume * money // scale
+
+    # Profit of take-profits ladder, exits are weighted by volumes of take-profits
+    num_take_profits = np.array([len(ladder) for ladder in take_ps] or [], dtype=np.int64)
+    width = max(int(num_take_profits.max(initial=0)), 1)
+    take_prices = np.array([[Ticks.from_decimal(p, price_digits).value for p in ladder] + [0] * (width - len(ladder))
+                            for ladder in take_ps] or np.empty((0, width)), dtype=object).reshape(n, width)
+    take_volumes = _take_profit_volume_ticks(volume, volume_digits, quantity_precision, num_take_profits, width)
+    exits = (take_prices * take_volumes).sum(axis=1) * to_quantity if n else np.array([], dtype=object)
+    potential_profit = np.abs(entry * volume - exits) * money // scale
+    potential_profit = np.where(num_take_profits > 0, potential_profit, 0)
+
+    return PositionSizes(volume=volume, margin=margin, potential_loss=potential_loss,
+                         potential_profit=potential_profit, volume_digits=volume_digits)
+
+
+def size_position_grid(
+        entry_ps: Sequence[Decimal],
+        stop_ps: Sequence[Decimal],
+        leverages: Sequence[int],
+        take_ps: Sequence[Decimal],
+        quantity_precision: int,
+        deposit: Decimal,
+        risk: Decimal,
+        available_margin: Decimal,
+        maintenance_margin_rate: float,
+) -> List[dict[str, Any]]:
+    """
+    Sizes every combination of entry, stop and leverage in one size_positions pass, for risk heatmap of position form.
+    Combinations with entry equal to stop, or with take-profits on the wrong side of entry, are left out.
+    Liquidation is estimated for cross margin, in which the whole available margin backs position: it happens once
+    loss eats available margin down to maintenance margin of position, other positions and fees are not accounted.
+    :param take_ps: Take-profits shared by all combinations.
+    :return: Sizes of combinations with risk reward and liquidation estimate, entry-major order.
+    """
+    cells = []
+    for entry_p in entry_ps:
+        for stop_p in stop_ps:
+            if entry_p == stop_p:
+                continue
+            is_long = entry_p > stop_p
+            if any(tp <= entry_p if is_long else tp >= entry_p for tp in take_ps):
+                continue
+            for leverage in leverages:
+                cells.append((entry_p, stop_p, leverage))
+
+    if not cells:
+        return []
+
+    entries, stops, levs = zip(*cells)
+    rows = size_positions(entries, stops, levs, [take_ps] * len(cells), quantity_precision, deposit, risk,
+                          available_margin).rows()
+
+    # Ratios are estimates shown on heatmap, so they are computed in floats over all combinations at once
+    entry = np.array(entries, dtype=np.float64)
+    stop = np.array(stops, dtype=np.float64)
+    volume = np.array([float(row['volume']) for row in rows])
+    loss = np.array([float(row['potential_loss']) for row in rows])
+    profit = np.array([float(row['potential_profit']) for row in rows])
+    notional = volume * entry
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_reward = np.where((loss > 0) & (profit > 0), profit / loss, np.nan)
+        distance = np.where(notional > 0, float(available_margin) / notional - maintenance_margin_rate, np.nan)
+        stop_distance = np.abs(entry - stop) / entry
+    distance = np.clip(distance, 0, None)
+    side = np.where(entry > stop, 1.0, -1.0)
+    liquidation = np.clip(entry * (1 - side * distance), 0, None)
+    price_digits = max(_digits(p) for p in (*entries, *stops))
+
+    return [
+        {
+            'entry_p': entries[i],
+            'stop_p': stops[i],
+            'leverage': levs[i],
+            **rows[i],
+            'risk_reward': None if np.isnan(risk_reward[i]) else round(float(risk_reward[i]), 2),
+            'liquidation_price': None if np.isnan(liquidation[i]) else round(float(liquidation[i]), price_digits),
+            'liquidation_distance_percent': None if np.isnan(distance[i]) else round(float(distance[i]) * 100, 2),
+            'stop_before_liquidation': None if np.isnan(distance[i]) else bool(stop_distance[i] < distance[i]),
+        }
+        for i in range(len(cells))
+    ]
 
 
 def calc_position_volume_and_margin(
@@ -20,21 +252,10 @@ def calc_position_volume_and_margin(
         leverage: int,
         quantity_precision: int
 ) -> Tuple[Decimal, Decimal]:
-    diff_pips = abs(entry_p - stop_p)
-
-    allowed_loss = deposit * risk / 100
-
-    volume = floor_to_digits(allowed_loss / diff_pips, quantity_precision)
-
-    required_margin = volume * entry_p / leverage
-
-    if available_margin >= required_margin:
-        logger.debug(f"Margin required: {required_margin}")
-        return volume, Decimal(round(required_margin, 2))
-    else:
-        allowed_volume = floor_to_digits(leverage * available_margin / entry_p, quantity_precision)
-        logger.debug(f"Margin allowed: {allowed_volume * entry_p / leverage}")
-        return allowed_volume, Decimal(round(allowed_volume * entry_p / leverage, 2))
+    sizes = size_positions([entry_p], [stop_p], [leverage], [[]], quantity_precision, deposit, risk,
+                           available_margin).row(0)
+    logger.debug(f"Margin required: {sizes['margin']}")
+    return sizes['volume'], sizes['margin']
 
 
 def calculate_position_margin(entry_p: Decimal, volume: Decimal, leverage: int) -> Decimal:
@@ -45,39 +266,23 @@ def calc_take_profits_volumes(
         volume: Decimal,
         quantity_precision: int,
         num_take_profits: int
-) -> List[Decimal]:
+) -> List[Ticks]:
     """
     Calculate the volumes for take profits.
 
     :param volume: Total volume to be distributed among take profits.
     :param quantity_precision: Precision for the volume.
     :param num_take_profits: Number of take profit targets.
-    :return: List of volumes for take profits, largest volume first.
+    :return: List of volumes for take profits in ticks of quantity precision, largest volume first,
+    they go to take-profit orders as they are.
     """
-
-    def round_with_precision(value, precision):
-        factor = 10 ** precision
-        return Decimal(round(value * factor) / factor)
-
     if num_take_profits <= 0:
         return []
 
-    base_volume = Decimal(volume / num_take_profits)
-
-    base_volume = round_with_precision(base_volume, quantity_precision)
-
-    take_profits_volumes = [base_volume] * num_take_profits
-
-    remaining_volume = Decimal(round_with_precision(volume - sum(take_profits_volumes), quantity_precision))
-
-    # Adjust the first take profit volume to account for the remaining volume
-    if remaining_volume != 0:
-        take_profits_volumes[0] += remaining_volume
-
-    # Sort volumes so the largest volume is first
-    take_profits_volumes.sort(reverse=True)
-
-    return take_profits_volumes
+    volume_digits = max(quantity_precision, _digits(volume))
+    ticks = _take_profit_volume_ticks(_ticks([volume], volume_digits), volume_digits, quantity_precision,
+                                      np.array([num_take_profits]), num_take_profits)
+    return [Ticks(int(take_volume), quantity_precision) for take_volume in ticks[0]]
 
 
 def calculate_position_potential_loss_and_profit(
@@ -87,25 +292,8 @@ def calculate_position_potential_loss_and_profit(
         volume: Decimal,
         quantity_precision: int
 ) -> Tuple[Decimal, Decimal]:
-    pot_loss = abs(entry_p - stop_p) * volume
-
-    sum_of_weighted_prices = 0
-    volumes = calc_take_profits_volumes(volume, quantity_precision, len(take_ps))
-
-    if len(volumes) > 0:
-
-        for exit_price, exit_volume in zip(take_ps, volumes):
-            sum_of_weighted_prices += exit_price * exit_volume
-
-        if volume == 0:
-            return Decimal(0), Decimal(0)
-        price_of_exit = sum_of_weighted_prices / volume
-
-        pot_profit = abs(entry_p - price_of_exit) * volume
-    else:
-        pot_profit = Decimal(0)
-
-    return floor_to_digits(pot_loss, 2), floor_to_digits(pot_profit, 2)
+    sizes = size_positions([entry_p], [stop_p], [1], [take_ps], quantity_precision, volumes=[volume]).row(0)
+    return sizes['potential_loss'], sizes['potential_profit']
 
 
 def convert_to_unix(utc_plus_2_string: str) -> int:
@@ -1,7 +1,7 @@
 import json
 import time
 
-from django.db import connection
+from django.db import close_old_connections
 from django.db.utils import OperationalError
 
 from schedule import Scheduler
@@ -13,6 +13,8 @@ from loguru import logger
 from threading import Thread
 
 from .exchanges import BingXExc, ByBitExc, Exchange
+from .. import metrics
+from ...storage import screenshot_storage
 
 exc_map = {
     "BingX": BingXExc,
@@ -26,8 +28,12 @@ def format_dict_for_log(dict_data: dict | list) -> str:
 
 class OrderPoller:
     def __init__(self, interval_seconds: int = 5):
+        self.interval_seconds = interval_seconds
+        self._last_cycle_start = None
         self.scheduler = Scheduler()
         self.scheduler.every(interval_seconds).seconds.do(self.poll_accounts_for_position_statuses)
+        # Poller runs as a single instance, so unreferenced screenshots are collected by one process
+        self.scheduler.every(1).hours.do(self.collect_screenshot_garbage)
 
         self.logger = logger.bind(class_name=self.__class__.__name__)
         self.runs = 0
@@ -38,10 +44,9 @@ class OrderPoller:
 
         while True:
             try:
-                # Always close stale connections before attempting work,
-                # because Django doesn't automatically update connections for threads - one thread - one connection
-                if not connection.is_usable():
-                    connection.close()
+                # Long-running loop is not a request, so connection housekeeping which Django does around requests
+                # is done here: broken connections and ones older than CONN_MAX_AGE are closed, others are reused
+                close_old_connections()
 
                 self.scheduler.run_pending()
                 consecutive_errors = 0
@@ -86,15 +91,26 @@ class OrderPoller:
                 self.finish_trade(exc, tool, db_pos)
 
     def poll_accounts_for_position_statuses(self):
-        accounts = Account.objects.exclude(exchange=Account.Exchange.INVESTING)
+        previous_start, self._last_cycle_start = self._last_cycle_start, time.monotonic()
 
-        if self.runs % 60 == 0:
-            self.logger.info('Starting polling accounts for position statuses...')
+        with metrics.track_poll_cycle(self.interval_seconds, previous_start):
+            accounts = Account.objects.exclude(exchange=Account.Exchange.INVESTING)
 
-        for account in accounts:
-            self.check_position_statuses_for_account(account)
+            if self.runs % 60 == 0:
+                self.logger.info('Starting polling accounts for position statuses...')
 
-        self.runs += 1
+            polled = 0
+            for account in accounts:
+                self.check_position_statuses_for_account(account)
+                polled += 1
+
+            metrics.poll_cycle_accounts.set(polled)
+            self.runs += 1
+
+    def collect_screenshot_garbage(self):
+        removed = screenshot_storage.collect_garbage()
+        if removed:
+            self.logger.info(f'Removed {removed} unreferenced screenshots')
 
     ##### ORDER MANAGEMENT STUFF #####
     def check_for_fill_event(self, exc: Exchange, tool: str, db_pos: Position, server_pos: dict, last_status: str):
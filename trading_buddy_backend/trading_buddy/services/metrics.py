@@ -0,0 +1,150 @@
+"""
+Prometheus metrics of exchange client, poller, listeners and views. Web app exposes them on /metrics
+(see views/metrics.py), run_poller and run_listeners commands serve them on their own ports, see serve.
+Web workers of gunicorn are separate processes, so with PROMETHEUS_MULTIPROC_DIR set metrics of all of them are
+aggregated from that directory, otherwise each scrape sees metrics of the worker which served it.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from loguru import logger
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+                               generate_latest, start_http_server)
+from prometheus_client import multiprocess
+
+# Exchange requests take from tens of milliseconds to seconds when exchange is busy
+REQUEST_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Cancel checks are one or two queries, and a REST request when order is cancelled
+CHECK_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+bingx_request_seconds = Histogram(
+    'bingx_request_duration_seconds', 'Duration of BingX REST requests',
+    ['method', 'endpoint', 'code'], buckets=REQUEST_BUCKETS,
+)
+bingx_requests = Counter(
+    'bingx_requests', 'BingX REST requests by account, which is short digest of its API key',
+    ['account', 'endpoint'],
+)
+
+poll_cycle_seconds = Histogram(
+    'poller_cycle_duration_seconds', 'Duration of poll cycle over all accounts', buckets=REQUEST_BUCKETS,
+)
+poll_cycle_lag_seconds = Gauge(
+    'poller_cycle_lag_seconds', 'How much later than scheduled the last poll cycle started',
+    multiprocess_mode='max',
+)
+poll_cycle_queries = Histogram(
+    'poller_cycle_db_queries', 'DB queries made by poll cycle', buckets=QUERY_BUCKETS,
+)
+poll_cycle_accounts = Gauge(
+    'poller_cycle_accounts', 'Accounts polled by the last poll cycle', multiprocess_mode='max',
+)
+
+websocket_ticks = Counter(
+    'websocket_ticks', 'Price updates received by price listeners', ['tool'],
+)
+websocket_reconnects = Counter(
+    'websocket_reconnects', 'Reconnects of price listeners after their connection was closed', ['tool'],
+)
+cancel_check_seconds = Histogram(
+    'listener_cancel_check_duration_seconds', 'Duration of checks whether primary order should be cancelled',
+    buckets=CHECK_BUCKETS,
+)
+
+view_seconds = Histogram(
+    'view_duration_seconds', 'Duration of requests served by web app', ['method', 'route'], buckets=REQUEST_BUCKETS,
+)
+view_queries = Histogram(
+    'view_db_queries', 'DB queries made by request', ['method', 'route'], buckets=QUERY_BUCKETS,
+)
+view_db_seconds = Histogram(
+    'view_db_duration_seconds', 'Time request spent in DB queries', ['method', 'route'], buckets=CHECK_BUCKETS,
+)
+view_exchange_seconds = Histogram(
+    'view_exchange_duration_seconds', 'Time request spent in exchange requests, concurrent ones are summed',
+    ['method', 'route'], buckets=REQUEST_BUCKETS,
+)
+view_cpu_seconds = Histogram(
+    'view_cpu_seconds', 'CPU time of thread serving request, sync views only', ['method', 'route'],
+    buckets=CHECK_BUCKETS,
+)
+
+
+def observe_view(method: str, route: str, profile) -> None:
+    """Records profile of request, see services/profiling.py"""
+    view_seconds.labels(method, route).observe(profile.seconds)
+    view_queries.labels(method, route).observe(profile.queries)
+    view_db_seconds.labels(method, route).observe(profile.db_seconds)
+    view_exchange_seconds.labels(method, route).observe(profile.http_seconds)
+    if profile.cpu_seconds is not None:
+        view_cpu_seconds.labels(method, route).observe(profile.cpu_seconds)
+
+
+def observe_bingx_request(method: str, endpoint: str, account: str, code: int | None, seconds: float) -> None:
+    """Observer of bingX client requests, see bingX.set_request_observer"""
+    bingx_request_seconds.labels(method, endpoint, 'unreachable' if code is None else str(code)).observe(seconds)
+    bingx_requests.labels(account, endpoint).inc()
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def track_poll_cycle(interval: float, previous_start: float | None):
+    """
+    Times poll cycle and counts DB queries it makes on connection of the current thread
+
+    :param interval: Seconds between scheduled cycles
+    :param previous_start: time.monotonic() when the previous cycle started, None for the first cycle
+    """
+    start = time.monotonic()
+    if previous_start is not None:
+        poll_cycle_lag_seconds.set(max(start - previous_start - interval, 0))
+
+    counter = _QueryCounter()
+    try:
+        with connection.execute_wrapper(counter):
+            yield
+    finally:
+        poll_cycle_seconds.observe(time.monotonic() - start)
+        poll_cycle_queries.observe(counter.queries)
+
+
+def registry():
+    """Registry to expose, the one aggregating all processes when PROMETHEUS_MULTIPROC_DIR is set"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        aggregated = CollectorRegistry()
+        multiprocess.MultiProcessCollector(aggregated)
+        return aggregated
+    return REGISTRY
+
+
+def render() -> tuple[bytes, str]:
+    """Metrics in Prometheus text format and their content type"""
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+_served_port = None
+_serve_lock = threading.Lock()
+
+
+def serve(port: int) -> None:
+    """Serves metrics of management command process over HTTP in background thread, 0 port turns it off"""
+    global _served_port
+
+    with _serve_lock:
+        if not port or _served_port is not None:
+            return
+        start_http_server(port, registry=registry())
+        _served_port = port
+    logger.info(f'Serving metrics on port {port}')
@@ -0,0 +1,113 @@
+"""
+Per-request profile: DB queries and their time, BingX requests and their time, CPU time and duration.
+Queries and BingX requests are attributed to the profile of the context they are made in, so ORM calls of async views
+made through sync_to_async and requests run on exchange executor count too. Concurrent BingX requests of one view
+are summed, so their time can exceed duration of the request.
+ProfilingMiddleware exports profiles as metrics per route and checks them against QUERY_BUDGETS.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_current: ContextVar['Profile | None'] = ContextVar('profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when view makes more DB queries than its budget allows and budgets are enforced"""
+    pass
+
+
+@dataclass
+class Profile:
+    queries: int = 0
+    db_seconds: float = 0.0
+    http_requests: int = 0
+    http_seconds: float = 0.0
+    cpu_seconds: float | None = None  # None when it can't be told apart from CPU time of other requests
+    seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+
+    def add_http_request(self, seconds: float):
+        with self._lock:
+            self.http_requests += 1
+            self.http_seconds += seconds
+
+    def server_timing(self) -> str:
+        """Value of Server-Timing header, browser dev tools show it along with timing of request"""
+        timings = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+                   f'exchange;dur={self.http_seconds * 1000:.1f};desc="{self.http_requests} requests"']
+        if self.cpu_seconds is not None:
+            timings.append(f'cpu;dur={self.cpu_seconds * 1000:.1f}')
+        timings.append(f'total;dur={self.seconds * 1000:.1f}')
+        return ', '.join(timings)
+
+
+@contextmanager
+def profile(measure_cpu: bool = True):
+    """
+    Profiles everything done within, in this context and ones copied from it
+
+    :param measure_cpu: CPU time of the thread is only meaningful when it serves one request at a time,
+    which isn't the case for event loop of async views
+    """
+    current = Profile()
+    token = _current.set(current)
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        if measure_cpu:
+            current.cpu_seconds = time.thread_time() - cpu_start
+        _current.reset(token)
+
+
+def check_budget(route: str, current: Profile, budgets: dict[str, int]) -> int | None:
+    """
+    :return: Budget of route which profile exceeded, None when it's within budget or route has none
+    """
+    budget = budgets.get(route)
+    if budget is not None and current.queries > budget:
+        return budget
+    return None
+
+
+def observe_bingx_request(method: str, endpoint: str, account: str, code: int | None, seconds: float) -> None:
+    """Observer of bingX client requests, see bingX.set_request_observer"""
+    current = _current.get()
+    if current is not None:
+        current.add_http_request(seconds)
+
+
+def _count_query(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.add_query(time.perf_counter() - start)
+
+
+def _install_query_counting(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install():
+    """Counts queries of every connection of the process, ones opened later included"""
+    connection_created.connect(_install_query_counting, weak=False)
+    for conn in connections.all(initialized_only=True):
+        _install_query_counting(None, conn)
@@ -0,0 +1,224 @@
+"""
+OpenTelemetry tracing of hot paths: request → Exchange method → BingX request → DB query.
+Spans are only made once configure is called (TRACING setting), otherwise helpers below cost one check per call.
+Share of requests given by TRACING_SAMPLE_RATE is traced, and TRACING_HEADER of request forces it on (1) or off (0),
+so a slow request can be traced on demand, its trace id is returned in X-Trace-Id header.
+Spans are exported to OTLP collector, or appended to file as OTLP JSON lines, one export batch per line.
+"""
+import base64
+import functools
+import inspect
+import threading
+from contextlib import contextmanager, nullcontext
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Attribute of root span which overrides sampling, see TracingMiddleware
+FORCE_ATTRIBUTE = 'trace.forced'
+MAX_STATEMENT_LENGTH = 1000
+
+# Set by configure, as opentelemetry is imported only when tracing is on
+_tracer = None
+_get_current_span = None
+_span_kind_client = _span_kind_server = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attributes):
+    """Context manager of span which is a child of the current one"""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes or None)
+
+
+def traced(name: str | None = None):
+    """Decorator which runs function, sync or async, within span named after it"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _tracer is None:
+                    return await func(*args, **kwargs)
+                with _tracer.start_as_current_span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.start_as_current_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls):
+    """Class decorator which wraps every method defined by the class, private ones included, into span"""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith('__'):
+            continue
+        name = f'{cls.__name__}.{attr}'
+        if isinstance(value, (staticmethod, classmethod)):
+            setattr(cls, attr, type(value)(traced(name)(value.__func__)))
+        elif inspect.isfunction(value):
+            setattr(cls, attr, traced(name)(value))
+    return cls
+
+
+def request_span(method: str, endpoint: str):
+    """Span of BingX request, see bingX.set_request_span"""
+    return _tracer.start_as_current_span(f'bingx {method} {endpoint}', kind=_span_kind_client,
+                                         attributes={'http.request.method': method, 'url.path': endpoint})
+
+
+@contextmanager
+def server_span(method: str, path: str, forced: bool | None):
+    """
+    Root span of request served by web app
+
+    :param forced: True traces request regardless of sampling rate, False never traces it, None leaves it to sampling
+    """
+    if _tracer is None:
+        yield None
+        return
+
+    attributes = {'http.request.method': method, 'url.path': path}
+    if forced is not None:
+        attributes[FORCE_ATTRIBUTE] = forced
+    with _tracer.start_as_current_span(f'{method} {path}', kind=_span_kind_server, attributes=attributes) as root:
+        yield root
+
+
+def trace_id(root) -> str | None:
+    """Hex id of trace of span, if it's exported"""
+    if root is None or not root.is_recording():
+        return None
+    return format(root.get_span_context().trace_id, '032x')
+
+
+def _trace_query(execute, sql, params, many, context):
+    if not _get_current_span().is_recording():
+        return execute(sql, params, many, context)
+
+    operation = sql.split(None, 1)[0].upper() if sql else 'QUERY'
+    attributes = {'db.system': context['connection'].vendor, 'db.statement': sql[:MAX_STATEMENT_LENGTH]}
+    if many:
+        attributes['db.operation.batch.size'] = len(params) if hasattr(params, '__len__') else -1
+    with _tracer.start_as_current_span(f'db {operation}', kind=_span_kind_client, attributes=attributes):
+        return execute(sql, params, many, context)
+
+
+def _install_query_tracing(sender, connection, **kwargs):
+    if _trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_trace_query)
+
+
+class _OTLPJsonFileExporter:
+    """Appends every export batch to file as one line of OTLP JSON, the format of OTLP/HTTP JSON requests"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hex_ids(value):
+        # Protobuf JSON mapping writes bytes as base64, while OTLP JSON has trace and span ids in hex
+        if isinstance(value, dict):
+            return {k: base64.b64decode(v).hex() if k in ('traceId', 'spanId', 'parentSpanId') and v
+                    else _OTLPJsonFileExporter._hex_ids(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [_OTLPJsonFileExporter._hex_ids(v) for v in value]
+        return value
+
+    def export(self, spans):
+        import json
+        from google.protobuf.json_format import MessageToDict
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        line = json.dumps(self._hex_ids(MessageToDict(encode_spans(spans))), separators=(',', ':'))
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def _sampler(rate: float):
+    from opentelemetry.sdk.trace.sampling import Decision, ParentBased, Sampler, SamplingResult, TraceIdRatioBased
+
+    class ForcedOrRatioSampler(Sampler):
+        """Root spans with FORCE_ATTRIBUTE are sampled as it says, other ones by trace id ratio"""
+
+        def __init__(self):
+            self._ratio = TraceIdRatioBased(rate)
+
+        def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None,
+                          trace_state=None):
+            forced = attributes.get(FORCE_ATTRIBUTE) if attributes else None
+            if forced is None:
+                return self._ratio.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+            return SamplingResult(Decision.RECORD_AND_SAMPLE if forced else Decision.DROP, attributes)
+
+        def get_description(self) -> str:
+            return f'ForcedOrRatioSampler{{{rate}}}'
+
+    # Children follow decision of their parent, so trace is either complete or not exported at all
+    return ParentBased(ForcedOrRatioSampler())
+
+
+def configure(exporter: str, sample_rate: float, service_name: str, file_path: str = '', otlp_endpoint: str = ''):
+    """
+    Turns tracing on for the process, spans are exported in background and flushed at exit
+
+    :param exporter: file or otlp
+    :return: TracerProvider, i.e. to flush spans with force_flush
+    """
+    global _tracer, _get_current_span, _span_kind_client, _span_kind_server
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        raise ImproperlyConfigured('Tracing requires opentelemetry-sdk to be installed, see tracing extra')
+
+    if exporter == 'file':
+        span_exporter = _OTLPJsonFileExporter(file_path)
+    elif exporter == 'otlp':
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            raise ImproperlyConfigured('OTLP export requires opentelemetry-exporter-otlp-proto-http to be installed')
+        span_exporter = OTLPSpanExporter(endpoint=otlp_endpoint)
+    else:
+        raise ImproperlyConfigured(f'Unknown TRACING exporter: {exporter}, use file or otlp')
+
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}), sampler=_sampler(sample_rate))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+
+    _get_current_span = trace.get_current_span
+    _span_kind_client, _span_kind_server = trace.SpanKind.CLIENT, trace.SpanKind.SERVER
+    _tracer = provider.get_tracer(__name__)
+
+    connection_created.connect(_install_query_tracing, weak=False)
+    for conn in connections.all(initialized_only=True):
+        _install_query_tracing(None, conn)
+    return provider
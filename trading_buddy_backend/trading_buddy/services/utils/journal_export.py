@@ -0,0 +1,188 @@
+"""
+Streaming export of journal trades into CSV or Parquet.
+Trades are read with a server-side cursor and written chunk by chunk, so memory usage doesn't depend on journal size.
+Under ASGI Django would read sync iterator of streaming response into memory before sending it, so there export is
+streamed through async iterator, see aiter_export.
+"""
+import csv
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.db.models import ExpressionWrapper, BooleanField, Q
+
+from trading_buddy.filters import TradeFilters
+from trading_buddy.models import Account, Trade
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional, install `backend[parquet]` to enable it
+    pa = pq = None
+
+CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = ('trade_number', 'account', 'tool', 'side', 'start_time', 'end_time', 'timeframe', 'trade_setup',
+                  'risk_percent', 'risk_usd', 'pnl_usd', 'commission_usd', 'description', 'result', 'screenshot')
+
+EXPORT_FORMATS = {
+    # format: (content type, file extension)
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def iter_export_rows(user, filters: TradeFilters = None, investing=False, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields tuples of EXPORT_COLUMNS values of trades which match filters, in order of trade number.
+
+    Trade number is position of trade among all trades of user, same as in journal. Instead of counting previous
+    trades per row, all trades of user are scanned once in pk order and the database only marks which of them
+    match filters.
+    """
+    if investing:
+        selected = Q(account__exchange=Account.Exchange.INVESTING)
+    else:
+        selected = ~Q(account__exchange=Account.Exchange.INVESTING)
+
+    if filters:
+        selected &= filters.as_q()
+
+    rows = (
+        Trade.objects.filter(account__user=user)
+        .annotate(selected=ExpressionWrapper(selected, output_field=BooleanField()))
+        .order_by('pk')
+        .values_list('selected', 'account__name', 'tool__name', 'side', 'start_time', 'end_time', 'timeframe',
+                     'trade_setup', 'risk_percent', 'risk_usd', 'pnl_usd', 'commission_usd', 'description', 'result',
+                     'screenshot')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for trade_number, (is_selected, *values) in enumerate(rows, start=1):
+        if is_selected:
+            yield trade_number, *values
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer, returns written line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(rows, chunk_size: int = CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(writer.writerow([_csv_value(value) for value in row]) for row in chunk)
+
+
+class _DrainableSink:
+    """Write-only file object for ParquetWriter, written bytes are taken out after each row group"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _decimal_type(field_name: str):
+    field = Trade._meta.get_field(field_name)
+    return pa.decimal128(field.max_digits, field.decimal_places)
+
+
+def _parquet_schema():
+    timestamp = pa.timestamp('us', tz='UTC')
+    return pa.schema([
+        ('trade_number', pa.int64()),
+        ('account', pa.string()),
+        ('tool', pa.string()),
+        ('side', pa.string()),
+        ('start_time', timestamp),
+        ('end_time', timestamp),
+        ('timeframe', pa.string()),
+        ('trade_setup', pa.string()),
+        ('risk_percent', _decimal_type('risk_percent')),
+        ('risk_usd', _decimal_type('risk_usd')),
+        ('pnl_usd', _decimal_type('pnl_usd')),
+        ('commission_usd', _decimal_type('commission_usd')),
+        ('description', pa.string()),
+        ('result', pa.string()),
+        ('screenshot', pa.string()),
+    ])
+
+
+def stream_parquet(rows, chunk_size: int = CHUNK_SIZE):
+    """Every chunk of rows is written as separate row group and sent right away"""
+    if not parquet_available():
+        raise RuntimeError('Parquet export requires pyarrow to be installed')
+
+    schema = _parquet_schema()
+    sink = _DrainableSink()
+
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for chunk in _chunks(rows, chunk_size):
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+
+    # Footer is written on close
+    yield sink.drain()
+
+
+def stream_export(file_format: str, rows, chunk_size: int = CHUNK_SIZE):
+    if file_format == 'csv':
+        return stream_csv(rows, chunk_size)
+    if file_format == 'parquet':
+        return stream_parquet(rows, chunk_size)
+    raise ValueError(f'Unknown export format: {file_format}, choose one of: {", ".join(EXPORT_FORMATS)}')
+
+
+async def aiter_export(chunks):
+    """Async iterator over chunks of stream_export, every chunk is produced in sync thread, as it reads the DB"""
+    chunks = iter(chunks)
+    end = object()
+    while (chunk := await sync_to_async(next)(chunks, end)) is not end:
+        yield chunk
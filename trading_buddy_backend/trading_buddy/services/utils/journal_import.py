@@ -0,0 +1,414 @@
+"""
+Bulk import of historic trades into journal from Notion database, CSV or JSON file.
+
+Source is read page by page, screenshots of every page are downloaded concurrently, then the whole page is inserted
+with bulk_create inside one transaction. After each committed page checkpoint file is updated, so interrupted import
+continues from the first not imported page.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from django.core.files.base import ContentFile
+from django.db import transaction
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from trading_buddy.models import Account, Tool, Trade
+from trading_buddy.stats_cache import bump_stats_version
+
+PAGE_SIZE = 500
+IMAGE_WORKERS = 8
+
+
+@dataclass
+class ImportRecord:
+    """Trade in source independent form, `screenshot` is URL, path to local file or name of already stored file"""
+    tool: str
+    side: str
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+    timeframe: str | None = None
+    trade_setup: str | None = None
+    risk_percent: Decimal = Decimal(0)
+    risk_usd: Decimal = Decimal(0)
+    pnl_usd: Decimal = Decimal(0)
+    commission_usd: Decimal = Decimal(0)
+    description: str | None = None
+    result: str | None = None
+    screenshot: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ImportRecord':
+        """Accepts rows in format of journal export, unknown keys are ignored"""
+        side = (data.get('side') or '').upper()
+        if side not in Trade.Side.values:
+            raise ValueError(f"Invalid side: {data.get('side')}")
+
+        trade_setup = data.get('trade_setup') or None
+        if trade_setup not in Trade.TradeSetup.values:
+            trade_setup = None
+
+        return cls(
+            tool=_required(data, 'tool').strip(),
+            side=side,
+            start_time=_parse_datetime(data.get('start_time')),
+            end_time=_parse_datetime(data.get('end_time')),
+            timeframe=data.get('timeframe') or None,
+            trade_setup=trade_setup,
+            risk_percent=_parse_decimal(data.get('risk_percent')),
+            risk_usd=_parse_decimal(data.get('risk_usd')),
+            pnl_usd=_parse_decimal(data.get('pnl_usd')),
+            commission_usd=_parse_decimal(data.get('commission_usd')),
+            description=data.get('description') or None,
+            result=data.get('result') or None,
+            screenshot=data.get('screenshot') or None,
+        )
+
+
+def _required(data: dict, key: str):
+    if not data.get(key):
+        raise ValueError(f'Missing {key}')
+    return data[key]
+
+
+def _parse_datetime(value) -> datetime | None:
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # All datetimes are stored in utc
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _parse_decimal(value) -> Decimal:
+    if value in (None, ''):
+        return Decimal(0)
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'Invalid number: {value}')
+
+
+def _make_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=3)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+##### SOURCES #####
+# Every source yields pages of records together with cursor of the next page, None cursor means last page
+class CsvSource:
+    def __init__(self, path: str, page_size: int = PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        self.key = f'csv:{Path(path).resolve()}'
+
+    def pages(self, cursor: int | None = None):
+        offset = cursor or 0
+        with open(self.path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for _ in range(offset):
+                next(reader, None)
+
+            page = []
+            for row in reader:
+                page.append(row)
+                if len(page) == self.page_size:
+                    offset += len(page)
+                    yield page, offset
+                    page = []
+
+            yield page, None
+
+
+class JsonSource:
+    """File with list of trades, or object with such list under `trades` key"""
+
+    def __init__(self, path: str, page_size: int = PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        self.key = f'json:{Path(path).resolve()}'
+
+    def pages(self, cursor: int | None = None):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        rows = data['trades'] if isinstance(data, dict) else data
+
+        offset = cursor or 0
+        if offset >= len(rows):
+            yield [], None
+
+        while offset < len(rows):
+            next_offset = offset + self.page_size
+            yield rows[offset:next_offset], next_offset if next_offset < len(rows) else None
+            offset = next_offset
+
+
+class NotionSource:
+    """
+    Notion database of trades in format of the old journal: page properties hold trade values,
+    page content holds description and result separated by headings and chart images.
+    """
+    API_URL = 'https://api.notion.com/v1'
+    NOTION_PAGE_SIZE = 100  # max allowed by Notion API
+
+    def __init__(self, database_id: str, token: str, market: str = 'Крипта', side: str = Trade.Side.SHORT,
+                 tool_suffix: str = '-USDT', workers: int = IMAGE_WORKERS):
+        self.database_id = database_id
+        self.market = market
+        self.side = side
+        self.tool_suffix = tool_suffix
+        self.workers = workers
+        self.key = f'notion:{database_id}'
+
+        self.session = _make_session(workers)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Notion-Version": "2022-06-28",
+            "Content-Type": "application/json"
+        })
+
+    def _request(self, method: str, url: str, **kwargs) -> dict:
+        while True:
+            response = self.session.request(method, url, timeout=30, **kwargs)
+            if response.status_code == 429:  # Notion allows ~3 requests per second on average
+                time.sleep(float(response.headers.get('Retry-After', 1)))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def pages(self, cursor: str | None = None):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                body = {
+                    'page_size': self.NOTION_PAGE_SIZE,
+                    'sorts': [{'timestamp': 'created_time', 'direction': 'ascending'}],
+                }
+                if cursor:
+                    body['start_cursor'] = cursor
+
+                data = self._request('POST', f'{self.API_URL}/databases/{self.database_id}/query', json=body)
+                items = [item for item in data['results'] if self._property(item, 'Рынок') == self.market]
+                # Content of every page is fetched concurrently
+                rows = list(pool.map(self._to_row, items))
+
+                cursor = data['next_cursor'] if data.get('has_more') else None
+                yield rows, cursor
+
+                if cursor is None:
+                    return
+
+    @staticmethod
+    def _property(item: dict, name: str):
+        prop = item['properties'].get(name)
+        if prop is None:
+            return None
+
+        match prop['type']:
+            case 'select':
+                return (prop['select'] or {}).get('name')
+            case 'number':
+                return prop['number']
+            case 'date':
+                return (prop['date'] or {}).get('start')
+            case 'title':
+                return ''.join(chunk['plain_text'] for chunk in prop['title'])
+        return None
+
+    def _blocks(self, page_id: str):
+        cursor = None
+        while True:
+            params = {'page_size': self.NOTION_PAGE_SIZE}
+            if cursor:
+                params['start_cursor'] = cursor
+            data = self._request('GET', f'{self.API_URL}/blocks/{page_id}/children', params=params)
+            yield from data['results']
+            if not data.get('has_more'):
+                return
+            cursor = data['next_cursor']
+
+    def _to_row(self, item: dict) -> dict:
+        # Description goes first and result second, both start with a heading
+        reading_description = False
+        description = ''
+        result = ''
+        screenshot = None
+
+        for block in self._blocks(item['id'].replace('-', '')):
+            if block['type'] == 'heading_1':
+                reading_description = not reading_description
+            elif block['type'] == 'paragraph':
+                text = "\n".join(chunk['plain_text'] for chunk in block['paragraph']['rich_text']) + "\n"
+                if reading_description:
+                    description += text
+                else:
+                    result += text
+            elif block['type'] == 'image' and screenshot is None:
+                image = block['image']
+                screenshot = image[image['type']]['url']  # uploaded 'file' or 'external' link
+
+        risk = self._property(item, 'Риск')
+        return {
+            'tool': (self._property(item, 'Инструмент') or '').strip() + self.tool_suffix,
+            'side': self.side,
+            'start_time': self._property(item, 'Вход'),
+            'end_time': self._property(item, 'Выход'),
+            'risk_percent': risk,  # deposit of old journal was 100$, so risk in percents equals risk in USD
+            'risk_usd': risk,
+            'pnl_usd': self._property(item, 'Прибыль'),
+            'description': description,
+            'result': result,
+            'screenshot': screenshot,
+        }
+
+
+##### IMPORT #####
+@dataclass
+class ImportStats:
+    imported: int = 0
+    skipped: int = 0
+    images: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+class JournalImporter:
+    def __init__(self, account: Account, source, checkpoint_path: str | None = None,
+                 image_workers: int = IMAGE_WORKERS):
+        self.account = account
+        self.source = source
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.image_workers = image_workers
+        self.session = _make_session(image_workers)
+        self.logger = logger.bind(class_name=self.__class__.__name__)
+
+    def _load_checkpoint(self) -> dict:
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return {}
+
+        checkpoint = json.loads(self.checkpoint_path.read_text())
+        if checkpoint.get('source') != self.source.key or checkpoint.get('account_id') != self.account.pk:
+            raise ValueError(f'Checkpoint {self.checkpoint_path} belongs to another import')
+        return checkpoint
+
+    def _save_checkpoint(self, cursor, stats: ImportStats, done: bool):
+        if not self.checkpoint_path:
+            return
+
+        tmp_path = self.checkpoint_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({
+            'source': self.source.key,
+            'account_id': self.account.pk,
+            'cursor': cursor,
+            'imported': stats.imported,
+            'done': done,
+        }))
+        os.replace(tmp_path, self.checkpoint_path)  # atomic, so interrupted write never corrupts checkpoint
+
+    def _fetch_image(self, screenshot: str) -> bytes | None:
+        try:
+            if urlparse(screenshot).scheme in ('http', 'https'):
+                response = self.session.get(screenshot, timeout=30)
+                response.raise_for_status()
+                return response.content
+            return Path(screenshot).read_bytes()
+        except (requests.RequestException, OSError) as e:
+            self.logger.warning(f'Failed to fetch screenshot {screenshot}: {e}')
+            return None
+
+    @staticmethod
+    def _is_stored(screenshot: str) -> bool:
+        """Whether screenshot is name of file in media storage, e.g. when importing journal export"""
+        if urlparse(screenshot).scheme or os.path.isabs(screenshot):
+            return False
+        # Reused file is kept from garbage collection until trades referencing it are inserted
+        return Trade._meta.get_field('screenshot').storage.reuse(screenshot)
+
+    def _get_tools(self, names: set[str]) -> dict[str, Tool]:
+        tools = {tool.name: tool for tool in Tool.objects.filter(account=self.account, name__in=names)}
+        missing = names - tools.keys()
+        if missing:
+            Tool.objects.bulk_create([Tool(account=self.account, name=name) for name in missing],
+                                     ignore_conflicts=True)
+            tools.update({tool.name: tool for tool in Tool.objects.filter(account=self.account, name__in=missing)})
+        return tools
+
+    def _import_page(self, records: list[ImportRecord], pool: ThreadPoolExecutor, stats: ImportStats):
+        screenshot_field = Trade._meta.get_field('screenshot')
+        to_fetch = [record.screenshot for record in records
+                    if record.screenshot and not self._is_stored(record.screenshot)]
+        # Downloads run before transaction is opened, so DB isn't locked while waiting for network
+        images = dict(zip(to_fetch, pool.map(self._fetch_image, to_fetch)))
+
+        saved_files = []
+        try:
+            with transaction.atomic():
+                tools = self._get_tools({record.tool for record in records})
+
+                trades = []
+                for record in records:
+                    trade = Trade(
+                        side=record.side, tool=tools[record.tool], account=self.account,
+                        start_time=record.start_time, end_time=record.end_time, timeframe=record.timeframe,
+                        trade_setup=record.trade_setup, risk_percent=record.risk_percent, risk_usd=record.risk_usd,
+                        pnl_usd=record.pnl_usd, commission_usd=record.commission_usd,
+                        description=record.description, result=record.result,
+                    )
+
+                    if record.screenshot in images:
+                        content = images[record.screenshot]
+                        if content is not None:
+                            filename = Path(urlparse(record.screenshot).path).name or 'screenshot.png'
+                            trade.screenshot.save(filename, ContentFile(content), save=False)
+                            saved_files.append(trade.screenshot.name)
+                            stats.images += 1
+                    elif record.screenshot:
+                        trade.screenshot.name = record.screenshot  # already in storage
+
+                    trades.append(trade)
+
+                Trade.objects.bulk_create(trades)
+        except Exception:
+            # Page is rolled back, files saved for it are not referenced by anything
+            for name in saved_files:
+                screenshot_field.storage.delete(name)
+            raise
+
+        stats.imported += len(records)
+
+    def run(self) -> ImportStats:
+        checkpoint = self._load_checkpoint()
+        stats = ImportStats(imported=checkpoint.get('imported', 0))
+
+        if checkpoint.get('done'):
+            self.logger.info(f'Import from {self.source.key} is already finished')
+            return stats
+
+        with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+            for rows, next_cursor in self.source.pages(checkpoint.get('cursor')):
+                records = []
+                for row in rows:
+                    try:
+                        records.append(ImportRecord.from_dict(row))
+                    except ValueError as e:
+                        stats.skipped += 1
+                        stats.errors.append(f'{e}: {row}')
+
+                if records:
+                    self._import_page(records, pool, stats)
+                    bump_stats_version(self.account)
+
+                self._save_checkpoint(next_cursor, stats, done=next_cursor is None)
+                self.logger.info(f'Imported {stats.imported} trades from {self.source.key}')
+
+        return stats
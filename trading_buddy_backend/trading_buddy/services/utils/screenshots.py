@@ -0,0 +1,115 @@
+"""
+Compression of uploaded chart screenshots and generation of thumbnails for journal grid.
+Processing runs in a background thread pool after the upload is committed, so requests don't wait for encoding.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from loguru import logger
+from PIL import Image, ImageOps, features
+
+from trading_buddy.models import Trade
+
+_executor = ThreadPoolExecutor(max_workers=settings.SCREENSHOT_WORKERS, thread_name_prefix='screenshots')
+
+
+def _output_format() -> str:
+    # AVIF is smaller, but isn't supported by every Pillow build, so WebP is the fallback
+    if settings.SCREENSHOT_FORMAT == 'AVIF' and features.check('avif'):
+        return 'AVIF'
+    return 'WEBP'
+
+
+def _encode(image: Image.Image, image_format: str, max_width: int) -> bytes:
+    if image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=settings.SCREENSHOT_QUALITY)
+    return buffer.getvalue()
+
+
+def compress_screenshot(content: bytes) -> tuple[bytes, bytes, str]:
+    """
+    :return: Compressed full size image, thumbnail and file extension of both
+    """
+    image_format = _output_format()
+
+    with Image.open(io.BytesIO(content)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        full = _encode(image, image_format, settings.SCREENSHOT_MAX_WIDTH)
+        thumbnail = _encode(image, image_format, settings.SCREENSHOT_THUMBNAIL_WIDTH)
+
+    return full, thumbnail, f'.{image_format.lower()}'
+
+
+def process_screenshot(trade_id: int) -> bool:
+    """
+    Replaces screenshot of trade with compressed version and generates its thumbnail.
+    :return: Whether trade was updated
+    """
+    trade = Trade.objects.filter(pk=trade_id).only('screenshot', 'screenshot_thumbnail').first()
+    if trade is None or not trade.screenshot:
+        return False
+
+    original_name = trade.screenshot.name
+    old_thumbnail_name = trade.screenshot_thumbnail.name or None
+    storage = trade.screenshot.storage
+
+    with trade.screenshot.open('rb') as f:
+        content = f.read()
+
+    full, thumbnail, ext = compress_screenshot(content)
+
+    path = PurePosixPath(original_name)
+    # Original is kept if compression doesn't make it smaller
+    full_name = storage.save(str(path.with_suffix(ext)), ContentFile(full)) if len(full) < len(content) \
+        else original_name
+    thumbnail_name = storage.save(str(path.parent / 'thumbnails' / f'{path.stem}{ext}'), ContentFile(thumbnail))
+
+    # Screenshot could have been replaced while processing, in that case newer upload is processed separately
+    updated = Trade.objects.filter(pk=trade_id, screenshot=original_name).update(
+        screenshot=full_name, screenshot_thumbnail=thumbnail_name
+    )
+
+    if not updated:
+        for name in {full_name, thumbnail_name} - {original_name}:
+            storage.delete(name)
+        return False
+
+    for name in {original_name, old_thumbnail_name} - {full_name, thumbnail_name, None}:
+        storage.delete(name)
+
+    logger.info(f'Processed screenshot of trade {trade_id}: {len(content)} -> {len(full)} bytes, '
+                f'thumbnail {len(thumbnail)} bytes')
+    return True
+
+
+def _process_in_background(trade_id: int):
+    try:
+        process_screenshot(trade_id)
+    except Exception as e:
+        logger.exception(f'Failed to process screenshot of trade {trade_id}: {e}')
+    finally:
+        # Worker threads have their own DB connections, which aren't closed by request cycle
+        connection.close()
+
+
+def schedule_screenshot_processing(trade: Trade):
+    """Queues processing of trade screenshot once current transaction commits"""
+    trade_id = trade.pk
+    transaction.on_commit(lambda: _executor.submit(_process_in_background, trade_id))
+
+
+def release_screenshot_files(*names: str):
+    """Removes files which are no longer referenced, shared files are kept by storage reference counting"""
+    storage = Trade._meta.get_field('screenshot').storage
+    for name in filter(None, set(names)):
+        storage.delete(name)
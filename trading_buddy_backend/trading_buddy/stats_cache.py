@@ -0,0 +1,77 @@
+"""
+Stats only change when trades are closed, edited or removed, so results of User stats methods are cached
+under keys which include per-user and per-account versions. Instead of deleting cached entries, versions are bumped
+on every change of journal data, which makes all previously cached results unreachable at once.
+Versions are nanosecond timestamps rather than counters, so version key which expired or was culled never comes back
+with a value cached results were stored under.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+def _cache():
+    return caches[settings.STATS_CACHE_ALIAS]
+
+
+def _user_version_key(user_id) -> str:
+    return f'stats:version:user:{user_id}'
+
+
+def _account_version_key(account_id) -> str:
+    return f'stats:version:account:{account_id}'
+
+
+def bump_stats_version(account) -> None:
+    """
+    Invalidates cached stats of account and of its owner, call it whenever trades of the account change
+    """
+    if account is None:
+        return
+
+    version = time.time_ns()
+    _cache().set_many({_account_version_key(account.pk): version, _user_version_key(account.user_id): version},
+                      timeout=None)
+
+
+def get_stats_versions(user) -> tuple[int, int]:
+    """
+    :return: Version of user stats and version of stats of user's current account
+    """
+    user_key = _user_version_key(user.pk)
+    account_key = _account_version_key(user.current_account_id)
+    cache = _cache()
+    versions = cache.get_many([user_key, account_key])
+    for key in (user_key, account_key):
+        if key not in versions:
+            # Missing key gets new version, as results cached before it was culled must not be served
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key, 0)
+    return versions[user_key], versions[account_key]
+
+
+def cached_stats(method):
+    """
+    Decorator for User stats methods, caches their results until stats version of user or its current account changes
+    """
+
+    @wraps(method)
+    def wrapper(user, *args, **kwargs):
+        user_version, account_version = get_stats_versions(user)
+        call_repr = repr((args, sorted(kwargs.items()))).encode()
+        key = (f'stats:{method.__name__}:{user.pk}:{user_version}:{user.current_account_id}:{account_version}:'
+               f'{hashlib.md5(call_repr).hexdigest()}')
+
+        cache = _cache()
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = method(user, *args, **kwargs)
+            cache.set(key, result, timeout=settings.STATS_CACHE_TIMEOUT)
+        return result
+
+    return wrapper
@@ -0,0 +1,125 @@
+"""
+Content-addressed storage for chart screenshots.
+Files are named by SHA-256 of their content, so identical uploads are stored once and a name never changes its content,
+which lets web server cache them forever. Since several trades can share a file, which a concurrent upload of the same
+content can start referencing at any moment, files aren't removed on delete, collect_garbage removes ones nothing
+references after a grace period instead.
+"""
+import fcntl
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Q
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = 'cas'
+HASH_CHUNK_SIZE = 64 * 1024
+# Longer than it takes from saving file to committing record which references it
+GARBAGE_GRACE_SECONDS = 60 * 60
+
+
+def content_hash(content) -> str:
+    sha256 = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+def hashed_name(digest: str, ext: str) -> str:
+    # Two levels of fan-out keep directories small
+    return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    # FileField fields and model referencing files of this storage, used for reference counting
+    referencing_fields = (('trading_buddy', 'Trade', ('screenshot', 'screenshot_thumbnail')),)
+
+    def get_available_name(self, name, max_length=None):
+        # Name is derived from content in _save, so there are no collisions to resolve
+        return name
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Lock shared by all processes, saves hold it shared and garbage collection exclusively"""
+        os.makedirs(self.path(CAS_PREFIX), exist_ok=True)
+        with open(self.path(f'{CAS_PREFIX}/.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _save(self, name, content):
+        """Given name is only used for file extension"""
+        name = hashed_name(content_hash(content), os.path.splitext(name)[1])
+        with self._locked(exclusive=False):
+            if self.reuse(name):
+                return name
+            return super()._save(name, content)
+
+    def reuse(self, name) -> bool:
+        """
+        Marks stored file as just used, so it isn't collected before record referencing it is committed
+        :return: Whether file exists
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def is_referenced(self, name) -> bool:
+        for app_label, model_name, fields in self.referencing_fields:
+            model = apps.get_model(app_label, model_name)
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{field: name})
+            if model.objects.filter(condition).exists():
+                return True
+        return False
+
+    def delete(self, name):
+        """
+        Content-addressed files are left to collect_garbage, as identical upload could be referencing it right now.
+        Legacy ones are unique per upload, so they are removed once no record references them.
+        """
+        if name.startswith(f'{CAS_PREFIX}/') or self.is_referenced(name):
+            return
+        super().delete(name)
+
+    def collect_garbage(self, grace_seconds: int = GARBAGE_GRACE_SECONDS) -> int:
+        """
+        Removes content-addressed files which no record references and which weren't saved for grace_seconds
+        :return: Number of removed files
+        """
+        removed = 0
+        cutoff = time.time() - grace_seconds
+        for root, _, files in os.walk(self.path(CAS_PREFIX)):
+            for file in files:
+                path = os.path.join(root, file)
+                name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                if name == f'{CAS_PREFIX}/.lock' or os.path.getmtime(path) > cutoff:
+                    continue
+                # Checked again under lock, as concurrent save could have just reused the file
+                with self._locked(exclusive=True):
+                    if os.path.getmtime(path) <= cutoff and not self.is_referenced(name):
+                        os.remove(path)
+                        removed += 1
+        return removed
+
+
+def get_screenshot_storage():
+    return screenshot_storage
+
+
+# Overwriting only happens when the same content is saved concurrently, so the bytes written are identical
+screenshot_storage = ContentAddressedStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL,
+                                             allow_overwrite=True)
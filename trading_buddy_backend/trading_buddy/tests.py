@@ -1,3 +1,203 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+import bingX
+from bingX import Ticks
+from .benchmarks.fake_bingx import FakeBingX
+from .models import Account, Position, Trade, User
+from .services.exchanges.math_helper import (calc_take_profits_volumes, calculate_position_potential_loss_and_profit,
+                                             size_positions)
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    settings.STATS_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                 'LOCATION': 'tests-stats'},
+    settings.EXCHANGE_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                    'LOCATION': 'tests-exchange'},
+}
+
+TOOLS = 12
+TRADES_PER_ACCOUNT = 60  # more than a page, see TradesResultsSetPagination
+PENDING_POSITIONS = 8
+OPEN_POSITIONS = 4
+
+
+@override_settings(CACHES=LOCMEM_CACHES, QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(TestCase):
+    """
+    Calls every route of QUERY_BUDGETS with journal and positions large enough for query per trade or position
+    to exceed the budget, in which case ProfilingMiddleware raises QueryBudgetExceeded
+    """
+    ROUTES = (
+        'api/v1/journal/trades/',
+        'api/v1/journal/trades/filtered/',
+        'api/v1/journal/investments/',
+        'api/v1/journal/investments/filtered/',
+        'api/v1/trading/positions/pending/',
+        'api/v1/trading/positions/current/',
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeBingX({f'TEST{i}-USDT': Decimal(100 + i) for i in range(TOOLS)}).start()
+        bingX.set_base_url(cls.fake.rest_url)
+
+    @classmethod
+    def tearDownClass(cls):
+        bingX.set_base_url(settings.BINGX_REST_URL)
+        cls.fake.stop()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='budget', email='budget@example.com', password='budget',
+                                            deposit=Decimal(10000))
+        cls.account = Account.objects.create(user=cls.user, name='Main', exchange=Account.Exchange.BINGX,
+                                             api_key='budget-key', secret_key='budget-secret')
+        other = Account.objects.create(user=cls.user, name='Other', exchange=Account.Exchange.BINGX,
+                                       api_key='budget-other-key', secret_key='budget-secret')
+        investing = Account.objects.create(user=cls.user, name='Investing', exchange=Account.Exchange.INVESTING,
+                                           api_key='', secret_key='')
+        cls.user.current_account = cls.account
+        cls.user.save(update_fields=['current_account'])
+
+        now = timezone.now()
+        for account in (cls.account, other, investing):
+            for i in range(TRADES_PER_ACCOUNT):
+                trade = Trade.create_trade('LONG', account, f'TEST{i % TOOLS}-USDT', Decimal(1), Decimal(10), 10,
+                                           Decimal(0), Decimal(100), Decimal(98), [Decimal(104), Decimal(106)], 1,
+                                           None, Decimal('0.5'), now - timedelta(days=i))
+                # Closed trades have no position left
+                Trade.objects.filter(pk=trade.pk).update(end_time=now - timedelta(days=i, hours=-1),
+                                                         pnl_usd=Decimal(15) if i % 3 else Decimal(-10))
+                trade.position.delete()
+
+        positions = {}
+        for i in range(PENDING_POSITIONS + OPEN_POSITIONS):
+            tool_name = f'TEST{i}-USDT'
+            trade = Trade.create_trade('LONG', cls.account, tool_name, Decimal(1), Decimal(10), 10, Decimal(0),
+                                       Decimal(100 + i), Decimal(98 + i), [Decimal(104 + i)], 1, None,
+                                       Decimal('0.5'), now)
+            if i >= PENDING_POSITIONS:
+                Position.objects.filter(trade=trade).update(last_status='FILLED', current_volume=Decimal('0.5'),
+                                                            max_held_volume=Decimal('0.5'))
+                positions[tool_name] = {
+                    'symbol': tool_name, 'positionId': str(i), 'positionSide': 'LONG', 'positionAmt': '0.5',
+                    'availableAmt': '0.5', 'avgPrice': str(100 + i), 'markPrice': str(100 + i), 'leverage': 10,
+                    'margin': '5', 'unrealizedProfit': '1.5', 'realisedProfit': '0', 'initialMargin': '5',
+                }
+        cls.exchange_positions = positions
+
+    def setUp(self):
+        self.fake.positions['budget-key'] = dict(self.exchange_positions)
+        self.client.force_login(self.user)
+
+    def test_every_budgeted_route_is_called(self):
+        self.assertEqual(set(self.ROUTES), set(settings.QUERY_BUDGETS))
+
+    def test_journal_within_budget(self):
+        for route in self.ROUTES[:4]:
+            with self.subTest(route=route):
+                response = self.client.get(f'/{route}')
+                self.assertEqual(response.status_code, 200, response.content)
+
+        response = self.client.get('/api/v1/journal/trades/filtered/')
+        self.assertEqual(len(response.json()['trades']), 2 * TRADES_PER_ACCOUNT + PENDING_POSITIONS + OPEN_POSITIONS)
+        response = self.client.get('/api/v1/journal/investments/')
+        self.assertEqual(response.json()['count'], TRADES_PER_ACCOUNT)
+
+    def test_pending_positions_within_budget(self):
+        response = self.client.get('/api/v1/trading/positions/pending/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.json()), PENDING_POSITIONS)
+        self.assertTrue(all(position['last_price'] is not None for position in response.json()))
+
+    def test_current_positions_within_budget(self):
+        response = self.client.get('/api/v1/trading/positions/current/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.json()), OPEN_POSITIONS)
+
+
+class TicksTests(SimpleTestCase):
+    def test_parse_keeps_digits_after_decimal_point(self):
+        self.assertEqual((Ticks.parse('1.830').value, Ticks.parse('1.830').scale), (1830, 3))
+        self.assertEqual((Ticks.parse(Decimal('1E+2')).value, Ticks.parse(Decimal('1E+2')).scale), (100, 0))
+        self.assertEqual((Ticks.parse(-7).value, Ticks.parse(-7).scale), (-7, 0))
+        with self.assertRaises(TypeError):
+            Ticks.parse(1.5)
+        with self.assertRaises(ValueError):
+            Ticks.parse('NaN')
+
+    def test_from_decimal_rounds(self):
+        self.assertEqual(Ticks.from_decimal('1.839', 2).value, 183)
+        self.assertEqual(Ticks.from_decimal('-1.839', 2).value, -183)
+        self.assertEqual(Ticks.from_decimal('1.835', 2, ROUND_HALF_UP).value, 184)
+        self.assertEqual(Ticks.from_decimal(Ticks(1839, 3), 2).value, 183)
+
+    def test_rescale(self):
+        self.assertEqual(Ticks(-1839, 3).rescale(2).value, -183)
+        self.assertEqual(Ticks(-1839, 3).rescale(2, ROUND_HALF_UP).value, -184)
+        self.assertEqual(Ticks(-1839, 3).rescale(4).value, -18390)
+
+    def test_str_and_normalize(self):
+        self.assertEqual(str(Ticks(5, 3)), '0.005')
+        self.assertEqual(str(Ticks(-5, 3)), '-0.005')
+        self.assertEqual(str(Ticks(1500, 3)), '1.500')
+        self.assertEqual(str(Ticks(1500, 3).normalize()), '1.5')
+        self.assertEqual(str(Ticks(100, 0).normalize()), '100')
+
+    def test_arithmetic_is_exact(self):
+        self.assertEqual(str(Ticks(183, 2) + Decimal('0.001')), '1.831')
+        self.assertEqual(str(Ticks(183, 2) * Ticks(3, 1)), '0.549')
+        self.assertEqual(Ticks(150, 2), Decimal('1.5'))
+        self.assertEqual(hash(Ticks(150, 2)), hash(Ticks(15, 1)))
+        self.assertLess(Ticks(1829, 3), Decimal('1.83'))
+
+
+class TakeProfitVolumesTests(SimpleTestCase):
+    def test_remaining_volume_goes_to_last_take_profit_when_negative(self):
+        self.assertEqual([str(v) for v in calc_take_profits_volumes(Decimal('10.1'), 1, 3)], ['3.4', '3.4', '3.3'])
+
+    def test_remaining_volume_goes_to_first_take_profit_when_positive(self):
+        self.assertEqual([str(v) for v in calc_take_profits_volumes(Decimal('10.1'), 1, 2)], ['5.1', '5.0'])
+
+    def test_volume_finer_than_quantity_precision(self):
+        self.assertEqual([str(v) for v in calc_take_profits_volumes(Decimal('1.005'), 2, 2)], ['0.50', '0.50'])
+
+    def test_single_and_no_take_profits(self):
+        self.assertEqual([str(v) for v in calc_take_profits_volumes(Decimal(7), 0, 1)], ['7'])
+        self.assertEqual(calc_take_profits_volumes(Decimal(7), 0, 0), [])
+
+
+class SizePositionsTests(SimpleTestCase):
+    def test_volume_from_risk(self):
+        sizes = size_positions([Decimal('1.83'), Decimal(100), Decimal(100)],
+                               [Decimal('1.8'), Decimal(102), Decimal(100)],
+                               [10, 5, 5], [[Decimal('1.9')], [Decimal(95), Decimal(90)], []], 1,
+                               deposit=Decimal(1000), risk=Decimal(1), available_margin=Decimal(500))
+        self.assertEqual(sizes.rows(), [
+            {'volume': Decimal('333.3'), 'margin': Decimal('60.99'), 'potential_loss': Decimal('9.99'),
+             'potential_profit': Decimal('23.33')},
+            {'volume': Decimal('5.0'), 'margin': Decimal('100.00'), 'potential_loss': Decimal('10.00'),
+             'potential_profit': Decimal('37.50')},
+            # Entry equal to stop
+            {'volume': Decimal('0.0'), 'margin': Decimal('0.00'), 'potential_loss': Decimal('0.00'),
+             'potential_profit': Decimal('0.00')},
+        ])
+        self.assertEqual(str(sizes.volume_ticks(0)), '333.3')
+
+    def test_volume_capped_by_available_margin(self):
+        sizes = size_positions([Decimal('1.83')], [Decimal('1.8')], [10], [[Decimal('1.9')]], 1,
+                               deposit=Decimal(1000), risk=Decimal(1), available_margin=Decimal(50))
+        self.assertEqual(sizes.row(0), {'volume': Decimal('273.2'), 'margin': Decimal('50.00'),
+                                        'potential_loss': Decimal('8.19'), 'potential_profit': Decimal('19.12')})
+
+    def test_given_volume(self):
+        self.assertEqual(calculate_position_potential_loss_and_profit(Decimal(100), Decimal(98),
+                                                                      [Decimal(104), Decimal(106)], Decimal('0.5'), 1),
+                         (Decimal('1.00'), Decimal('2.40')))
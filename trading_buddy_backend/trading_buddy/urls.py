@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -9,6 +10,10 @@ class GoogleLogin(SocialLoginView):
     adapter_class = GoogleOAuth2Adapter
 
 
+# In ASGI mode exchange-bound endpoints are served by async views, so waiting for exchange doesn't block the worker
+ASYNC_VIEWS = settings.SERVER_MODE == 'asgi'
+
+
 urlpatterns = [
     ##### AUTH AND USER #####
     path('auth/register/', views.register),  # POST
@@ -20,13 +25,22 @@ urlpatterns = [
 
     ##### ACCOUNT(S) #####
     path('accounts/api/', views.update_account_api_keys),  # PUT
-    path('account/details/', views.get_deposit_and_account_details),  # GET
+    path('account/details/', views.aget_deposit_and_account_details if ASYNC_VIEWS else views.get_deposit_and_account_details),  # GET
     path('accounts/delete/<str:account_name>/', views.delete_account),  # DELETE
     path('accounts/<str:account_name>/risk-percent/', views.update_risk_for_account),  # PUT
     path('accounts/<str:account_name>/', views.set_current_account),  # POST
     path('accounts/', views.user_accounts),  # GET, POST
 
     ##### STATS #####
+    path('stats/dashboard/', views.get_stats_dashboard),  # GET
+    path('stats/analytics/', views.get_journal_analytics),  # GET
+    path('stats/analytics/breakdown/', views.get_journal_analytics_breakdown),  # GET
+    path('stats/analytics/equity/', views.get_equity_curve),  # GET
+    path('stats/setups/performance/', views.get_setup_performance),  # GET
+    path('stats/replay/', views.replay_trades),  # GET
+    path('stats/replay/sweep/', views.sweep_trade_rules),  # POST
+    path('stats/replay/sweep/<str:job_id>/', views.get_rule_sweep),  # GET
+
     # All accounts
     path('stats/pnl-calendar/all/<int:year>/<int:month>/', views.pnl_calendar_all),  # GET
     path('stats/pnl/total/', views.total_pnl_all),  # GET
@@ -44,11 +58,13 @@ urlpatterns = [
     # GET, under all accounts, pagination query params are used, check views.py
     path('journal/trades/', views.get_all_trades),
     path('journal/trades/filtered/', views.get_filtered_trades),  # GET
+    path('journal/trades/export/', views.export_trades),  # GET, ?file_format=csv|parquet + filters
 
     path('journal/trades/<int:trade_id>/', views.journal_trade),  # PUT, DELETE
 
     path('journal/investments/', views.get_all_investments),
     path('journal/investments/filtered/', views.get_filtered_investments),  # GET
+    path('journal/investments/export/', views.export_investments),  # GET, ?file_format=csv|parquet + filters
     path('journal/investments/<int:trade_id>/', views.journal_trade),  # PUT, DELETE
 
     path('journal/investments/create/', views.create_investment),  # POST
@@ -59,15 +75,20 @@ urlpatterns = [
 
     # Tools under specific account
     path('account/tools/', views.manage_tools),  # GET, POST
+    path('account/tools/market-data/', views.get_tools_market_data),  # GET
     path('account/tools/<str:tool_name>/', views.remove_tool),  # DELETE
 
     ##### TRADING under specific account #####
-    path('trading/tools/<str:tool_name>/leverages/', views.get_max_leverages),  # GET
-    path('trading/positions/process/', views.process_position_data),  # POST
+    path('trading/tools/<str:tool_name>/leverages/', views.aget_max_leverages if ASYNC_VIEWS else views.get_max_leverages),  # GET
+    path('trading/positions/process/', views.aprocess_position_data if ASYNC_VIEWS else views.process_position_data),  # POST
+    path('trading/positions/process/batch/',
+         views.aprocess_positions_batch if ASYNC_VIEWS else views.process_positions_batch),  # POST
+    path('trading/positions/process/grid/',
+         views.aprocess_position_grid if ASYNC_VIEWS else views.process_position_grid),  # POST
     path('trading/positions/place/', views.place_position),  # POST
     path('trading/positions/cancel/', views.cancel_position),  # POST
     path('trading/positions/close-by-market/', views.close_position_by_market),  # POST
     path('trading/positions/pending/cancel-levels/<str:tool_name>/', views.update_cancel_levels),  # PUT
     path('trading/positions/pending/', views.get_pending_positions),  # GET
-    path('trading/positions/current/', views.get_current_positions),  # GET
+    path('trading/positions/current/', views.aget_current_positions if ASYNC_VIEWS else views.get_current_positions),  # GET
 ]
@@ -4,6 +4,7 @@ from .account import *
 from .journal import *
 from .stats import *
 from .trading import *
+from .metrics import *
 from ..services.exchanges.pollers import init_poller
 from loguru import logger
 
@@ -1,3 +1,5 @@
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
@@ -8,8 +10,9 @@ from rest_framework.status import HTTP_400_BAD_REQUEST
 
 from trading_buddy.models import Account, Tool
 from trading_buddy.serializers import AccountSerializer, DepositAndAccountDataSerializer, RiskSerializer, \
-    DepositSerializer, ToolSerializer, AccountAPISerializer
+    DepositSerializer, ToolSerializer, AccountAPISerializer, ToolMarketDataSerializer
 from trading_buddy.services.exchanges.exchanges import BingXExc
+from trading_buddy.stats_cache import bump_stats_version
 
 # Exchanges map
 exc_map = {
@@ -93,6 +96,7 @@ def update_account_api_keys(request):
 def delete_account(request, account_name):
     account = get_object_or_404(Account, name=account_name, user=request.user)
     account.delete()
+    bump_stats_version(account)  # its trades are detached from user, so they no longer count in stats
     return Response({"message": "Account deleted successfully."}, status=200)
 
 
@@ -142,6 +146,36 @@ def get_deposit_and_account_details(request):
         return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Async version for ASGI mode, see urls.py
+@extend_schema(
+    responses=DepositAndAccountDataSerializer
+)
+@async_api_view(['GET'])
+async def aget_deposit_and_account_details(request):
+    account = await request.user.aget_current_account()
+    if not account:
+        return Response({"error": "No account is chosen as current "}, status=400)
+
+    exc = await sync_to_async(exc_map[account.exchange])(account)
+
+    success, msg, deposit, risk_percent, pnl, available_margin = await exc.aget_account_details()
+
+    if success:
+        serializer = DepositAndAccountDataSerializer(data={
+            "deposit": deposit,
+            "risk_percent": risk_percent,
+            "available_margin": available_margin,
+            "pnl_usd": pnl,
+        })
+
+        if serializer.is_valid():
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        else:
+            return Response({"error": "".join(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @extend_schema(
     request=RiskSerializer,
 )
@@ -219,6 +253,30 @@ def manage_tools(request):
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Market data of tools under current account, taken from market snapshot, so it costs no per-tool exchange requests
+@extend_schema(
+    responses=ToolMarketDataSerializer(many=True),
+)
+@api_view(['GET'])
+def get_tools_market_data(request):
+    account = request.user.current_account
+
+    if account is None:
+        return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+    tool_names = list(account.tools.order_by('name').values_list('name', flat=True))
+    exc = exc_map[account.exchange](account)
+    snapshot = exc.get_market_snapshot(set(tool_names))
+
+    rows = []
+    for tool_name in tool_names:
+        market_data = snapshot.get(tool_name)
+        if market_data is not None:
+            rows.append({'tool': tool_name, **market_data})
+
+    return Response(ToolMarketDataSerializer(rows, many=True).data, status=status.HTTP_200_OK)
+
+
 # Remove tool
 @api_view(['DELETE'])
 def remove_tool(request, account_name, tool_name):
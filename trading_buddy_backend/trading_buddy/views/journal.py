@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db.models import OuterRef, Count, Subquery, Case, When, IntegerField
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from loguru import logger
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
@@ -10,6 +13,10 @@ from rest_framework.decorators import api_view
 from trading_buddy.filters import TradeFilters
 from trading_buddy.models import Trade
 from trading_buddy.serializers import ShowTradeSerializer, UpdateTradeSerializer, CreateInvestmentSerializer
+from trading_buddy.services.utils.journal_export import EXPORT_FORMATS, aiter_export, iter_export_rows, \
+    parquet_available, stream_export
+from trading_buddy.services.utils.screenshots import schedule_screenshot_processing, release_screenshot_files
+from trading_buddy.stats_cache import bump_stats_version
 
 
 class TradesResultsSetPagination(PageNumberPagination):
@@ -52,6 +59,7 @@ def get_all_trades(request):
     trades = (
         Trade.objects.filter(account__user=request.user).exclude(account__exchange='Investing')
         .annotate(trade_number=Subquery(get_trade_number_subquery(request.user)))
+        .select_related('account', 'tool')
         .order_by('-pk')
     )
     paginator = TradesResultsSetPagination()
@@ -67,6 +75,8 @@ def get_filtered_trades(request):
         trades = (
             request.user.get_filtered_trades(filters)
             .annotate(trade_number=Subquery(get_trade_number_subquery(request.user)))
+            # ShowTradeSerializer shows account and tool names of every trade
+            .select_related('account', 'tool')
         )
         stats = get_trade_stats(trades)
         serializer = ShowTradeSerializer(trades, many=True, context={'request': request})
@@ -82,6 +92,7 @@ def get_all_investments(request):
     trades = (
         Trade.objects.filter(account__user=request.user, account__exchange='Investing')
         .annotate(trade_number=Subquery(get_trade_number_subquery(request.user)))
+        .select_related('account', 'tool')
         .order_by('-pk')
     )
     paginator = TradesResultsSetPagination()
@@ -97,6 +108,8 @@ def get_filtered_investments(request):
         trades = (
             request.user.get_filtered_trades(filters, investing=True)
             .annotate(trade_number=Subquery(get_trade_number_subquery(request.user)))
+            # ShowTradeSerializer shows account and tool names of every trade
+            .select_related('account', 'tool')
         )
         stats = get_trade_stats(trades)
         serializer = ShowTradeSerializer(trades, many=True, context={'request': request})
@@ -106,6 +119,52 @@ def get_filtered_investments(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def export_trades_response(request, investing=False):
+    # `format` query param is reserved by DRF for content negotiation
+    file_format = request.query_params.get('file_format', 'csv').lower()
+    if file_format not in EXPORT_FORMATS:
+        return Response({'error': f'Unknown export format, choose one of: {", ".join(EXPORT_FORMATS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if file_format == 'parquet' and not parquet_available():
+        return Response({'error': 'Parquet export is not available on this server'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        filters = TradeFilters.from_request(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    content_type, extension = EXPORT_FORMATS[file_format]
+    rows = iter_export_rows(request.user, filters, investing=investing)
+    filename = f"{'investments' if investing else 'trades'}.{extension}"
+    chunks = stream_export(file_format, rows)
+
+    return StreamingHttpResponse(
+        aiter_export(chunks) if settings.SERVER_MODE == 'asgi' else chunks,
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+export_parameters = [
+    OpenApiParameter('file_format', OpenApiTypes.STR, enum=list(EXPORT_FORMATS), default='csv'),
+]
+
+
+@extend_schema(parameters=export_parameters, responses={(200, 'application/octet-stream'): OpenApiTypes.BINARY})
+@api_view(['GET'])
+def export_trades(request):
+    """Accepts the same filters as journal filtering, whole journal is exported if none are given"""
+    return export_trades_response(request)
+
+
+@extend_schema(parameters=export_parameters, responses={(200, 'application/octet-stream'): OpenApiTypes.BINARY})
+@api_view(['GET'])
+def export_investments(request):
+    """Accepts the same filters as journal filtering, all investments are exported if none are given"""
+    return export_trades_response(request, investing=True)
+
+
 @extend_schema(
     request=UpdateTradeSerializer
 )
@@ -119,7 +178,15 @@ def journal_trade(request, trade_id):
         serializer = UpdateTradeSerializer(trade, data=request.data, partial=True)
 
         if serializer.is_valid():
-            serializer.save()  # saves updated fields including the image
+            if serializer.validated_data.get('screenshot'):
+                old_files = (trade.screenshot.name, trade.screenshot_thumbnail.name)
+                # Thumbnail of previous screenshot is dropped, new one is generated in background
+                serializer.save(screenshot_thumbnail=None)
+                release_screenshot_files(*old_files)
+                schedule_screenshot_processing(trade)
+            else:
+                serializer.save()  # saves updated fields including the image
+            bump_stats_version(trade.account)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -130,6 +197,8 @@ def journal_trade(request, trade_id):
                 status=status.HTTP_400_BAD_REQUEST)
         else:
             trade.delete()
+            release_screenshot_files(trade.screenshot.name, trade.screenshot_thumbnail.name)
+            bump_stats_version(trade.account)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     return Response({"error": "Method not allowed."}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -141,5 +210,6 @@ def create_investment(request):
     serializer = CreateInvestmentSerializer(data=request.data)
     if serializer.is_valid():
         trade = serializer.save()
+        bump_stats_version(trade.account)
         return Response({'id': trade.id}, status=status.HTTP_201_CREATED)
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
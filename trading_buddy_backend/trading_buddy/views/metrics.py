@@ -0,0 +1,11 @@
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from trading_buddy.services import metrics
+
+
+@require_GET
+def export_metrics(request):
+    """Prometheus scrape endpoint, it's outside of /api/, so Nginx doesn't expose it and only scrapers can reach it"""
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
@@ -1,11 +1,21 @@
+import hashlib
+import json
+
+from django.utils import timezone
+from django.utils.http import quote_etag
 from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
 from trading_buddy.serializers import PnLCalendarSerializer, YearMonthQuerySerializer, ToolsWithWinratesSerializer, \
-    PnLProgressionSerializer
+    PnLProgressionSerializer, StatsDashboardSerializer, AnalyticsSerializer, AnalyticsBreakdownSerializer, \
+    EquityPointSerializer, SetupPerformanceSerializer, ReplaySerializer, RuleSweepSerializer, RuleSweepJobSerializer
+from trading_buddy.filters import TradeFilters
+from trading_buddy.services.analytics import sweep_jobs
+from trading_buddy.services.analytics.kline_store import INTERVALS_MS
+from trading_buddy.services.analytics.rule_sweep import build_rule_sets
 
 
 @extend_schema(responses=PnLCalendarSerializer)
@@ -99,4 +109,134 @@ def get_pnl_progression_over_days(request):  # Fixed function name
     user = request.user
     progression_data = user.get_pnl_progression_over_days()
     serializer = PnLProgressionSerializer(progression_data, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response(serializer.data)
+
+
+@extend_schema(
+    parameters=[YearMonthQuerySerializer],
+    responses=StatsDashboardSerializer
+)
+@api_view(['GET'])
+def get_stats_dashboard(request):
+    """All stats page data in one response, month specific values are for given year/month or current one"""
+    query_serializer = YearMonthQuerySerializer(data=request.query_params)
+    if not query_serializer.is_valid():
+        return Response({"error": query_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    year = query_serializer.validated_data.get('year', now.year)
+    month = query_serializer.validated_data.get('month', now.month)
+
+    dashboard, error = request.user.get_stats_dashboard(year, month)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = StatsDashboardSerializer(dashboard).data
+
+    # Stats page is reloaded often while the data rarely changes, so let browser revalidate instead of re-downloading
+    etag = quote_etag(hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest())
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    return Response(data, headers={'ETag': etag})
+
+
+##### ANALYTICS #####
+# All three endpoints are served from the same cached analytics computation
+@extend_schema(responses=AnalyticsSerializer)
+@api_view(['GET'])
+def get_journal_analytics(request):
+    analytics = request.user.get_journal_analytics()
+    serializer = AnalyticsSerializer(analytics)
+    return Response(serializer.data)
+
+
+@extend_schema(responses=AnalyticsBreakdownSerializer)
+@api_view(['GET'])
+def get_journal_analytics_breakdown(request):
+    analytics = request.user.get_journal_analytics()
+    serializer = AnalyticsBreakdownSerializer(analytics)
+    return Response(serializer.data)
+
+
+@extend_schema(responses=EquityPointSerializer(many=True))
+@api_view(['GET'])
+def get_equity_curve(request):
+    analytics = request.user.get_journal_analytics()
+    serializer = EquityPointSerializer(analytics['equity_curve'], many=True)
+    return Response(serializer.data)
+
+
+@extend_schema(responses=SetupPerformanceSerializer(many=True))
+@api_view(['GET'])
+def get_setup_performance(request):
+    """Accepts the same filters as journal filtering"""
+    try:
+        filters = TradeFilters.from_request(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = request.user.get_setup_performance(filters)
+    serializer = SetupPerformanceSerializer(rows, many=True)
+    return Response(serializer.data)
+
+
+@extend_schema(
+    parameters=[OpenApiParameter('interval', OpenApiTypes.STR, enum=list(INTERVALS_MS),
+                                 description='Candles trades are replayed on, they have to be synced with sync_klines')],
+    responses=ReplaySerializer,
+)
+@api_view(['GET'])
+def replay_trades(request):
+    """
+    Replays position management rules over stored candles for journaled trades which have their plan stored.
+    Accepts the same filters as journal filtering
+    """
+    try:
+        filters = TradeFilters.from_request(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    interval = request.query_params.get('interval') or None
+    if interval is not None and interval not in INTERVALS_MS:
+        return Response({"error": f"Unsupported interval: {interval}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = request.user.replay_trades(filters, interval)
+    serializer = ReplaySerializer({'summary': result.summary(), 'trades': result.to_rows()})
+    return Response(serializer.data)
+
+
+@extend_schema(request=RuleSweepSerializer, responses={202: RuleSweepJobSerializer})
+@api_view(['POST'])
+def sweep_trade_rules(request):
+    """
+    Queues replay of journaled trades with every combination of given rule values, combinations ranked by outcome
+    are returned by get_rule_sweep once it's done. Accepts the same filters as journal filtering in query parameters
+    """
+    try:
+        filters = TradeFilters.from_request(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = RuleSweepSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    rule_sets = build_rule_sets(data['move_stop_after'], data['move_stop_after_rr'], data['num_take_profits'],
+                                data['cancel_over_r'], data['cancel_take_r'])
+    try:
+        job = sweep_jobs.submit(request.user, rule_sets, filters, data.get('interval'), data['order_by'],
+                                data['limit'])
+    except sweep_jobs.SweepQueueFull as e:
+        return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    return Response(RuleSweepJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema(responses=RuleSweepJobSerializer)
+@api_view(['GET'])
+def get_rule_sweep(request, job_id):
+    job = sweep_jobs.get(job_id, request.user)
+    if job is None:
+        return Response({"error": "Sweep not found, it could have expired"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(RuleSweepJobSerializer(job).data)
@@ -1,3 +1,5 @@
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.decorators import api_view
@@ -6,7 +8,7 @@ from rest_framework.status import HTTP_400_BAD_REQUEST
 
 from trading_buddy.serializers import MaxLeveragesSerializer, PositionToOpenSerializer, \
     ProcessedPositionToOpenSerializer, CancelLevelsSerializer, ToolExchangeFormatSerializer, PendingPositionSerializer, \
-    CurrentPositionSerializer
+    CurrentPositionSerializer, PositionScenariosSerializer, PositionGridSerializer, PositionGridCellSerializer
 from trading_buddy.services.exchanges.exchanges import BingXExc, ByBitExc
 
 # Exchanges map
@@ -57,31 +59,166 @@ def process_position_data(request):
         return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
 
     exc = exc_map[account.exchange](account)
+    success, msg, results = exc.preview_positions(data['tool'], [data])
 
-    volume = data.get('volume')
-    if volume is not None:
-        margin = exc.calc_position_margin(data['entry_p'], volume, data['leverage'])
-    else:
-        volume, margin = exc.calc_position_volume_and_margin(
-            data['tool'], data['entry_p'], data['stop_p'], data['leverage']
-        )
-
-    loss, profit = exc.calculate_position_potential_loss_and_profit(
-        data['tool'], data['entry_p'], data['stop_p'], data['take_profits'], volume
-    )
-
-    result_data = {
-        "volume": str(volume),
-        "margin": str(margin),
-        "potential_loss": str(loss),
-        "potential_profit": str(profit),
-    }
-
-    result_serializer = ProcessedPositionToOpenSerializer(data=result_data)
+    return _processed_positions_response(success, msg, results[0] if success else None)
+
+
+# Same as above for several scenarios of position on one tool, exchange data is fetched once for all of them
+@extend_schema(
+    request=PositionScenariosSerializer,
+    responses=ProcessedPositionToOpenSerializer(many=True),
+)
+@api_view(['POST'])
+def process_positions_batch(request):
+    serializer = PositionScenariosSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    account = request.user.current_account
+    if account is None:
+        return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+    exc = exc_map[account.exchange](account)
+    success, msg, results = exc.preview_positions(data['tool'], data['scenarios'])
+
+    return _processed_positions_response(success, msg, results)
+
+
+# Sizing of every combination of entry, stop and leverage ranges, for risk heatmap of position form
+@extend_schema(
+    request=PositionGridSerializer,
+    responses=PositionGridCellSerializer(many=True),
+)
+@api_view(['POST'])
+def process_position_grid(request):
+    serializer = PositionGridSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    account = request.user.current_account
+    if account is None:
+        return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+    exc = exc_map[account.exchange](account)
+    success, msg, cells = exc.preview_position_grid(data['tool'], data['entry'], data['stop'], data['leverage'],
+                                                    data['take_profits'])
+
+    if not success:
+        return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response(PositionGridCellSerializer(cells, many=True).data, status=status.HTTP_200_OK)
+
+
+def _processed_positions_response(success: bool, msg: str, results: dict | list[dict] | None) -> Response:
+    if not success:
+        return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    many = isinstance(results, list)
+    rows = results if many else [results]
+    result_data = [{key: str(value) for key, value in row.items()} for row in rows]
+
+    result_serializer = ProcessedPositionToOpenSerializer(data=result_data if many else result_data[0], many=many)
     if result_serializer.is_valid():
         return Response(result_serializer.data, status=status.HTTP_200_OK)
 
-    return Response({"error": "".join(result_serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+    # Error is string of invalid field names, as it was before batch preview
+    errors = [field for row_errors in result_serializer.errors for field in row_errors] if many \
+        else result_serializer.errors
+    return Response({"error": "".join(errors)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Async versions of exchange-bound views, which are used in ASGI mode, see urls.py.
+# While they wait for exchange, event loop serves other requests instead of the whole worker being blocked
+@extend_schema(
+    responses=MaxLeveragesSerializer
+)
+@async_api_view(['GET'])
+async def aget_max_leverages(request, tool_name):
+    """Tool name must be in appropriate exchange format"""
+    account = await request.user.aget_current_account()
+    if not account:
+        return Response({"error": "No account is chosen as current "}, status=400)
+
+    exc = await sync_to_async(exc_map[account.exchange])(account)
+    success, msg, max_long, max_short = await exc.aget_max_leverage(tool_name)
+
+    if success:
+        serializer = MaxLeveragesSerializer(data={'max_long_leverage': max_long, 'max_short_leverage': max_short})
+
+        if serializer.is_valid():
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        else:
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@extend_schema(
+    request=PositionToOpenSerializer,
+    responses=ProcessedPositionToOpenSerializer,
+)
+@async_api_view(['POST'])
+async def aprocess_position_data(request):
+    serializer = PositionToOpenSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    account = await request.user.aget_current_account()
+    if account is None:
+        return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+    exc = await sync_to_async(exc_map[account.exchange])(account)
+    success, msg, results = await exc.apreview_positions(data['tool'], [data])
+
+    return _processed_positions_response(success, msg, results[0] if success else None)
+
+
+@extend_schema(
+    request=PositionScenariosSerializer,
+    responses=ProcessedPositionToOpenSerializer(many=True),
+)
+@async_api_view(['POST'])
+async def aprocess_positions_batch(request):
+    serializer = PositionScenariosSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    account = await request.user.aget_current_account()
+    if account is None:
+        return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+    exc = await sync_to_async(exc_map[account.exchange])(account)
+    success, msg, results = await exc.apreview_positions(data['tool'], data['scenarios'])
+
+    return _processed_positions_response(success, msg, results)
+
+
+@extend_schema(
+    request=PositionGridSerializer,
+    responses=PositionGridCellSerializer(many=True),
+)
+@async_api_view(['POST'])
+async def aprocess_position_grid(request):
+    serializer = PositionGridSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    account = await request.user.aget_current_account()
+    if account is None:
+        return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+    exc = await sync_to_async(exc_map[account.exchange])(account)
+    success, msg, cells = await exc.apreview_position_grid(data['tool'], data['entry'], data['stop'],
+                                                           data['leverage'], data['take_profits'])
+
+    if not success:
+        return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response(PositionGridCellSerializer(cells, many=True).data, status=status.HTTP_200_OK)
 
 
 # Placing position
@@ -248,3 +385,26 @@ def get_current_positions(request):
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
     return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
+
+
+@extend_schema(
+    responses=CurrentPositionSerializer(many=True)
+)
+@async_api_view(['GET'])
+async def aget_current_positions(request):
+    account = await request.user.aget_current_account()
+
+    if account:
+        exc = await sync_to_async(exc_map[account.exchange])(account)
+        success, msg, pending_data = await exc.aget_current_positions_info()  # list of dicts
+
+        if success:
+            serializer = CurrentPositionSerializer(data=pending_data, many=True, context={'exchange': account.exchange})
+            if serializer.is_valid():
+                return Response(serializer.data, status=status.HTTP_200_OK)
+        else:
+            return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"error": "No account is chosen as current."}, status=HTTP_400_BAD_REQUEST)
@@ -47,6 +47,13 @@ setup_loguru()
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded screenshots are re-encoded and thumbnailed in background, see trading_buddy/services/utils/screenshots.py
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'WEBP').upper()  # WEBP or AVIF
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 80))
+SCREENSHOT_MAX_WIDTH = 2560
+SCREENSHOT_THUMBNAIL_WIDTH = 480
+SCREENSHOT_WORKERS = int(os.getenv('SCREENSHOT_WORKERS', 2))
+
 sys.path.insert(0, PROJECT_ROOT_DIR)
 
 # Quick-start development settings - unsuitable for production
@@ -107,6 +114,8 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'trading_buddy.middleware.TracingMiddleware',
+    'trading_buddy.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -145,10 +154,27 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'trading_buddy_backend.wsgi.application'
+ASGI_APPLICATION = 'trading_buddy_backend.asgi.application'
+
+# wsgi or asgi, in asgi mode exchange-bound endpoints are served by async views, see gunicorn.conf.py
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are reused instead of being opened for every request or poller/listener iteration.
+# By default persistent connections are used, each process/thread keeps its own one for CONN_MAX_AGE seconds
+# and checks it's alive before reuse. With DB_POOL=true connections are taken from psycopg3 pool instead,
+# which requires `backend[pool]` extra to be installed.
+# Under ASGI every request runs ORM calls in its own thread, so persistent connections would be left open by those
+# threads, Django advises to disable them there, which DB_POOL=true makes up for.
+DB_POOL = os.getenv('DB_POOL', 'false').lower() == 'true'
+if DB_POOL or SERVER_MODE == 'asgi':
+    # Pool manages connection lifetime by itself, so Django requires CONN_MAX_AGE to be 0 with it
+    CONN_MAX_AGE = 0
+else:
+    CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 600))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -157,9 +183,122 @@ DATABASES = {
         'PASSWORD': os.getenv("DB_PASSWORD"),
         'HOST': os.getenv("DB_HOST", 'localhost'),
         'PORT': '5432',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'timeout': 10,
+            },
+        } if DB_POOL else {},
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Stats cache is invalidated from poller and listeners processes as well, so by default file based cache is used,
+# which is shared between processes via common directory. Set STATS_CACHE_BACKEND=locmem for single process setups.
+STATS_CACHE_ALIAS = 'stats'
+STATS_CACHE_TIMEOUT = int(os.getenv("STATS_CACHE_TIMEOUT", 60 * 60))
+STATS_CACHE_DIR = os.getenv("STATS_CACHE_DIR", str(BASE_DIR / 'cache' / 'stats'))
+
+# Exchange data cache (balances) is shared between processes in the same way, as listeners push updates into it
+EXCHANGE_CACHE_ALIAS = 'exchange'
+EXCHANGE_CACHE_DIR = os.getenv("EXCHANGE_CACHE_DIR", str(BASE_DIR / 'cache' / 'exchange'))
+# Seconds exchange balance is reused, frontend polls account details and previews position on every form change
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", 3))
+# Seconds balance is reused while user data stream of account is connected, as then exchange pushes balance changes
+BALANCE_STREAM_MAX_AGE = float(os.getenv("BALANCE_STREAM_MAX_AGE", 30))
+# BingX hosts, https://open-api-vst.bingx.com is the one of demo trading, benchmark command points them to local stand-in
+BINGX_REST_URL = os.getenv("BINGX_REST_URL", "https://open-api.bingx.com")
+BINGX_WS_URL = os.getenv("BINGX_WS_URL", "wss://open-api-swap.bingx.com/swap-market")
+# Ports run_poller and run_listeners serve Prometheus metrics on, 0 turns them off. Web app serves them on /metrics
+POLLER_METRICS_PORT = int(os.getenv("POLLER_METRICS_PORT", 9101))
+LISTENERS_METRICS_PORT = int(os.getenv("LISTENERS_METRICS_PORT", 9102))
+# Requests are profiled into per-route metrics (DB queries and time, exchange requests time, CPU time), and
+# Server-Timing header of responses shows profile of request when PROFILING_SERVER_TIMING is on
+PROFILING_SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", str(DEBUG)).lower() in ("1", "true", "yes")
+# Most DB queries a request to the route may make, regardless of how many rows it returns. Exceeding it is logged,
+# and fails the request when budgets are enforced, which they are in tests, so N+1 regressions fail them
+QUERY_BUDGETS = {
+    'api/v1/journal/trades/': 8,
+    'api/v1/journal/trades/filtered/': 10,
+    'api/v1/journal/investments/': 8,
+    'api/v1/journal/investments/filtered/': 10,
+    'api/v1/trading/positions/pending/': 6,
+    'api/v1/trading/positions/current/': 6,
+}
+QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", str(sys.argv[1:2] == ['test'])).lower() in ("1", "true", "yes")
+# OpenTelemetry tracing of requests, Exchange methods, BingX requests and DB queries (needs `tracing` extra): file
+# appends spans to TRACING_FILE as OTLP JSON, otlp sends them to collector. Share of requests given by sample rate is
+# traced, and TRACING_HEADER of request set to 1 or 0 forces tracing of that request on or off
+TRACING = os.getenv("TRACING", "")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 0))
+TRACING_HEADER = os.getenv("TRACING_HEADER", "X-Trace")
+TRACING_FILE = os.getenv("TRACING_FILE", str(LOGS_DIR / 'traces.jsonl'))
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://alloy:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "trading-buddy-backend")
+# BingX REST traffic of the process can be recorded into cassette (record) or served from it (replay) without exchange,
+# replay delays responses by BINGX_REPLAY_LATENCY_MS, or by recorded durations when it's "recorded"
+BINGX_TRANSPORT = os.getenv("BINGX_TRANSPORT", "")
+BINGX_CASSETTE = os.getenv("BINGX_CASSETTE", str(BASE_DIR / 'cache' / 'bingx_cassette.jsonl.gz'))
+BINGX_REPLAY_LATENCY_MS = os.getenv("BINGX_REPLAY_LATENCY_MS", "0")
+BINGX_REPLAY_JITTER_MS = float(os.getenv("BINGX_REPLAY_JITTER_MS", 0))
+# Identical concurrent GET requests to BingX always share one response within a process. With positive TTL responses
+# of endpoints below are also shared between processes (web workers, poller, listeners) for that many seconds.
+# Only market data is shared, as poller and views act on account state, i.e. positions and leverage, so it must be fresh
+EXCHANGE_SHARED_GET_TTL = float(os.getenv("EXCHANGE_SHARED_GET_TTL", 0))
+EXCHANGE_SHARED_GET_ENDPOINTS = (
+    '/openApi/swap/v2/quote/contracts',
+)
+# Market data of all trading pairs is refreshed this often by run_listeners, web workers refresh it themselves only
+# once it's a few intervals old, see market_snapshot.py. It isn't served at all once older than max age
+MARKET_SNAPSHOT_INTERVAL = float(os.getenv("MARKET_SNAPSHOT_INTERVAL", 5))
+MARKET_SNAPSHOT_MAX_AGE = float(os.getenv("MARKET_SNAPSHOT_MAX_AGE", 60))
+# Largest risk grid of position form, and maintenance margin rate its liquidation estimate assumes
+POSITION_GRID_MAX_CELLS = int(os.getenv("POSITION_GRID_MAX_CELLS", 2500))
+POSITION_GRID_MAINTENANCE_MARGIN_RATE = float(os.getenv("POSITION_GRID_MAINTENANCE_MARGIN_RATE", 0.005))
+
+# Local candles store, see trading_buddy/services/analytics/kline_store.py and sync_klines command.
+# Candles can always be downloaded again, so they are kept in cache directory
+KLINES_DIR = os.getenv("KLINES_DIR", str(BASE_DIR / 'cache' / 'klines'))
+# How far back history is downloaded for symbols synced for the first time
+KLINES_DEFAULT_HISTORY_DAYS = int(os.getenv("KLINES_DEFAULT_HISTORY_DAYS", 365))
+# Stored candles trades are replayed on, and for how many of them after primary order is placed
+REPLAY_INTERVAL = os.getenv("REPLAY_INTERVAL", '1h')
+REPLAY_MAX_BARS = int(os.getenv("REPLAY_MAX_BARS", 720))
+# Processes rule sweeps are spread across (default - number of CPUs, at most 8) and the largest sweep allowed through API
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", 0)) or None
+SWEEP_MAX_COMBINATIONS = int(os.getenv("SWEEP_MAX_COMBINATIONS", 5000))
+# Web app runs sweeps in background, each web worker runs that many at a time and queues up to SWEEP_MAX_QUEUED more,
+# results are kept for SWEEP_RESULT_TTL seconds, see trading_buddy/services/analytics/sweep_jobs.py
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", 1))
+SWEEP_MAX_QUEUED = int(os.getenv("SWEEP_MAX_QUEUED", 4))
+SWEEP_RESULT_TTL = int(os.getenv("SWEEP_RESULT_TTL", 60 * 60))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    STATS_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stats',
+    } if os.getenv("STATS_CACHE_BACKEND", "file") == "locmem" else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': STATS_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    EXCHANGE_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'exchange',
+    } if os.getenv("EXCHANGE_CACHE_BACKEND", "file") == "locmem" else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': EXCHANGE_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -19,6 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from trading_buddy.views import export_metrics
 from . import settings
 
 urlpatterns = [
@@ -28,6 +29,8 @@ urlpatterns = [
     path('api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/v1/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/v1/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    # Prometheus metrics, scraped from inside the network
+    path('metrics', export_metrics),
 ]
 
 # For media serving, in production is via bounded to Nginx volume